@@ -0,0 +1,214 @@
+# archive.py
+# Moves old vitals and symptom_checks rows out of the hot database into a
+# compressed cold store next to it (health_tracker.archive.db, or
+# user_data/user_<id>.archive.db in per_user mode).
+#
+#   python archive.py              # archive everything older than ARCHIVE_AFTER_DAYS
+#   python archive.py --days 365
+#
+# Each user's rows are kept as one zlib-compressed JSON blob per month.
+# The hot database records a watermark per table; readers in database.py
+# only open the cold store when a query reaches back past it. Rows are read
+# from the hot file on the caller's connection, but removing them there is
+# queued on the database writer (database.submit_write) like any other
+# write, so archival never holds the write lock against the GUI.
+import argparse
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import zlib
+import timeutil
+
+ARCHIVE_AFTER_DAYS = 180
+
+# table: (ordering column, archived columns, month of an ordering value)
+ARCHIVED_TABLES = {
+    "vitals": (
+        "day",
+        ["id", "user_id", "date", "day", "sleep_hours", "bp_systolic", "bp_diastolic", "sugar", "weight", "pulse"],
+        lambda day: timeutil.format_day(day, "%Y-%m")
+    ),
+    "symptom_checks": (
+        "checked_at",
+        ["id", "user_id", "date", "checked_at", "symptoms", "top_diseases"],
+        lambda checked_at: timeutil.format_epoch(checked_at, "%Y-%m")
+    ),
+}
+
+WATERMARK_SQL = "SELECT before_value FROM archive_watermark WHERE table_name=?"
+# Templates for table_sql(); the hot database's are checked with database.PLANNED_QUERIES
+ARCHIVABLE_SQL = "SELECT {columns} FROM {table} WHERE {key} < ? ORDER BY {key}"
+ARCHIVED_DELETE_SQL = "DELETE FROM {table} WHERE id=?"
+COLD_MONTH_SQL = "SELECT payload FROM {table}_archive WHERE user_id=? AND month=?"
+COLD_RANGE_SQL = """
+    SELECT payload FROM {table}_archive
+    WHERE user_id=? AND first_value <= ? AND last_value >= ?
+    ORDER BY month
+"""
+COLD_LATEST_SQL = "SELECT payload FROM {table}_archive WHERE user_id=? ORDER BY month DESC"
+
+
+def table_sql(template, table):
+    """template with {table}, {key} and {columns} filled in for one of ARCHIVED_TABLES"""
+    key, columns, month_of = ARCHIVED_TABLES[table]
+    return template.format(table=table, key=key, columns=", ".join(columns))
+
+
+# (query, sample parameters) on the cold store, checked like database.PLANNED_QUERIES
+COLD_PLANNED_QUERIES = [(table_sql(template, table), params) for table in ARCHIVED_TABLES for template, params in [
+    (COLD_MONTH_SQL, (1, "2024-01")),
+    (COLD_RANGE_SQL, (1, 19753, 19723)),
+    (COLD_LATEST_SQL, (1,)),
+]]
+
+
+def archive_path_for(path):
+    """Cold store file belonging to a hot database file"""
+    return os.path.splitext(path)[0] + ".archive.db"
+
+
+def open_cold(path, create=True):
+    """Connection to the cold store for hot database path (None if it does not exist yet)"""
+    cold_path = archive_path_for(path)
+    if not create and not os.path.exists(cold_path):
+        return None
+    conn = sqlite3.connect(cold_path)
+    for table in ARCHIVED_TABLES:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table}_archive(
+                user_id INTEGER,
+                month TEXT,
+                first_value INTEGER,
+                last_value INTEGER,
+                row_count INTEGER,
+                payload BLOB,
+                PRIMARY KEY(user_id, month)
+            )
+        """)
+    return conn
+
+
+def _pack(rows):
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(payload):
+    return [tuple(row) for row in json.loads(zlib.decompress(payload).decode("utf-8"))]
+
+
+def get_watermark(conn, table):
+    """Values of table's ordering column below this may be in the cold store (None if never archived)"""
+    row = conn.execute(WATERMARK_SQL, (table,)).fetchone()
+    return row[0] if row else None
+
+
+def _drop_archived(conn, table, moved_ids, before):
+    # Archived readings still count in vitals_rollup
+    conn.execute("INSERT INTO rollup_hold(reason) VALUES ('archive')")
+    conn.executemany(table_sql(ARCHIVED_DELETE_SQL, table), ((row_id,) for row_id in moved_ids))
+    conn.execute("DELETE FROM rollup_hold")
+    conn.execute("""
+        INSERT INTO archive_watermark(table_name, before_value) VALUES (?, ?)
+        ON CONFLICT(table_name) DO UPDATE SET before_value = max(before_value, excluded.before_value)
+    """, (table, before))
+
+
+def archive_table(conn, path, table, before):
+    """
+    Move rows of table whose ordering column is below before into the cold store.
+    The cold store is committed first, so a crash in between leaves rows in
+    both places; readers drop the duplicates by id and the next run merges them.
+    Returns the number of rows moved.
+    """
+    import database
+
+    key, columns, month_of = ARCHIVED_TABLES[table]
+    key_index = columns.index(key)
+    cur = conn.execute(table_sql(ARCHIVABLE_SQL, table), (before,))
+
+    moved_ids = []
+    cold = open_cold(path)
+    try:
+        with cold:
+            # Rows come oldest first, so only one month is held in memory at a time
+            for month, rows in itertools.groupby(cur, key=lambda row: month_of(row[key_index])):
+                by_user = {}
+                for row in rows:
+                    by_user.setdefault(row[1], {})[row[0]] = row
+                for user_id, merged in by_user.items():
+                    moved_ids.extend(merged)
+                    existing = cold.execute(table_sql(COLD_MONTH_SQL, table), (user_id, month)).fetchone()
+                    if existing:
+                        for row in _unpack(existing[0]):
+                            merged.setdefault(row[0], row)
+                    ordered = sorted(merged.values(), key=lambda row: (row[key_index], row[0]))
+                    cold.execute(f"""
+                        INSERT OR REPLACE INTO {table}_archive(user_id, month, first_value, last_value, row_count, payload)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (user_id, month, ordered[0][key_index], ordered[-1][key_index], len(ordered), _pack(ordered)))
+    finally:
+        cold.close()
+
+    database.submit_write(_drop_archived, table, moved_ids, before, path=path).result()
+    return len(moved_ids)
+
+
+def run_archival(conn, path, horizon_days=ARCHIVE_AFTER_DAYS, today=None):
+    """Archive both tables of one hot database file; returns {table: rows moved}"""
+    before_day = (timeutil.today() if today is None else today) - horizon_days
+    midnight = datetime.datetime.combine(timeutil.from_day(before_day), datetime.time())
+    return {
+        "vitals": archive_table(conn, path, "vitals", before_day),
+        "symptom_checks": archive_table(conn, path, "symptom_checks", timeutil.to_epoch(midnight)),
+    }
+
+
+def read_archived(path, table, user_id, first, last):
+    """Archived rows of table for user_id with the ordering column in [first, last], oldest first"""
+    key, columns, month_of = ARCHIVED_TABLES[table]
+    key_index = columns.index(key)
+    cold = open_cold(path, create=False)
+    if cold is None:
+        return []
+    try:
+        blobs = cold.execute(table_sql(COLD_RANGE_SQL, table), (user_id, last, first)).fetchall()
+    finally:
+        cold.close()
+    return [row for (payload,) in blobs for row in _unpack(payload) if first <= row[key_index] <= last]
+
+
+def read_archived_latest(path, table, user_id, limit):
+    """The newest limit archived rows of table for user_id, newest first"""
+    key, columns, month_of = ARCHIVED_TABLES[table]
+    key_index = columns.index(key)
+    cold = open_cold(path, create=False)
+    if cold is None:
+        return []
+    rows = []
+    try:
+        cur = cold.execute(table_sql(COLD_LATEST_SQL, table), (user_id,))
+        for (payload,) in cur:
+            rows.extend(sorted(_unpack(payload), key=lambda row: (row[key_index], row[0]), reverse=True))
+            if len(rows) >= limit:
+                break
+    finally:
+        cold.close()
+    return rows[:limit]
+
+
+def main(argv=None):
+    import database
+
+    parser = argparse.ArgumentParser(description="Move old vitals and symptom checks to the cold store")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="keep this many days in the hot tables")
+    args = parser.parse_args(argv)
+
+    for path, moved in database.archive_old_data(args.days).items():
+        print(f"{path}: archived {moved['vitals']} vitals rows, {moved['symptom_checks']} symptom checks")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
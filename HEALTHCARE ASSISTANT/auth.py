@@ -1,5 +1,6 @@
 # auth.py
-from database import connect
+from database import connect, open_user_store, register_user, LOGIN_SQL
+from db_writer import when_done
 import hashlib
 import customtkinter as ctk
 from tkinter import messagebox
@@ -8,28 +9,30 @@ def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-def register_gui(name, age, sex, username, password):
-    conn, cur = connect()
-    try:
-        cur.execute(
-            "INSERT INTO users (name, age, sex, username, password) VALUES (?, ?, ?, ?, ?)",
-            (name, age, sex, username, hash_password(password))
-        )
-        conn.commit()
-        messagebox.showinfo("Success", "Registration successful!")
-    except Exception as e:
-        messagebox.showerror("Error", f"Registration failed: {e}")
-    finally:
-        conn.close()
+def register_gui(name, age, sex, username, password, parent=None):
+    """Register a user; with a parent window the result is reported without blocking it"""
+    future = register_user(name, age, sex, username, hash_password(password))
+
+    def confirm(f):
+        if f.exception() is not None:
+            messagebox.showerror("Error", f"Registration failed: {f.exception()}")
+        else:
+            messagebox.showinfo("Success", "Registration successful!")
+
+    if parent is None:
+        confirm(future)  # blocks until the writer thread has committed
+    else:
+        when_done(parent, future, confirm)
 
 
 def login_gui(username, password):
     conn, cur = connect()
     hashed = hash_password(password)
     try:
-        cur.execute("SELECT id, name FROM users WHERE username=? AND password=?", (username, hashed))
+        cur.execute(LOGIN_SQL, (username, hashed))
         user = cur.fetchone()
         if user:
+            open_user_store(user[0])
             return user[0], user[1]  # user_id, name
         else:
             messagebox.showerror("Error", "Invalid Credentials!")
@@ -1,112 +1,675 @@
+import atexit
+import collections
+import os
 import sqlite3
-from datetime import datetime
-
-def connect():
-    """Create database connection and initialize all tables"""
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-
-    # Users table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            age INTEGER,
-            sex TEXT,
-            username TEXT UNIQUE,
-            password TEXT
-        )
-    """)
-
-    # Daily vitals table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS vitals(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            date TEXT,
-            sleep_hours REAL,
-            bp_systolic INTEGER,
-            bp_diastolic INTEGER,
-            sugar REAL,
-            weight REAL,
-            pulse INTEGER,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    """)
-
-    # Medicine table
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS medicine(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            name TEXT,
-            type TEXT,
-            dosage TEXT,
-            schedule_type TEXT,
-            days TEXT,
-            time TEXT,
-            paused INTEGER DEFAULT 0,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    """)
-    
-   # Symptom table
-    
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS symptom_checks(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            date TEXT,
-            symptoms TEXT,
-            top_diseases TEXT,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        )
-    """)
-
-    conn.commit()
-    return conn, cur
+import threading
+import archive
+import medicine_events
+import migrations
+import recurrence
+import timeutil
+from db_writer import WriteQueue
 
+DB_PATH = "health_tracker.db"
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT = 5.0  # seconds a connection waits on a locked database before failing
 
-def save_symptom_check(user_id, symptoms, top_diseases):
-    """Save symptom check to database"""
+# "shared": everything in DB_PATH.
+# "per_user": DB_PATH only holds the users catalog; each user's vitals,
+# medicine, symptom_checks and nutrition_log live in TENANT_DIR/user_<id>.db
+STORAGE_MODE = os.environ.get("HEALTH_STORAGE_MODE", "shared")
+TENANT_DIR = "user_data"
+THREAD_CONNECTIONS = 8   # database files one thread keeps open; the least recently used is closed
+WRITER_THREADS = 4       # writers shared by the per_user files (shared mode has one)
+
+# One connection per thread and database file, shared by every module in the process
+_local = threading.local()
+_pool = {}               # path -> every thread's open connection to it
+_pool_lock = threading.Lock()
+_pool_generation = 0
+_path_generations = {}   # bumped when a file's connections are closed under its threads
+_migrated_paths = set()
+_writers = []
+
+# Queries shared with the GUI modules; each one must be served by an index
+LOGIN_SQL = "SELECT id, name FROM users WHERE username=? AND password=?"
+# Dates are compared as integer day numbers / epoch seconds (see timeutil.py)
+VITALS_RANGE_SQL = """
+    SELECT id, day, bp_systolic, bp_diastolic, sugar, weight, pulse, sleep_hours
+    FROM vitals
+    WHERE user_id=? AND day BETWEEN ? AND ?
+    ORDER BY day ASC
+"""
+VITALS_FOR_DAY_SQL = "SELECT id FROM vitals WHERE user_id=? AND day=?"
+SYMPTOM_HISTORY_SQL = """
+    SELECT id, checked_at, symptoms, top_diseases
+    FROM symptom_checks
+    WHERE user_id=?
+    ORDER BY checked_at DESC
+    LIMIT ?
+"""
+VITALS_ROLLUP_SQL = """
+    SELECT bucket, metric, n, total, total_sq, min_value, max_value
+    FROM vitals_rollup
+    WHERE user_id=? AND grain=? AND bucket BETWEEN ? AND ?
+    ORDER BY bucket
+"""
+MEDICINE_ROW_SQL = """
+    SELECT user_id, name, time, schedule_type, days, repeat_every, start_day, end_day, paused
+    FROM medicine WHERE id=?
+"""
+MEDICINE_FOR_USER_SQL = """
+    SELECT id, name, time, paused, schedule_type, days, repeat_every, start_day, end_day
+    FROM medicine WHERE user_id=?
+"""
+# Every user's active medicines, for the reminder scheduler
+MEDICINE_ACTIVE_SQL = """
+    SELECT id, user_id, name, time, schedule_type, days, repeat_every, start_day, end_day
+    FROM medicine WHERE paused=0
+"""
+MEDICINE_DELETE_SQL = "DELETE FROM medicine WHERE id=?"
+MEDICINE_PAUSE_SQL = "UPDATE medicine SET paused=? WHERE id=?"
+SLEEP_UPDATE_SQL = "UPDATE vitals SET sleep_hours=? WHERE id=?"
+ADHERENCE_SQL = """
+    SELECT medicine_id, total(taken), total(skipped), total(missed)
+    FROM adherence_daily
+    WHERE user_id=? AND day BETWEEN ? AND ?
+    GROUP BY medicine_id
+"""
+LAST_PENDING_DOSE_SQL = """
+    SELECT due_at FROM dose_events
+    WHERE medicine_id=? AND status='pending' AND due_at >= ?
+    ORDER BY due_at DESC LIMIT 1
+"""
+SWEEP_MISSED_SQL = "UPDATE dose_events SET status='missed', recorded_at=? WHERE status='pending' AND due_at < ?"
+OVERDUE_DOSE_SQL = "SELECT 1 FROM dose_events WHERE status='pending' AND due_at < ? LIMIT 1"
+# Re-triage walks symptom_checks in id order (symptom_matrix.retriage_symptom_checks)
+SYMPTOM_CHECKS_AFTER_SQL = "SELECT id, symptoms FROM symptom_checks WHERE id > ? ORDER BY id LIMIT ?"
+SYMPTOM_CHECK_RESULTS_SQL = "UPDATE symptom_checks SET top_diseases=? WHERE id=?"
+# Medicine change log in the catalog, followed by reminder schedulers in other processes
+MEDICINE_CHANGES_SQL = "SELECT seq, user_id, medicine_id FROM medicine_changes WHERE seq > ? ORDER BY seq LIMIT ?"
+MEDICINE_CHANGE_SEQ_SQL = "SELECT max(seq) FROM medicine_changes"
+MEDICINE_CHANGES_PRUNE_SQL = "DELETE FROM medicine_changes WHERE seq <= ?"
+
+# A pending dose not marked taken or skipped within this many seconds counts as missed
+MISSED_AFTER = 4 * 3600
+MEDICINE_CHANGES_KEPT = 1000  # change log entries kept; a scheduler further behind reloads everything
+
+# Every query run against a hot database file, with sample parameters, checked
+# by find_unindexed_queries() (test_query_plans.py); archive.COLD_PLANNED_QUERIES
+# covers the cold store
+PLANNED_QUERIES = [
+    (LOGIN_SQL, ("user", "hash")),
+    (VITALS_RANGE_SQL, (1, 19723, 19753)),
+    (VITALS_FOR_DAY_SQL, (1, 19723)),
+    (VITALS_ROLLUP_SQL, (1, "day", 19723, 19753)),
+    (SYMPTOM_HISTORY_SQL, (1, 20)),
+    (ADHERENCE_SQL, (1, 19723, 19753)),
+    (MEDICINE_ROW_SQL, (1,)),
+    (MEDICINE_FOR_USER_SQL, (1,)),
+    (MEDICINE_ACTIVE_SQL, ()),
+    (MEDICINE_DELETE_SQL, (1,)),
+    (MEDICINE_PAUSE_SQL, (1, 1)),
+    (SLEEP_UPDATE_SQL, (7.5, 1)),
+    (LAST_PENDING_DOSE_SQL, (1, 1704067200)),
+    (SWEEP_MISSED_SQL, (1704067200, 1704052800)),
+    (OVERDUE_DOSE_SQL, (1704052800,)),
+    (SYMPTOM_CHECKS_AFTER_SQL, (0, 500)),
+    (SYMPTOM_CHECK_RESULTS_SQL, ("Flu (80%)", 1)),
+    (MEDICINE_CHANGES_SQL, (0, 500)),
+    (MEDICINE_CHANGE_SEQ_SQL, ()),
+    (MEDICINE_CHANGES_PRUNE_SQL, (1,)),
+    (archive.WATERMARK_SQL, ("vitals",)),
+] + [(archive.table_sql(template, table), params) for table, before in [("vitals", 19723), ("symptom_checks", 1704067200)]
+     for template, params in [(archive.ARCHIVABLE_SQL, (before,)), (archive.ARCHIVED_DELETE_SQL, (1,))]]
+
+
+class PooledConnection:
+    """Handle on a pooled connection; close() hands it back instead of closing it"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        # Match sqlite3 semantics: anything not committed is discarded
+        if self._conn.in_transaction:
+            self._conn.rollback()
+
+
+def db_path_for(user_id=None):
+    """Database file holding user_id's data (the catalog for user_id=None)"""
+    if STORAGE_MODE == "per_user" and user_id is not None:
+        return os.path.join(TENANT_DIR, f"user_{int(user_id)}.db")
+    return DB_PATH
+
+
+def data_paths():
+    """Every database file that may hold per-user data rows"""
+    if STORAGE_MODE != "per_user":
+        return [DB_PATH]
+    if not os.path.isdir(TENANT_DIR):
+        return []
+    return sorted(os.path.join(TENANT_DIR, name) for name in os.listdir(TENANT_DIR)
+                  if name.startswith("user_") and name.endswith(".db") and name[5:-3].isdigit())
+
+
+def get_connection(user_id=None):
+    """Return this thread's pooled connection for user_id's database file"""
+    return connection_for_path(db_path_for(user_id))
+
+
+def open_connection(path, check_same_thread=True):
+    """New connection to path with the storage layer's settings, migrating the file once per process"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                           check_same_thread=check_same_thread)
+    # WAL keeps readers and the writer thread out of each other's way;
+    # NORMAL sync is durable across app crashes in WAL mode
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if path not in _migrated_paths:
+        init_schema(conn, path)
+    return conn
+
+
+def connection_for_path(path):
+    """
+    Return this thread's pooled connection to path. Each thread keeps its
+    THREAD_CONNECTIONS most recently used files open.
+    """
+    if getattr(_local, "generation", None) != _pool_generation:
+        _local.conns = collections.OrderedDict()
+        _local.generation = _pool_generation
+    generation = _path_generations.get(path, 0)
+    entry = _local.conns.pop(path, None)
+    if entry is None or entry[1] != generation:
+        # check_same_thread is off only so close_all() and delete_user_data()
+        # can close it; it is still used by this thread alone
+        conn = open_connection(path, check_same_thread=False)
+        with _pool_lock:
+            _pool.setdefault(path, []).append(conn)
+        entry = (conn, generation)
+    _local.conns[path] = entry
+    while len(_local.conns) > THREAD_CONNECTIONS:
+        old_path, (old, _) = _local.conns.popitem(last=False)
+        _release(old_path, old)
+    return entry[0]
+
+
+def _release(path, conn):
+    """Close one pooled connection unless close_all() or delete_user_data() already has"""
+    with _pool_lock:
+        conns = _pool.get(path, [])
+        if conn not in conns:
+            return
+        conns.remove(conn)
+        if not conns:
+            del _pool[path]
+    conn.close()
+
+
+def iter_data_files():
+    """
+    Yield (path, connection) for every data file, for cross-user work like
+    reminders and archival. In per_user mode each file gets a connection of
+    its own that is closed before the next opens, so scanning every tenant
+    keeps one file open at a time.
+    """
+    for path in data_paths():
+        if STORAGE_MODE != "per_user":
+            yield path, connection_for_path(path)
+            continue
+        conn = open_connection(path)
+        try:
+            yield path, conn
+        finally:
+            conn.close()
+
+
+def iter_data_connections():
+    """Yield a connection to every data file in turn (see iter_data_files())"""
+    for path, conn in iter_data_files():
+        yield conn
+
+
+def connect(user_id=None):
+    """Return a pooled connection handle and a fresh cursor"""
+    conn = PooledConnection(get_connection(user_id))
+    return conn, conn.cursor()
+
+
+def close_all():
+    """
+    Commit queued writes, stop the writers and close every pooled connection,
+    e.g. at shutdown or after changing DB_PATH. No other thread may be using
+    the database meanwhile.
+    """
+    global _pool_generation
+    # Committed medicine writes queue change log entries; let those land first
+    flush_writes()
+    with _pool_lock:
+        writers = list(_writers)
+        _writers.clear()
+    for writer in writers:
+        # Each writer closes its own connections, after its last commit
+        writer.shutdown()
+    with _pool_lock:
+        for conns in _pool.values():
+            for conn in conns:
+                conn.close()
+        _pool.clear()
+        _pool_generation += 1
+        _path_generations.clear()
+        _migrated_paths.clear()
+
+
+def init_schema(conn, path=None):
+    """Bring one database file's schema up to date; runs once per file and process"""
+    path = path or DB_PATH
+    if path in _migrated_paths:
+        return
+    # journal_mode is stored in the file, so setting it once is enough.
+    # Threads racing here are harmless: migrate() re-checks the version
+    # under the database's write lock.
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrations.migrate(conn)
+    with _pool_lock:
+        _migrated_paths.add(path)
+
+
+def open_user_store(user_id):
+    """Resolve and prepare user_id's database file; called right after login"""
+    return get_connection(user_id)
+
+
+def backup_user_data(user_id, dest_path):
+    """Copy the database file holding user_id's data to dest_path"""
+    flush_writes()
+    dest = sqlite3.connect(dest_path)
     try:
-        from datetime import datetime
-        conn, cur = connect()
-        
-        date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        symptoms_str = ", ".join(symptoms)
-        diseases_str = "; ".join([f"{d[0]} ({d[1]:.0f}%)" for d in top_diseases[:3]])
-        
-        cur.execute("""
-            INSERT INTO symptom_checks(user_id, date, symptoms, top_diseases)
-            VALUES (?, ?, ?, ?)
-        """, (user_id, date, symptoms_str, diseases_str))
-        
-        conn.commit()
+        get_connection(user_id).backup(dest)
+    finally:
+        dest.close()
+
+
+def delete_user_data(user_id):
+    """Remove a user's data file in per_user mode (shared mode keeps rows in DB_PATH)"""
+    if STORAGE_MODE != "per_user":
+        raise ValueError("delete_user_data() needs HEALTH_STORAGE_MODE=per_user")
+    path = db_path_for(user_id)
+    # The writer commits what is queued for the file and closes its connection
+    _writer_for(path).close_path(path)
+    med_ids = [row[0] for row in get_connection(user_id).execute(MEDICINE_FOR_USER_SQL, (user_id,))]
+    with _pool_lock:
+        # Threads holding a connection to the file open a new one on next use
+        _path_generations[path] = _path_generations.get(path, 0) + 1
+        conns = _pool.pop(path, [])
+        _migrated_paths.discard(path)
+    for conn in conns:
         conn.close()
-        return True
-    except Exception as e:
-        print(f"Error saving symptom check: {e}")
-        return False
+    for suffix in ["", "-wal", "-shm"]:
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    # Reminder schedulers drop the user's medicines
+    for med_id in med_ids:
+        log_medicine_change(user_id, med_id)
+
+
+# All GUI-originated writes go through a fixed set of writer threads. A file
+# always maps to the same one, so each file still has a single writer.
+def _writer_for(path):
+    with _pool_lock:
+        if not _writers:
+            count = WRITER_THREADS if STORAGE_MODE == "per_user" else 1
+            _writers.extend(WriteQueue(open_connection, name=f"db-writer-{i}") for i in range(count))
+        return _writers[hash(path) % len(_writers)]
+
+
+def submit_write(job, *args, user_id=None, path=None):
+    """Run job(conn, *args) on the writer for user_id's file (or the file at path); returns a Future"""
+    path = path or db_path_for(user_id)
+    return _writer_for(path).submit(path, job, *args)
+
+
+def flush_writes(timeout=None):
+    """Wait until every queued write has been committed"""
+    for writer in list(_writers):
+        writer.flush(timeout)
+    if _writers:
+        # Medicine writes just committed may have queued change log entries
+        _writer_for(DB_PATH).flush(timeout)
+
+
+atexit.register(flush_writes, BUSY_TIMEOUT)
+
+
+def _insert_user(conn, name, age, sex, username, password_hash):
+    cur = conn.execute(
+        "INSERT INTO users (name, age, sex, username, password) VALUES (?, ?, ?, ?, ?)",
+        (name, age, sex, username, password_hash)
+    )
+    return cur.lastrowid
+
+
+def _insert_vitals(conn, user_id, date, bp_systolic, bp_diastolic, sugar, weight, pulse):
+    day = timeutil.to_day(date)
+    cur = conn.execute("""
+        INSERT INTO vitals (user_id, date, day, bp_systolic, bp_diastolic, sugar, weight, pulse)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, timeutil.format_day(day), day, bp_systolic, bp_diastolic, sugar, weight, pulse))
+    return cur.lastrowid
+
+
+def _upsert_sleep(conn, user_id, date, sleep_hours):
+    day = timeutil.to_day(date)
+    row = conn.execute(VITALS_FOR_DAY_SQL, (user_id, day)).fetchone()
+    if row:
+        conn.execute(SLEEP_UPDATE_SQL, (sleep_hours, row[0]))
+        return row[0]
+    cur = conn.execute("INSERT INTO vitals (user_id, date, day, sleep_hours) VALUES (?, ?, ?, ?)",
+                       (user_id, timeutil.format_day(day), day, sleep_hours))
+    return cur.lastrowid
+
+
+def _insert_medicine(conn, user_id, name, time, schedule_type, days, repeat_every, start_day, end_day):
+    cur = conn.execute("""
+        INSERT INTO medicine (user_id, name, time, paused, schedule_type, days, repeat_every, start_day, end_day)
+        VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?)
+    """, (user_id, name, time, schedule_type, days, repeat_every, start_day, end_day))
+    return cur.lastrowid
+
+
+def _delete_medicine(conn, med_id):
+    row = conn.execute(MEDICINE_ROW_SQL, (med_id,)).fetchone()
+    conn.execute(MEDICINE_DELETE_SQL, (med_id,))
+    return row
+
+
+def _set_medicine_paused(conn, med_id, paused):
+    conn.execute(MEDICINE_PAUSE_SQL, (1 if paused else 0, med_id))
+    return conn.execute(MEDICINE_ROW_SQL, (med_id,)).fetchone()
+
+
+def _publish_medicine_change(kind, future, med_id=None, row=None):
+    """
+    Done-callback: announce a committed medicine write (MEDICINE_ROW_SQL row)
+    to medicine_events in this process and to the change log for others
+    """
+    if future.exception() is not None:
+        return
+    if med_id is None:
+        med_id = future.result()
+    row = row or future.result()
+    if row is not None:
+        medicine_events.publish(medicine_events.MedicineChange(kind, row[0], med_id, tuple(row[1:])))
+        log_medicine_change(row[0], med_id)
+
+
+def _log_medicine_change(conn, user_id, med_id, changed_at):
+    seq = conn.execute("INSERT INTO medicine_changes(user_id, medicine_id, changed_at) VALUES (?, ?, ?)",
+                       (user_id, med_id, changed_at)).lastrowid
+    conn.execute(MEDICINE_CHANGES_PRUNE_SQL, (seq - MEDICINE_CHANGES_KEPT,))
+
+
+def _insert_symptom_check(conn, user_id, checked_at, symptoms_str, diseases_str):
+    cur = conn.execute("""
+        INSERT INTO symptom_checks(user_id, date, checked_at, symptoms, top_diseases)
+        VALUES (?, ?, ?, ?, ?)
+    """, (user_id, timeutil.format_epoch(checked_at), checked_at, symptoms_str, diseases_str))
+    return cur.lastrowid
+
+
+def _sweep_missed_doses(conn, now):
+    conn.execute(SWEEP_MISSED_SQL, (now, now - MISSED_AFTER))
+
+
+def _record_dose_due(conn, user_id, med_id, due_at):
+    now = timeutil.to_epoch()
+    _sweep_missed_doses(conn, now)
+    conn.execute("""
+        INSERT INTO dose_events(user_id, medicine_id, due_at, day, status, recorded_at)
+        VALUES (?, ?, ?, ?, 'pending', ?)
+        ON CONFLICT(medicine_id, due_at) DO NOTHING
+    """, (user_id, med_id, due_at, timeutil.to_day(timeutil.from_epoch(due_at)), now))
+
+
+def _record_dose(conn, user_id, med_id, status, due_at):
+    now = timeutil.to_epoch()
+    _sweep_missed_doses(conn, now)
+    if due_at is None:
+        # The latest reminder still waiting for an answer, or an unscheduled dose now
+        row = conn.execute(LAST_PENDING_DOSE_SQL, (med_id, now - MISSED_AFTER)).fetchone()
+        due_at = row[0] if row else now
+    conn.execute("""
+        INSERT INTO dose_events(user_id, medicine_id, due_at, day, status, recorded_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(medicine_id, due_at) DO UPDATE SET status=excluded.status, recorded_at=excluded.recorded_at
+    """, (user_id, med_id, due_at, timeutil.to_day(timeutil.from_epoch(due_at)), status, now))
+    return due_at
+
+
+def register_user(name, age, sex, username, password_hash):
+    """Queue a new user row; the Future resolves to the new user id"""
+    return submit_write(_insert_user, name, age, sex, username, password_hash)
+
+
+def save_vitals(user_id, date, bp_systolic, bp_diastolic, sugar, weight, pulse):
+    """Queue a vitals reading; the Future resolves to the new row id"""
+    return submit_write(_insert_vitals, user_id, date, bp_systolic, bp_diastolic, sugar, weight, pulse,
+                        user_id=user_id)
+
+
+def save_sleep(user_id, date, sleep_hours):
+    """Queue the sleep hours for a day, updating that day's vitals row if it exists"""
+    return submit_write(_upsert_sleep, user_id, date, sleep_hours, user_id=user_id)
+
+
+def add_medicine(user_id, name, time, schedule_type="daily", days=None, repeat_every=None,
+                 start_date=None, end_date=None):
+    """
+    Queue a new medicine; the Future resolves to the new medicine id.
+    See recurrence.py for schedule_type, days and repeat_every.
+    start_date/end_date optionally limit it to a course (inclusive); interval
+    schedules without a start_date count from today.
+    """
+    start_day = timeutil.to_day(start_date) if start_date else None
+    if start_day is None and schedule_type in recurrence.INTERVAL_TYPES:
+        start_day = timeutil.today()
+    end_day = timeutil.to_day(end_date) if end_date else None
+    future = submit_write(_insert_medicine, user_id, name, time, schedule_type, days, repeat_every,
+                          start_day, end_day, user_id=user_id)
+    row = (user_id, name, time, schedule_type, days, repeat_every, start_day, end_day, 0)
+    future.add_done_callback(lambda f: _publish_medicine_change("added", f, row=row))
+    return future
+
+
+def delete_medicine(med_id, user_id=None):
+    """Queue removal of a medicine; the Future resolves to its last MEDICINE_ROW_SQL row"""
+    future = submit_write(_delete_medicine, med_id, user_id=user_id)
+    future.add_done_callback(lambda f: _publish_medicine_change("deleted", f, med_id))
+    return future
+
+
+def set_medicine_paused(med_id, paused, user_id=None):
+    """Queue pausing or resuming a medicine's reminders; the Future resolves to its updated row"""
+    future = submit_write(_set_medicine_paused, med_id, paused, user_id=user_id)
+    future.add_done_callback(lambda f: _publish_medicine_change("updated", f, med_id))
+    return future
+
+
+def log_medicine_change(user_id, med_id):
+    """Queue a change log entry in the catalog telling other processes to re-read a medicine"""
+    return submit_write(_log_medicine_change, user_id, med_id, timeutil.to_epoch())
+
+
+def record_dose_due(user_id, med_id, due_at):
+    """Queue a pending dose event for a reminder that just fired (due_at: epoch seconds)"""
+    return submit_write(_record_dose_due, user_id, med_id, int(due_at), user_id=user_id)
+
+
+def record_dose(user_id, med_id, status, due_at=None):
+    """
+    Queue marking a dose 'taken' or 'skipped'. Without due_at the latest
+    pending reminder for the medicine is answered. The Future resolves to due_at.
+    """
+    if status not in ("taken", "skipped"):
+        raise ValueError(f"unknown dose status '{status}'")
+    return submit_write(_record_dose, user_id, med_id, status, due_at, user_id=user_id)
+
+
+def format_top_diseases(top_diseases):
+    """symptom_checks.top_diseases text for (disease, match_percentage, ...) results"""
+    return "; ".join([f"{d[0]} ({d[1]:.0f}%)" for d in top_diseases[:3]])
+
+
+def save_symptom_check(user_id, symptoms, top_diseases):
+    """Queue a symptom check for saving; returns a Future"""
+    checked_at = timeutil.to_epoch()
+    symptoms_str = ", ".join(symptoms)
+    diseases_str = format_top_diseases(top_diseases)
+
+    def report_error(future):
+        if future.exception() is not None:
+            print(f"Error saving symptom check: {future.exception()}")
+
+    future = submit_write(_insert_symptom_check, user_id, checked_at, symptoms_str, diseases_str,
+                          user_id=user_id)
+    future.add_done_callback(report_error)
+    return future
+
+
+def get_vitals_rollups(user_id, start_date, end_date=None, grain="day"):
+    """
+    Pre-aggregated vitals for buckets between start_date and end_date (inclusive).
+    grain is 'day' or 'week'; buckets are day numbers, weeks keyed by their Monday.
+    Returns rows of (bucket, metric, n, total, total_sq, min, max).
+    """
+    first, last = timeutil.day_range(start_date, end_date)
+    conn, cur = connect(user_id)
+    cur.execute(VITALS_ROLLUP_SQL, (user_id, grain, first, last))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def get_adherence(user_id, windows=(7, 30)):
+    """
+    Dose adherence per medicine over the last N days for each N in windows.
+    Returns {medicine_id: {N: {"taken", "skipped", "missed", "rate"}}};
+    rate is taken / answered-or-missed doses, or None with no doses yet.
+    """
+    today = timeutil.today()
+    now = timeutil.to_epoch()
+    conn, cur = connect(user_id)
+    # Doses past MISSED_AFTER are only marked missed by a write; do it now so the counts are current
+    if cur.execute(OVERDUE_DOSE_SQL, (now - MISSED_AFTER,)).fetchone():
+        conn.close()
+        submit_write(_sweep_missed_doses, now, user_id=user_id).result()
+        conn, cur = connect(user_id)
+    adherence = {}
+    for days in windows:
+        cur.execute(ADHERENCE_SQL, (user_id, today - days + 1, today))
+        for med_id, taken, skipped, missed in cur.fetchall():
+            total = taken + skipped + missed
+            adherence.setdefault(med_id, {})[days] = {
+                "taken": int(taken),
+                "skipped": int(skipped),
+                "missed": int(missed),
+                "rate": taken / total if total else None
+            }
+    conn.close()
+    return adherence
+
+
+def get_medicine_changes(after_seq, limit=500):
+    """Up to limit (seq, user_id, med_id) change log entries after after_seq, oldest first"""
+    return get_connection().execute(MEDICINE_CHANGES_SQL, (after_seq, limit)).fetchall()
+
+
+def get_medicine_change_seq():
+    """seq of the latest change log entry, 0 if there is none"""
+    return get_connection().execute(MEDICINE_CHANGE_SEQ_SQL).fetchone()[0] or 0
+
+
+def get_medicine_row(user_id, med_id):
+    """A medicine's MEDICINE_ROW_SQL row, or None if it (or its user's data file) no longer exists"""
+    if STORAGE_MODE == "per_user" and not os.path.exists(db_path_for(user_id)):
+        return None
+    return get_connection(user_id).execute(MEDICINE_ROW_SQL, (med_id,)).fetchone()
+
+
+def get_archived_before(user_id, table="vitals"):
+    """Ordering value (day or epoch) below which user_id's rows of table may be in the cold store, or None"""
+    conn = PooledConnection(get_connection(user_id))
+    watermark = archive.get_watermark(conn, table)
+    conn.close()
+    return watermark
+
+
+def get_vitals(user_id, start_date, end_date=None):
+    """
+    Raw vitals readings between start_date and end_date (inclusive), oldest first,
+    including any that archive.py has moved to the cold store.
+    Returns rows of (day, bp_systolic, bp_diastolic, sugar, weight, pulse, sleep_hours).
+    """
+    first, last = timeutil.day_range(start_date, end_date)
+    conn, cur = connect(user_id)
+    cur.execute(VITALS_RANGE_SQL, (user_id, first, last))
+    rows = {row[0]: row[1:] for row in cur.fetchall()}
+    watermark = archive.get_watermark(conn, "vitals")
+    conn.close()
+
+    if watermark is not None and first < watermark:
+        for (row_id, _, _, day, sleep_hours, bp_systolic, bp_diastolic, sugar, weight,
+             pulse) in archive.read_archived(db_path_for(user_id), "vitals", user_id, first, last):
+            rows.setdefault(row_id, (day, bp_systolic, bp_diastolic, sugar, weight, pulse, sleep_hours))
+    return [row for row_id, row in sorted(rows.items(), key=lambda item: (item[1][0], item[0]))]
 
 
 def get_symptom_history(user_id, limit=20):
-    """Get symptom check history for a user"""
+    """Get symptom check history for a user, newest first"""
     try:
-        conn, cur = connect()
-        cur.execute("""
-            SELECT date, symptoms, top_diseases 
-            FROM symptom_checks 
-            WHERE user_id=? 
-            ORDER BY date DESC 
-            LIMIT ?
-        """, (user_id, limit))
-        
-        records = cur.fetchall()
+        conn, cur = connect(user_id)
+        cur.execute(SYMPTOM_HISTORY_SQL, (user_id, limit))
+        rows = {row[0]: row[1:] for row in cur.fetchall()}
+        watermark = archive.get_watermark(conn, "symptom_checks")
         conn.close()
-        return records
+
+        # Fall back to the cold store for whatever the hot table cannot fill
+        if len(rows) < limit and watermark is not None:
+            for row_id, _, _, checked_at, symptoms, diseases in archive.read_archived_latest(
+                    db_path_for(user_id), "symptom_checks", user_id, limit):
+                rows.setdefault(row_id, (checked_at, symptoms, diseases))
+
+        newest = sorted(rows.items(), key=lambda item: (item[1][0], item[0]), reverse=True)[:limit]
+        return [(timeutil.format_epoch(checked_at), symptoms, diseases)
+                for row_id, (checked_at, symptoms, diseases) in newest]
     except Exception as e:
         print(f"Error fetching symptom history: {e}")
         return []
-    
 
+
+def archive_old_data(horizon_days=archive.ARCHIVE_AFTER_DAYS):
+    """Run archive.run_archival() on every data file; returns {path: {table: rows moved}}"""
+    flush_writes()
+    return {path: archive.run_archival(conn, path, horizon_days) for path, conn in iter_data_files()}
+
+
+def find_unindexed_queries(conn=None, queries=None):
+    """
+    Run EXPLAIN QUERY PLAN on every query in queries (default PLANNED_QUERIES).
+    Returns (query, plan_detail) pairs for plans that fall back to a full
+    scan or sort into a temporary b-tree.
+    """
+    conn = conn or get_connection()
+    problems = []
+    for query, params in PLANNED_QUERIES if queries is None else queries:
+        for row in conn.execute("EXPLAIN QUERY PLAN " + query, params):
+            detail = row[-1]
+            if detail.startswith("SCAN ") or "TEMP B-TREE" in detail:
+                problems.append((" ".join(query.split()), detail))
+    return problems
@@ -0,0 +1,168 @@
+# db_writer.py
+# Background writer threads that batch GUI writes into shared commits.
+import collections
+import queue
+import threading
+from concurrent.futures import Future
+
+MAX_BATCH = 200          # jobs committed together at most
+MAX_CONNECTIONS = 16     # database files one writer keeps open; the least recently written is closed
+POLL_INTERVAL_MS = 20    # how often when_done() checks a future from the Tk loop
+
+# Control items queued in order with the jobs
+_FLUSH = object()
+_CLOSE = object()
+_STOP = object()
+
+
+class WriteQueue:
+    """
+    Runs write jobs on one thread. Every job is a function taking a
+    connection to the database file it was submitted for; it must not
+    commit. Jobs that queue up while a commit is in progress are applied
+    together, one transaction per file, each inside its own savepoint so one
+    failing job does not undo the others. The thread opens its connections
+    with connect(path), is the only one to use or close them, and keeps at
+    most MAX_CONNECTIONS open.
+    """
+
+    def __init__(self, connect, name="db-writer"):
+        self._connect = connect
+        self._name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._connections = collections.OrderedDict()  # path -> connection, writer thread only
+
+    def submit(self, path, job, *args):
+        """Queue job(conn, *args) for the file at path; returns a Future resolved after the commit"""
+        return self._put(path, job, args)
+
+    def flush(self, timeout=None):
+        """Block until everything submitted so far has been committed"""
+        with self._lock:
+            if self._pending == 0:
+                # Nothing queued; do not touch the database at all
+                return
+        self._put(None, _FLUSH, ()).result(timeout)
+
+    def close_path(self, path, timeout=None):
+        """Commit what is queued, then have the writer close its connection to path"""
+        self._put(path, _CLOSE, ()).result(timeout)
+
+    def shutdown(self, timeout=None):
+        """Commit what is queued, close every connection and stop the thread"""
+        with self._lock:
+            if self._thread is None:
+                return
+        self._put(None, _STOP, ()).result(timeout)
+
+    def _put(self, path, job, args):
+        future = Future()
+        with self._lock:
+            self._pending += 1
+            self._queue.put((path, job, args, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < MAX_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = self._apply(batch)
+            if stopping:
+                self._close_all()
+            with self._lock:
+                self._pending -= len(batch)
+                if stopping and self._pending == 0:
+                    # A later submit() starts a new thread
+                    self._thread = None
+                    return
+
+    def _apply(self, batch):
+        """Apply a batch in order; returns True if it asked the thread to stop"""
+        stopping = False
+        jobs = {}  # path -> [(job, args, future)] since the last control item
+        for path, job, args, future in batch:
+            if job is _FLUSH or job is _CLOSE or job is _STOP:
+                self._commit(jobs)
+                jobs = {}
+                if job is _CLOSE:
+                    conn = self._connections.pop(path, None)
+                    if conn is not None:
+                        conn.close()
+                elif job is _STOP:
+                    self._close_all()
+                    stopping = True
+                if future.set_running_or_notify_cancel():
+                    future.set_result(None)
+            else:
+                jobs.setdefault(path, []).append((job, args, future))
+        self._commit(jobs)
+        return stopping
+
+    def _connection(self, path):
+        conn = self._connections.pop(path, None)
+        if conn is None:
+            conn = self._connect(path)
+        self._connections[path] = conn
+        while len(self._connections) > MAX_CONNECTIONS:
+            self._connections.popitem(last=False)[1].close()
+        return conn
+
+    def _close_all(self):
+        while self._connections:
+            self._connections.popitem()[1].close()
+
+    def _commit(self, jobs):
+        for path, batch in jobs.items():
+            results = []
+            conn = None
+            try:
+                conn = self._connection(path)
+                conn.execute("BEGIN IMMEDIATE")
+                for job, args, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        results.append((future, job(conn, *args), None))
+                        conn.execute("RELEASE job")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO job")
+                        conn.execute("RELEASE job")
+                        results.append((future, None, e))
+                conn.commit()
+            except Exception as e:
+                # Nothing in the batch was committed
+                if conn is not None and conn.in_transaction:
+                    conn.rollback()
+                for job, args, future in batch:
+                    if future.done():
+                        continue
+                    if future.running() or future.set_running_or_notify_cancel():
+                        future.set_exception(e)
+                continue
+
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+
+def when_done(widget, future, callback):
+    """Call callback(future) on the Tk thread once the write has finished"""
+    def check():
+        if future.done():
+            callback(future)
+        else:
+            widget.after(POLL_INTERVAL_MS, check)
+    check()
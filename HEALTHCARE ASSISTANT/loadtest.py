@@ -0,0 +1,291 @@
+# loadtest.py
+# Headless load generator for the storage layer.
+#
+#   python loadtest.py --users 10000 --processes 2 --threads 4 --duration 30
+#   python loadtest.py --mode per_user --mix save_vitals=50,report=50
+#
+# Runs against a throwaway database directory (never health_tracker.db in
+# the project) and reports per-operation latency percentiles, throughput
+# and "database is locked"/busy errors.
+import argparse
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import timeutil
+
+DEFAULT_MIX = {
+    "save_vitals": 30,
+    "save_sleep": 10,
+    "add_medicine": 5,
+    "toggle_pause": 5,
+    "save_symptom_check": 10,
+    "report": 25,
+    "reminder_load": 2,
+}
+
+
+def _random_date(rng, days=30):
+    return (datetime.date.today() - datetime.timedelta(days=rng.randint(0, days))).isoformat()
+
+
+def _save_vitals(database, rng, user_id):
+    database.save_vitals(user_id, _random_date(rng), rng.randint(100, 150), rng.randint(60, 95),
+                         round(rng.uniform(70, 160), 1), round(rng.uniform(45, 100), 1), rng.randint(55, 100)).result()
+
+
+def _save_sleep(database, rng, user_id):
+    database.save_sleep(user_id, _random_date(rng), round(rng.uniform(4, 10), 1)).result()
+
+
+def _add_medicine(database, rng, user_id):
+    database.add_medicine(user_id, f"med{rng.randint(1, 50)}", f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}").result()
+
+
+def _toggle_pause(database, rng, user_id):
+    conn, cur = database.connect(user_id)
+    cur.execute(database.MEDICINE_FOR_USER_SQL, (user_id,))
+    rows = cur.fetchall()
+    conn.close()
+    if rows:
+        med_id, name, med_time, paused, *schedule = rng.choice(rows)
+        database.set_medicine_paused(med_id, not paused, user_id).result()
+
+
+def _save_symptom_check(database, rng, user_id):
+    symptoms = rng.sample(["fever", "cough", "headache", "fatigue", "nausea", "chills"], 3)
+    database.save_symptom_check(user_id, symptoms, [("Flu", 80.0), ("Cold", 60.0)]).result()
+
+
+def _report(database, rng, user_id):
+    from vitals_analysis import get_vitals_data, analyze_vitals
+    analyze_vitals(get_vitals_data(user_id, rng.choice(["weekly", "monthly"])))
+
+
+def _reminder_load(database, rng, user_id):
+    # What the scheduler does at startup; afterwards each medicine write is
+    # applied to it through medicine_events (see run_worker)
+    import reminders
+    reminders.load_active_medicines()
+
+
+OPERATIONS = {
+    "save_vitals": _save_vitals,
+    "save_sleep": _save_sleep,
+    "add_medicine": _add_medicine,
+    "toggle_pause": _toggle_pause,
+    "save_symptom_check": _save_symptom_check,
+    "report": _report,
+    "reminder_load": _reminder_load,
+}
+
+
+def parse_mix(text):
+    """'save_vitals=3,report=1' -> {'save_vitals': 3, 'report': 1}"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def is_lock_error(error):
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def _use_directory(db_dir, mode):
+    """Point the storage layer of this process at the load-test directory"""
+    import database
+    database.close_all()
+    database.DB_PATH = os.path.join(db_dir, "health_tracker.db")
+    database.TENANT_DIR = os.path.join(db_dir, "user_data")
+    database.STORAGE_MODE = mode
+    return database
+
+
+def seed(db_dir, mode, users, days):
+    """Create users with a medicine and days of vitals history each"""
+    database = _use_directory(db_dir, mode)
+    rng = random.Random(0)
+    catalog = database.get_connection()
+    with catalog:
+        catalog.executemany(
+            "INSERT INTO users (name, age, sex, username, password) VALUES (?, ?, ?, ?, ?)",
+            ((f"load{i}", rng.randint(18, 90), rng.choice("MF"), f"load{i}", "x") for i in range(users))
+        )
+    user_ids = [row[0] for row in catalog.execute("SELECT id FROM users WHERE username LIKE 'load%'")]
+
+    today = timeutil.today()
+    for user_id in user_ids:
+        conn = database.get_connection(user_id)
+        with conn:
+            conn.execute("INSERT INTO medicine (user_id, name, time, paused) VALUES (?, ?, '08:00', 0)",
+                         (user_id, "seed"))
+            conn.executemany("""
+                INSERT INTO vitals (user_id, date, day, bp_systolic, bp_diastolic, sugar, weight, pulse)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, ((user_id, timeutil.format_day(today - d), today - d,
+                   rng.randint(100, 150), rng.randint(60, 95), 100.0, 70.0, 72) for d in range(days)))
+    database.close_all()
+    return user_ids
+
+
+def run_worker(config):
+    """Run one process worth of threads; returns {op: {"latencies", "lock_errors", "errors"}}"""
+    import reminders
+    database = _use_directory(config["db_dir"], config["mode"])
+    # As in the app: medicine writes patch the scheduler through apply_change.
+    # Only the first worker process to start gets one (see start_reminders).
+    scheduler = reminders.start_reminders(lambda user_id, name, due_at: None)
+    names = list(config["mix"])
+    weights = [config["mix"][name] for name in names]
+    deadline = time.perf_counter() + config["duration"]
+    results = {name: {"latencies": [], "lock_errors": 0, "errors": 0, "samples": []} for name in names}
+    lock = threading.Lock()
+
+    def loop(seed_value):
+        rng = random.Random(seed_value)
+        local = {name: {"latencies": [], "lock_errors": 0, "errors": 0, "samples": []} for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            user_id = rng.choice(config["user_ids"])
+            started = time.perf_counter()
+            try:
+                OPERATIONS[name](database, rng, user_id)
+                local[name]["latencies"].append(time.perf_counter() - started)
+            except Exception as e:
+                key = "lock_errors" if is_lock_error(e) else "errors"
+                local[name][key] += 1
+                if len(local[name]["samples"]) < 3:
+                    local[name]["samples"].append(f"{type(e).__name__}: {e}")
+        with lock:
+            for name, stats in local.items():
+                results[name]["latencies"] += stats["latencies"]
+                results[name]["lock_errors"] += stats["lock_errors"]
+                results[name]["errors"] += stats["errors"]
+                results[name]["samples"] += stats["samples"][:3 - len(results[name]["samples"])]
+
+    threads = [threading.Thread(target=loop, args=(config["seed"] * 1000 + i,))
+               for i in range(config["threads"])]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if scheduler is not None:
+        scheduler.stop()
+    database.flush_writes()
+    database.close_all()
+    return results
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(worker_results, seconds):
+    """Merge per-process results into {op: stats} plus an overall 'total' entry"""
+    merged = {}
+    for results in worker_results:
+        for name, stats in results.items():
+            entry = merged.setdefault(name, {"latencies": [], "lock_errors": 0, "errors": 0, "samples": []})
+            entry["latencies"] += stats["latencies"]
+            entry["lock_errors"] += stats["lock_errors"]
+            entry["errors"] += stats["errors"]
+            entry["samples"] += stats["samples"]
+
+    merged["total"] = {
+        "latencies": [v for name, e in merged.items() for v in e["latencies"]],
+        "lock_errors": sum(e["lock_errors"] for e in merged.values()),
+        "errors": sum(e["errors"] for e in merged.values()),
+        "samples": []
+    }
+
+    summary = {}
+    for name, entry in merged.items():
+        values = sorted(entry["latencies"])
+        summary[name] = {
+            "ops": len(values),
+            "ops_per_second": len(values) / seconds if seconds else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+            "lock_errors": entry["lock_errors"],
+            "errors": entry["errors"],
+            "error_samples": entry["samples"][:3]
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"{'operation':<20}{'ops':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'locked':>8}{'errors':>8}")
+    for name, s in summary.items():
+        print(f"{name:<20}{s['ops']:>8}{s['ops_per_second']:>10.1f}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}"
+              f"{s['p99_ms']:>10.2f}{s['max_ms']:>10.2f}{s['lock_errors']:>8}{s['errors']:>8}")
+        for sample in s["error_samples"]:
+            print(f"    {sample}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the health tracker database layer")
+    parser.add_argument("--users", type=int, default=1000, help="synthetic users to create")
+    parser.add_argument("--seed-days", type=int, default=30, help="days of vitals history per user")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="operation weights, e.g. save_vitals=3,report=1")
+    parser.add_argument("--mode", choices=["shared", "per_user"], default="shared", help="storage mode")
+    parser.add_argument("--db-dir", help="directory for the test databases (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="keep the database directory afterwards")
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args(argv)
+
+    json_path = args.json
+    db_dir = os.path.abspath(args.db_dir) if args.db_dir else tempfile.mkdtemp(prefix="health-loadtest-")
+    os.makedirs(db_dir, exist_ok=True)
+    try:
+        seed_started = time.perf_counter()
+        user_ids = seed(db_dir, args.mode, args.users, args.seed_days)
+        print(f"Seeded {len(user_ids)} users in {time.perf_counter() - seed_started:.1f}s ({db_dir})")
+
+        configs = [{
+            "db_dir": db_dir, "mode": args.mode, "mix": args.mix, "user_ids": user_ids,
+            "threads": args.threads, "duration": args.duration, "seed": i
+        } for i in range(args.processes)]
+
+        started = time.perf_counter()
+        if args.processes == 1:
+            worker_results = [run_worker(configs[0])]
+        else:
+            with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+                worker_results = pool.map(run_worker, configs)
+        summary = summarize(worker_results, time.perf_counter() - started)
+    finally:
+        if not args.keep and not args.db_dir:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+    print_summary(summary)
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["total"]["lock_errors"] == 0 and summary["total"]["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
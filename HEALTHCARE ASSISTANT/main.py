@@ -1,44 +1,56 @@
 # main.py
+#
+#   python main.py                   # start the app
+#   python main.py --check-startup   # open the login window, report what it loaded, and exit
+#
+# The symptom checker (numpy and its knowledge base) and the report screen
+# (matplotlib, fpdf) are imported only when needed; the knowledge base starts
+# loading in the background right after login.
+# Medicine reminders run in this process unless reminder_daemon.py already
+# schedules them for the same database.
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import sys
+import threading
 import customtkinter as ctk
 from auth import login_gui, register_gui
 from user_input import vitals_gui, sleep_gui
 from medicine import medicine_gui
 from nutrition import nutrition_gui
-from symptom_checker import symptom_checker_gui
-from report_generation import report_generation_gui  
 from tkinter import messagebox
-import threading
-import time
-import sqlite3
-import plyer
-from datetime import datetime
+from reminders import start_reminders
+from notifications import NotificationDispatcher, PlyerBackend
+
+# Must not be imported before the login window is shown
+LAZY_MODULES = ["symptom_checker", "symptom_service", "symptom_kb", "report_generation", "pandas", "numpy", "matplotlib", "fpdf"]
 
 
 user_id = None
 user_name = ""
 
 
-def reminder_loop():
-    """Checks every 60s for medicines to remind."""
-    while True:
+def open_symptom_checker(user_id):
+    from symptom_checker import symptom_checker_gui
+    symptom_checker_gui(user_id)
+
+
+def open_report_generation(user_id, user_name):
+    from report_generation import report_generation_gui
+    report_generation_gui(user_id, user_name)
+
+
+def warm_up_symptom_checker():
+    """Load the symptom checker's knowledge base off the UI thread"""
+    def load():
         try:
-            conn = sqlite3.connect("health_tracker.db")
-            cur = conn.cursor()
-            now = datetime.now().strftime("%H:%M")
-            # Get medicines for all users (or filter by logged-in user if you want)
-            cur.execute("SELECT name FROM medicine WHERE time=? AND paused=0", (now,))
-            meds = cur.fetchall()
-            conn.close()
-
-            for med in meds:
-                plyer.notification.notify(
-                    title="Medicine Reminder",
-                    message=f"Time to take {med[0]}",
-                    timeout=10
-                )
+            import symptom_service
+            symptom_service.ensure_loaded()
         except Exception as e:
-            print("Reminder error:", e)
-        time.sleep(60)
+            print("Symptom checker warm-up failed:", e)
+    threading.Thread(target=load, name="symptom-kb", daemon=True).start()
 
 
 # Dashboard after login
@@ -114,7 +126,7 @@ def show_dashboard():
     ctk.CTkButton(
         button_frame, 
         text="🔍 Symptom Checker", 
-        command=lambda: symptom_checker_gui(user_id),
+        command=lambda: open_symptom_checker(user_id),
         **button_config
     ).pack(pady=8)
     
@@ -122,7 +134,7 @@ def show_dashboard():
     ctk.CTkButton(
         button_frame, 
         text=" Generate Health Report", 
-        command=lambda: report_generation_gui(user_id, user_name),
+        command=lambda: open_report_generation(user_id, user_name),
         **button_config
     ).pack(pady=8)
 
@@ -151,6 +163,10 @@ def show_dashboard():
 # Homepage (Login/Register)
 
 def show_homepage():
+    build_homepage().mainloop()
+
+
+def build_homepage():
     home = ctk.CTk()
     screen_width = home.winfo_screenwidth()
     screen_height = home.winfo_screenheight()
@@ -203,7 +219,8 @@ def show_homepage():
                 int(age_entry.get()),
                 sex_entry.get(),
                 username_entry.get(),
-                password_entry.get()
+                password_entry.get(),
+                parent=home
             )
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid age.")
@@ -213,6 +230,7 @@ def show_homepage():
         global user_id, user_name
         user_id, user_name = login_gui(username_entry.get(), password_entry.get())
         if user_id:
+            warm_up_symptom_checker()
             home.destroy()
             show_dashboard()
 
@@ -240,11 +258,35 @@ def show_homepage():
         hover_color="#229954"
     ).pack(pady=8)
     
-    home.mainloop()
+    return home
+
+
+def check_startup():
+    """Show the login window, then report startup time and what had to load; returns 1 if a lazy module did"""
+    home = build_homepage()
+    home.update()
+    shown = time.perf_counter() - _started
+    home.destroy()
+    loaded = [name for name in LAZY_MODULES if name in sys.modules]
+    print(f"login window shown after {shown:.3f}s")
+    print(f"modules loaded: {len(sys.modules)}")
+    if loaded:
+        print("Loaded before login:", ", ".join(loaded))
+        return 1
+    print("Symptom knowledge base not loaded")
+    return 0
 
 
 # Main Entry
 
 if __name__ == "__main__":
-    threading.Thread(target=reminder_loop, daemon=True).start()
+    parser = argparse.ArgumentParser(description="Healthcare Assistant")
+    parser.add_argument("--check-startup", action="store_true",
+                        help="show the login window, check the symptom knowledge base was not loaded, and exit")
+    if parser.parse_args().check_startup:
+        raise SystemExit(check_startup())
+    dispatcher = NotificationDispatcher([PlyerBackend()]).start()
+    if start_reminders(dispatcher.submit) is None:
+        dispatcher.stop()
+        print("Reminder daemon running; leaving medicine reminders to it")
     show_homepage()
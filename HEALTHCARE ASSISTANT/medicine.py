@@ -1,44 +1,65 @@
-import sqlite3
 import customtkinter as ctk
 from tkinter import messagebox
+import database
+import recurrence
+import timeutil
+from database import connect, MEDICINE_FOR_USER_SQL
+from db_writer import when_done
 
 def add_medicine(user_id):
     global name_entry, time_entry
     name = name_entry.get().strip()
     time = time_entry.get().strip()
+    schedule_type = schedule_menu.get()
+    days = days_entry.get().strip() or None
+    repeat_every = repeat_entry.get().strip() or None
+    start_date = start_entry.get().strip() or None
+    end_date = end_entry.get().strip() or None
 
     if not name or not time:
         messagebox.showerror("Error", "Please fill all fields.")
         return
 
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    # Use the columns from database.py schema
-    cur.execute("""
-        INSERT INTO medicine (user_id, name, time, paused) 
-        VALUES (?, ?, ?, 0)
-    """, (user_id, name, time))
-    conn.commit()
-    conn.close()
+    try:
+        if repeat_every is not None:
+            repeat_every = int(repeat_every)
+        recurrence.compile_rule(schedule_type, time, days, repeat_every,
+                                timeutil.to_day(start_date) if start_date else None,
+                                timeutil.to_day(end_date) if end_date else None)
+    except ValueError as e:
+        messagebox.showerror("Error", f"Invalid schedule: {e}")
+        return
 
-    messagebox.showinfo("Success", f"Medicine '{name}' added for {time}.")
-    name_entry.delete(0, 'end')
-    time_entry.delete(0, 'end')
-    view_medicines(user_id)
+    future = database.add_medicine(user_id, name, time, schedule_type, days, repeat_every, start_date, end_date)
+
+    def confirm(f):
+        if f.exception() is not None:
+            messagebox.showerror("Error", f"Could not add medicine: {f.exception()}")
+            return
+        messagebox.showinfo("Success", f"Medicine '{name}' added for {time}.")
+        view_medicines(user_id)
+
+    for entry in (name_entry, time_entry, days_entry, repeat_entry, start_entry, end_entry):
+        entry.delete(0, 'end')
+    when_done(list_frame, future, confirm)
 
 def view_medicines(user_id):
     global list_frame
     for widget in list_frame.winfo_children():
         widget.destroy()
 
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, time, paused FROM medicine WHERE user_id=?", (user_id,))
+    conn, cur = connect(user_id)
+    cur.execute(MEDICINE_FOR_USER_SQL, (user_id,))
     rows = cur.fetchall()
     conn.close()
+    adherence = database.get_adherence(user_id)
 
-    for rid, (med_id, name, time, paused) in enumerate(rows):
-        ctk.CTkLabel(list_frame, text=f"{name} at {time}").grid(row=rid, column=0, padx=10, pady=5)
+    for rid, (med_id, name, time, paused, *schedule) in enumerate(rows):
+        try:
+            when = recurrence.compile_rule(schedule[0], time, *schedule[1:]).description
+        except ValueError:
+            when = f"at {time}"
+        ctk.CTkLabel(list_frame, text=f"{name}: {when}").grid(row=rid, column=0, padx=10, pady=5)
 
         ctk.CTkButton(list_frame, text="Delete", width=80, 
                       command=lambda i=med_id: delete_medicine(i, user_id)).grid(row=rid, column=1, padx=5)
@@ -50,24 +71,41 @@ def view_medicines(user_id):
             ctk.CTkButton(list_frame, text="Resume", width=80, fg_color="green",
                           command=lambda i=med_id: toggle_pause(i, False, user_id)).grid(row=rid, column=2, padx=5)
 
+        ctk.CTkButton(list_frame, text="Taken", width=70, fg_color="#27AE60",
+                      command=lambda i=med_id: record_dose(i, "taken", user_id)).grid(row=rid, column=3, padx=5)
+        ctk.CTkButton(list_frame, text="Skip", width=70, fg_color="gray",
+                      command=lambda i=med_id: record_dose(i, "skipped", user_id)).grid(row=rid, column=4, padx=5)
+        ctk.CTkLabel(list_frame, text=adherence_text(adherence.get(med_id, {}))).grid(row=rid, column=5, padx=10)
+
+def adherence_text(windows):
+    """'7d 86% | 30d 90%' from database.get_adherence() values for one medicine"""
+    parts = []
+    for days in (7, 30):
+        rate = windows.get(days, {}).get("rate")
+        parts.append(f"{days}d {rate * 100:.0f}%" if rate is not None else f"{days}d -")
+    return " | ".join(parts)
+
+def record_dose(med_id, status, user_id):
+    future = database.record_dose(user_id, med_id, status)
+
+    def confirm(f):
+        if f.exception() is not None:
+            messagebox.showerror("Error", f"Could not record dose: {f.exception()}")
+        view_medicines(user_id)
+
+    when_done(list_frame, future, confirm)
+
 def delete_medicine(med_id, user_id):
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    cur.execute("DELETE FROM medicine WHERE id=?", (med_id,))
-    conn.commit()
-    conn.close()
-    view_medicines(user_id)
+    future = database.delete_medicine(med_id, user_id)
+    when_done(list_frame, future, lambda f: view_medicines(user_id))
 
 def toggle_pause(med_id, pause, user_id):
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    cur.execute("UPDATE medicine SET paused=? WHERE id=?", (1 if pause else 0, med_id))
-    conn.commit()
-    conn.close()
-    view_medicines(user_id)
+    future = database.set_medicine_paused(med_id, pause, user_id)
+    when_done(list_frame, future, lambda f: view_medicines(user_id))
 
 def medicine_gui(user_id):
     global name_entry, time_entry, list_frame
+    global schedule_menu, days_entry, repeat_entry, start_entry, end_entry
     # REMOVED init_medicine_table() - table is created in database.py
 
     med_win = ctk.CTkToplevel()
@@ -80,12 +118,33 @@ def medicine_gui(user_id):
     name_entry = ctk.CTkEntry(med_win, width=300)
     name_entry.pack()
 
-    ctk.CTkLabel(med_win, text="Time (HH:MM 24hr)").pack(pady=5)
+    ctk.CTkLabel(med_win, text="Time (HH:MM 24hr, comma-separated for several doses)").pack(pady=5)
     time_entry = ctk.CTkEntry(med_win, width=300)
     time_entry.pack()
 
+    ctk.CTkLabel(med_win, text="Repeat").pack(pady=5)
+    schedule_menu = ctk.CTkOptionMenu(med_win, values=recurrence.SCHEDULE_TYPES, width=300)
+    schedule_menu.set("daily")
+    schedule_menu.pack()
+
+    ctk.CTkLabel(med_win, text="Weekdays (e.g. Mon,Wed,Fri - for weekdays)").pack(pady=5)
+    days_entry = ctk.CTkEntry(med_win, width=300)
+    days_entry.pack()
+
+    ctk.CTkLabel(med_win, text="Every N (hours or days - for every_n_hours / every_n_days)").pack(pady=5)
+    repeat_entry = ctk.CTkEntry(med_win, width=300)
+    repeat_entry.pack()
+
+    ctk.CTkLabel(med_win, text="Course start / end (YYYY-MM-DD, optional)").pack(pady=5)
+    course_frame = ctk.CTkFrame(med_win, fg_color="transparent")
+    course_frame.pack()
+    start_entry = ctk.CTkEntry(course_frame, width=145)
+    start_entry.grid(row=0, column=0, padx=5)
+    end_entry = ctk.CTkEntry(course_frame, width=145)
+    end_entry.grid(row=0, column=1, padx=5)
+
     ctk.CTkButton(med_win, text="Add Medicine", command=lambda: add_medicine(user_id)).pack(pady=10)
 
-    list_frame = ctk.CTkScrollableFrame(med_win, width=450, height=200)
+    list_frame = ctk.CTkScrollableFrame(med_win, width=850, height=200)
     list_frame.pack(pady=10)
     view_medicines(user_id)
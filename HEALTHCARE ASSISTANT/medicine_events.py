@@ -0,0 +1,39 @@
+# medicine_events.py
+# In-process notifications for medicine changes.
+#
+# database.py publishes a MedicineChange once a medicine write has been
+# committed; the reminder scheduler subscribes and patches its schedule
+# instead of re-reading the medicine table.
+import threading
+from collections import namedtuple
+
+# kind: "added", "updated" or "deleted"
+# row: (name, time, schedule_type, days, repeat_every, start_day, end_day, paused),
+#      None for a deletion read back from the change log (reminders.py)
+MedicineChange = namedtuple("MedicineChange", ["kind", "user_id", "med_id", "row"])
+
+_subscribers = []
+_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Call callback(change) for every published change; returns a function that unsubscribes"""
+    with _lock:
+        _subscribers.append(callback)
+
+    def unsubscribe():
+        with _lock:
+            if callback in _subscribers:
+                _subscribers.remove(callback)
+    return unsubscribe
+
+
+def publish(change):
+    """Deliver change to every subscriber on the calling thread"""
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(change)
+        except Exception as e:
+            print("Medicine change handler error:", e)
@@ -0,0 +1,472 @@
+# migrations.py
+# Ordered schema migrations, tracked with SQLite's PRAGMA user_version.
+# Add new steps to the end of MIGRATIONS; never edit one that has shipped.
+
+
+def create_core_tables(cur):
+    """Create every table the app uses (no-op on databases that already have them)"""
+    # Users table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            age INTEGER,
+            sex TEXT,
+            username TEXT UNIQUE,
+            password TEXT
+        )
+    """)
+
+    # Daily vitals table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vitals(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date TEXT,
+            sleep_hours REAL,
+            bp_systolic INTEGER,
+            bp_diastolic INTEGER,
+            sugar REAL,
+            weight REAL,
+            pulse INTEGER,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    """)
+
+    # Medicine table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS medicine(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            name TEXT,
+            type TEXT,
+            dosage TEXT,
+            schedule_type TEXT,
+            days TEXT,
+            time TEXT,
+            paused INTEGER DEFAULT 0,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    """)
+
+    # Symptom table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS symptom_checks(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date TEXT,
+            symptoms TEXT,
+            top_diseases TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    """)
+
+    # Nutrition log table
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS nutrition_log(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            date TEXT,
+            foods TEXT,
+            quantities TEXT,
+            calories REAL,
+            protein REAL,
+            carbohydrates REAL,
+            fat REAL,
+            fiber REAL,
+            vitamins REAL,
+            sugar REAL,
+            sodium REAL,
+            cholesterol REAL,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    """)
+
+
+def upgrade_nutrition_log(cur):
+    """Add the columns older builds of nutrition.py created nutrition_log without"""
+    cur.execute("PRAGMA table_info(nutrition_log)")
+    columns = {row[1] for row in cur.fetchall()}
+
+    missing = [("quantities", "TEXT")] + [
+        (column, "REAL") for column in ["fiber", "vitamins", "sugar", "sodium", "cholesterol"]
+    ]
+    for column, column_type in missing:
+        if column not in columns:
+            cur.execute(f"ALTER TABLE nutrition_log ADD COLUMN {column} {column_type}")
+
+
+def create_user_indexes(cur):
+    """Composite indexes matching the per-user lookups in database.PLANNED_QUERIES"""
+    # Report date ranges and the one-row-per-day lookup in save_sleep()
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_vitals_user_date ON vitals(user_id, date)")
+    # Symptom history, newest first
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_symptom_checks_user_date ON symptom_checks(user_id, date)")
+    # Reminder lookups by time; covers the medicine name so the table is never touched
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_medicine_time_paused ON medicine(time, paused, name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_medicine_user ON medicine(user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_nutrition_log_user_date ON nutrition_log(user_id, date)")
+
+
+# Metrics kept in vitals_rollup; "readings" counts rows so reports can show record totals
+ROLLUP_METRICS = ["readings", "sleep_hours", "bp_systolic", "bp_diastolic", "sugar", "weight", "pulse"]
+
+
+def _metric_value(row, metric):
+    return "1" if metric == "readings" else f"{row}.{metric}"
+
+
+def _rollup_add_sql(day_column, week_of):
+    """Trigger statement folding NEW into its day and week buckets"""
+    values = "\n              UNION ALL ".join(
+        f"SELECT '{m}' AS metric, {_metric_value('NEW', m)} AS value" for m in ROLLUP_METRICS
+    )
+    return f"""
+        INSERT INTO vitals_rollup(user_id, grain, bucket, metric, n, total, total_sq, min_value, max_value)
+        SELECT NEW.user_id, g.grain, g.bucket, m.metric, 1, m.value, m.value * m.value, m.value, m.value
+        FROM (SELECT 'day' AS grain, NEW.{day_column} AS bucket
+              UNION ALL SELECT 'week', {week_of(f'NEW.{day_column}')}) AS g,
+             ({values}) AS m
+        WHERE m.value IS NOT NULL AND NEW.{day_column} IS NOT NULL
+        ON CONFLICT(user_id, grain, bucket, metric) DO UPDATE SET
+            n = n + 1,
+            total = total + excluded.total,
+            total_sq = total_sq + excluded.total_sq,
+            min_value = min(min_value, excluded.min_value),
+            max_value = max(max_value, excluded.max_value);
+    """
+
+
+def _rollup_remove_sql(day_column, week_of, week_end, archived_before=None):
+    """
+    Trigger statements taking OLD back out of its buckets. archived_before is
+    an SQL expression for the first day still in vitals; buckets starting
+    before it keep their min and max rather than rescan a partial bucket.
+    """
+    keep_bounds = f" OR bucket < {archived_before}" if archived_before else ""
+    statements = []
+    for m in ROLLUP_METRICS:
+        value = _metric_value("OLD", m)
+        column = _metric_value("vitals", m)
+        bucket_rows = f"""
+                FROM vitals
+                WHERE vitals.user_id = OLD.user_id AND {column} IS NOT NULL
+                  AND vitals.{day_column} BETWEEN vitals_rollup.bucket
+                      AND CASE vitals_rollup.grain WHEN 'day' THEN vitals_rollup.bucket
+                          ELSE {week_end('vitals_rollup.bucket')} END"""
+        # Only rescan the bucket when the removed value was its min or max
+        statements.append(f"""
+        UPDATE vitals_rollup SET
+            n = n - 1,
+            total = total - {value},
+            total_sq = total_sq - {value} * {value},
+            min_value = CASE WHEN {value} > min_value{keep_bounds} THEN min_value
+                ELSE (SELECT min({column}) {bucket_rows}) END,
+            max_value = CASE WHEN {value} < max_value{keep_bounds} THEN max_value
+                ELSE (SELECT max({column}) {bucket_rows}) END
+        WHERE {value} IS NOT NULL AND OLD.{day_column} IS NOT NULL
+          AND user_id = OLD.user_id AND metric = '{m}'
+          AND ((grain = 'day' AND bucket = OLD.{day_column})
+               OR (grain = 'week' AND bucket = {week_of(f'OLD.{day_column}')}));
+        """)
+    statements.append("DELETE FROM vitals_rollup WHERE user_id = OLD.user_id AND n <= 0;")
+    return "".join(statements)
+
+
+def _install_rollups(cur, bucket_type, day_column, week_of, week_end):
+    """Create vitals_rollup with its triggers and backfill it from vitals"""
+    cur.execute(f"""
+        CREATE TABLE vitals_rollup(
+            user_id INTEGER,
+            grain TEXT,
+            bucket {bucket_type},
+            metric TEXT,
+            n INTEGER,
+            total REAL,
+            total_sq REAL,
+            min_value REAL,
+            max_value REAL,
+            PRIMARY KEY(user_id, grain, bucket, metric)
+        ) WITHOUT ROWID
+    """)
+
+    add_sql = _rollup_add_sql(day_column, week_of)
+    remove_sql = _rollup_remove_sql(day_column, week_of, week_end)
+    cur.execute(f"CREATE TRIGGER vitals_rollup_insert AFTER INSERT ON vitals BEGIN {add_sql} END")
+    cur.execute(f"CREATE TRIGGER vitals_rollup_delete AFTER DELETE ON vitals BEGIN {remove_sql} END")
+    cur.execute(f"CREATE TRIGGER vitals_rollup_update AFTER UPDATE ON vitals BEGIN {remove_sql} {add_sql} END")
+
+    # Backfill from existing history
+    for grain, bucket in [("day", day_column), ("week", week_of(day_column))]:
+        for m in ROLLUP_METRICS:
+            value = _metric_value("vitals", m)
+            cur.execute(f"""
+                INSERT INTO vitals_rollup(user_id, grain, bucket, metric, n, total, total_sq, min_value, max_value)
+                SELECT user_id, '{grain}', {bucket}, '{m}',
+                       count(*), total({value}), total({value} * {value}), min({value}), max({value})
+                FROM vitals
+                WHERE {value} IS NOT NULL AND {day_column} IS NOT NULL
+                GROUP BY user_id, {bucket}
+            """)
+
+
+def create_vitals_rollups(cur):
+    """Per-user daily and ISO-weekly aggregates of vitals, maintained by triggers"""
+    def week_of(date_expr):
+        # Monday of the ISO week containing date_expr
+        return f"date({date_expr}, 'weekday 0', '-6 days')"
+
+    def week_end(bucket_expr):
+        return f"date({bucket_expr}, '+6 days')"
+
+    _install_rollups(cur, "TEXT", "date", week_of, week_end)
+
+
+def _epoch_day(date_expr):
+    # Day number (days since 1970-01-01) of a TEXT date or timestamp
+    return f"CAST(julianday(substr({date_expr}, 1, 10)) - 2440587.5 AS INTEGER)"
+
+
+def _week_of_day(day_expr):
+    # Monday of the ISO week containing a day number (1970-01-01 was a Thursday)
+    return f"({day_expr} - ({day_expr} + 3) % 7)"
+
+
+def _week_end_day(bucket_expr):
+    return f"({bucket_expr} + 6)"
+
+
+def add_integer_timestamps(cur):
+    """
+    Integer day/epoch columns for range scans and ordering (see timeutil.py).
+    The TEXT date columns stay as a human-readable copy.
+    """
+    cur.execute("ALTER TABLE vitals ADD COLUMN day INTEGER")
+    cur.execute(f"UPDATE vitals SET day = {_epoch_day('date')} WHERE date IS NOT NULL")
+    cur.execute("ALTER TABLE nutrition_log ADD COLUMN day INTEGER")
+    cur.execute(f"UPDATE nutrition_log SET day = {_epoch_day('date')} WHERE date IS NOT NULL")
+    # Stored local times become UTC epoch seconds
+    cur.execute("ALTER TABLE symptom_checks ADD COLUMN checked_at INTEGER")
+    cur.execute("""
+        UPDATE symptom_checks SET checked_at = CAST(strftime('%s', date, 'utc') AS INTEGER)
+        WHERE date IS NOT NULL
+    """)
+
+    # Writers that only set the TEXT column still get the integer one
+    for table, column, expr in [
+        ("vitals", "day", _epoch_day("NEW.date")),
+        ("nutrition_log", "day", _epoch_day("NEW.date")),
+        ("symptom_checks", "checked_at", "CAST(strftime('%s', NEW.date, 'utc') AS INTEGER)"),
+    ]:
+        cur.execute(f"""
+            CREATE TRIGGER {table}_fill_{column} AFTER INSERT ON {table}
+            WHEN NEW.{column} IS NULL AND NEW.date IS NOT NULL
+            BEGIN UPDATE {table} SET {column} = {expr} WHERE id = NEW.id; END
+        """)
+
+    cur.execute("DROP INDEX IF EXISTS idx_vitals_user_date")
+    cur.execute("DROP INDEX IF EXISTS idx_symptom_checks_user_date")
+    cur.execute("DROP INDEX IF EXISTS idx_nutrition_log_user_date")
+    cur.execute("CREATE INDEX idx_vitals_user_day ON vitals(user_id, day)")
+    cur.execute("CREATE INDEX idx_symptom_checks_user_time ON symptom_checks(user_id, checked_at)")
+    cur.execute("CREATE INDEX idx_nutrition_log_user_day ON nutrition_log(user_id, day)")
+
+    # Rebuild the rollups keyed on day numbers; weeks are keyed by their Monday
+    cur.execute("DROP TRIGGER vitals_rollup_insert")
+    cur.execute("DROP TRIGGER vitals_rollup_delete")
+    cur.execute("DROP TRIGGER vitals_rollup_update")
+    cur.execute("DROP TABLE vitals_rollup")
+    _install_rollups(cur, "INTEGER", "day", _week_of_day, _week_end_day)
+
+
+def add_archive_support(cur):
+    """
+    Bookkeeping for archive.py: how far back each table has been moved to
+    the cold store, and a switch that keeps rollups intact while it deletes
+    archived rows (reports still read them from vitals_rollup).
+    """
+    cur.execute("""
+        CREATE TABLE archive_watermark(
+            table_name TEXT PRIMARY KEY,
+            before_value INTEGER
+        )
+    """)
+    # Rows only exist inside an archival transaction
+    cur.execute("CREATE TABLE rollup_hold(reason TEXT)")
+
+    cur.execute("DROP TRIGGER vitals_rollup_delete")
+    remove_sql = _rollup_remove_sql("day", _week_of_day, _week_end_day)
+    cur.execute(f"""
+        CREATE TRIGGER vitals_rollup_delete AFTER DELETE ON vitals
+        WHEN NOT EXISTS (SELECT 1 FROM rollup_hold)
+        BEGIN {remove_sql} END
+    """)
+
+
+def add_medicine_recurrence(cur):
+    """Columns for recurrence.py schedules; schedule_type and days already exist"""
+    cur.execute("ALTER TABLE medicine ADD COLUMN repeat_every INTEGER")
+    cur.execute("ALTER TABLE medicine ADD COLUMN start_day INTEGER")
+    cur.execute("ALTER TABLE medicine ADD COLUMN end_day INTEGER")
+    cur.execute("UPDATE medicine SET schedule_type = 'daily' WHERE schedule_type IS NULL OR schedule_type = ''")
+
+
+DOSE_STATUSES = ["taken", "skipped", "missed"]
+
+
+def _adherence_delta_sql(row, sign):
+    """Trigger statement adding (sign=1) or removing (sign=-1) row's status in adherence_daily"""
+    counts = ", ".join(f"{sign} * ({row}.status = '{status}')" for status in DOSE_STATUSES)
+    updates = ", ".join(f"{status} = {status} + excluded.{status}" for status in DOSE_STATUSES)
+    sql = f"""
+        INSERT INTO adherence_daily(user_id, medicine_id, day, {', '.join(DOSE_STATUSES)})
+        SELECT {row}.user_id, {row}.medicine_id, {row}.day, {counts}
+        WHERE {row}.status IN ({', '.join(f"'{s}'" for s in DOSE_STATUSES)})
+        ON CONFLICT(user_id, medicine_id, day) DO UPDATE SET {updates};
+    """
+    if sign < 0:
+        sql += f"""
+        DELETE FROM adherence_daily
+        WHERE user_id = {row}.user_id AND medicine_id = {row}.medicine_id AND day = {row}.day
+          AND taken = 0 AND skipped = 0 AND missed = 0;
+        """
+    return sql
+
+
+def create_adherence_tables(cur):
+    """
+    dose_events: one row per scheduled dose, pending until taken, skipped or missed.
+    adherence_daily: per-user, per-medicine, per-day counts kept by triggers, so
+    7- and 30-day adherence sums at most 30 rows per medicine.
+    """
+    cur.execute("""
+        CREATE TABLE dose_events(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            medicine_id INTEGER,
+            due_at INTEGER,
+            day INTEGER,
+            status TEXT,
+            recorded_at INTEGER,
+            UNIQUE(medicine_id, due_at)
+        )
+    """)
+    # Sweeping pending doses into "missed"
+    cur.execute("CREATE INDEX idx_dose_events_status_due ON dose_events(status, due_at)")
+    cur.execute("""
+        CREATE TABLE adherence_daily(
+            user_id INTEGER,
+            medicine_id INTEGER,
+            day INTEGER,
+            taken INTEGER,
+            skipped INTEGER,
+            missed INTEGER,
+            PRIMARY KEY(user_id, medicine_id, day)
+        ) WITHOUT ROWID
+    """)
+    add_sql = _adherence_delta_sql("NEW", 1)
+    remove_sql = _adherence_delta_sql("OLD", -1)
+    cur.execute(f"CREATE TRIGGER adherence_insert AFTER INSERT ON dose_events BEGIN {add_sql} END")
+    cur.execute(f"CREATE TRIGGER adherence_delete AFTER DELETE ON dose_events BEGIN {remove_sql} END")
+    cur.execute(f"""
+        CREATE TRIGGER adherence_update AFTER UPDATE OF status, day ON dose_events
+        BEGIN {remove_sql} {add_sql} END
+    """)
+
+
+def index_cross_user_queries(cur):
+    """
+    Indexes for the queries that read across users: active medicines for the
+    reminder scheduler and rows old enough for archive.py. The time lookup
+    index served the old per-minute reminder poll and is no longer used.
+    """
+    cur.execute("DROP INDEX IF EXISTS idx_medicine_time_paused")
+    cur.execute("CREATE INDEX idx_medicine_paused ON medicine(paused)")
+    cur.execute("CREATE INDEX idx_vitals_day ON vitals(day)")
+    cur.execute("CREATE INDEX idx_symptom_checks_time ON symptom_checks(checked_at)")
+
+
+def keep_archived_rollup_bounds(cur):
+    """
+    Removing a bucket's min or max rescans vitals for the new one, but rows
+    archive.py moved to the cold store are no longer there to be found.
+    Buckets reaching back past the vitals watermark keep their bounds, and
+    reports read those days' exact values through database.get_vitals().
+    """
+    watermark = "IFNULL((SELECT before_value FROM archive_watermark WHERE table_name = 'vitals'), bucket)"
+    add_sql = _rollup_add_sql("day", _week_of_day)
+    remove_sql = _rollup_remove_sql("day", _week_of_day, _week_end_day, archived_before=watermark)
+    cur.execute("DROP TRIGGER vitals_rollup_delete")
+    cur.execute("DROP TRIGGER vitals_rollup_update")
+    cur.execute(f"""
+        CREATE TRIGGER vitals_rollup_delete AFTER DELETE ON vitals
+        WHEN NOT EXISTS (SELECT 1 FROM rollup_hold)
+        BEGIN {remove_sql} END
+    """)
+    cur.execute(f"CREATE TRIGGER vitals_rollup_update AFTER UPDATE ON vitals BEGIN {remove_sql} {add_sql} END")
+
+
+def create_medicine_change_log(cur):
+    """
+    Sequence-numbered log of medicine writes, kept in the catalog, so a
+    reminder scheduler in another process (reminder_daemon.py) can follow
+    them. AUTOINCREMENT keeps seq from being reused after old rows are pruned.
+    """
+    cur.execute("""
+        CREATE TABLE medicine_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            medicine_id INTEGER NOT NULL,
+            changed_at INTEGER NOT NULL
+        )
+    """)
+
+
+# (version, description, step) - each step receives a cursor inside the migration transaction
+MIGRATIONS = [
+    (1, "Create core tables", create_core_tables),
+    (2, "Add missing nutrition_log columns", upgrade_nutrition_log),
+    (3, "Add per-user lookup indexes", create_user_indexes),
+    (4, "Add incrementally maintained vitals rollups", create_vitals_rollups),
+    (5, "Store dates as integer days and epoch seconds", add_integer_timestamps),
+    (6, "Add archive watermarks and rollup hold", add_archive_support),
+    (7, "Add medicine recurrence columns", add_medicine_recurrence),
+    (8, "Add dose events and daily adherence counters", create_adherence_tables),
+    (9, "Index cross-user medicine and archival queries", index_cross_user_queries),
+    (10, "Keep rollup bounds of archived buckets", keep_archived_rollup_bounds),
+    (11, "Add the medicine change log", create_medicine_change_log),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    """Return the schema version recorded in the database file"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Apply all pending migrations atomically in a single transaction.
+    Returns the schema version the database is at afterwards.
+    """
+    version = get_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    # Take the write lock up front so two processes starting together
+    # cannot both apply the same steps
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = get_version(conn)
+        cur = conn.cursor()
+        for step_version, description, step in MIGRATIONS:
+            if step_version > version:
+                step(cur)
+        cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return SCHEMA_VERSION
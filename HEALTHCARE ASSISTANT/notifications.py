@@ -0,0 +1,238 @@
+# notifications.py
+# Delivers reminders off the scheduler thread.
+#
+# NotificationDispatcher keeps a bounded queue of pending notifications and
+# one worker thread. Medicines due at the same instant for the same user are
+# merged into one notification, and each backend call runs with a timeout so
+# a hung backend cannot hold up later reminders.
+#
+#   python notifications.py --burst 500    # dispatch a burst to an in-memory backend
+import argparse
+import collections
+import datetime
+import queue
+import threading
+import time
+
+TITLE = "Medicine Reminder"
+MAX_QUEUE = 1000       # distinct (user, instant) notifications waiting at most
+CALL_TIMEOUT = 5.0     # seconds a backend call may take
+MAX_IN_FLIGHT = 4      # unfinished (e.g. hung) calls per backend before new ones fail fast
+LATENCY_SAMPLES = 1000
+STOP_POLL = 0.5        # seconds the worker waits on an empty queue before checking for stop()
+
+
+class PlyerBackend:
+    """Desktop notifications through plyer"""
+    name = "plyer"
+
+    def __init__(self, timeout=10):
+        from plyer import notification
+        self._notification = notification
+        self._timeout = timeout
+
+    def send(self, title, message):
+        self._notification.notify(title=title, message=message, timeout=self._timeout)
+
+
+class LogFileBackend:
+    """Appends one line per notification to a text file"""
+    name = "logfile"
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+
+    def send(self, title, message):
+        stamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write(f"{stamp}\t{title}\t{message}\n")
+
+
+class MemoryBackend:
+    """Keeps (title, message) pairs in a list; delay simulates a slow backend"""
+    name = "memory"
+
+    def __init__(self, delay=0.0):
+        self.sent = []
+        self.delay = delay
+
+    def send(self, title, message):
+        if self.delay:
+            time.sleep(self.delay)
+        self.sent.append((title, message))
+
+
+def format_message(names):
+    """'Time to take A', 'Time to take A and B', 'Time to take A, B and C'"""
+    if len(names) == 1:
+        return f"Time to take {names[0]}"
+    return f"Time to take {', '.join(names[:-1])} and {names[-1]}"
+
+
+class NotificationDispatcher:
+    """
+    submit() never blocks. A notification for a (user_id, due_at) pair that is
+    still queued absorbs later medicines for the same pair instead of taking
+    another queue slot; when the queue is full new notifications are dropped
+    and counted.
+    """
+
+    def __init__(self, backends, max_queue=MAX_QUEUE, call_timeout=CALL_TIMEOUT):
+        self._backends = list(backends)
+        self._call_timeout = call_timeout
+        self._queue = queue.Queue(max_queue)
+        self._pending = {}  # (user_id, due_at) -> [names, first submit time]
+        self._delivering = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = {id(backend): threading.BoundedSemaphore(MAX_IN_FLIGHT) for backend in self._backends}
+        self._stopping = threading.Event()
+        self._thread = None
+        self._started_at = None
+        self._counters = collections.Counter()
+        self._latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Deliver what is queued, then stop the worker"""
+        self._stopping.set()
+        try:
+            # Wakes the worker at once; behind a full queue it sees _stopping once the queue drains
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, user_id, name, due_at=None):
+        """Queue a reminder for name; merged with others for the same user and due_at"""
+        key = (user_id, due_at if due_at is not None else time.time())
+        with self._lock:
+            self._counters["submitted"] += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending[0].append(name)
+                self._counters["coalesced"] += 1
+                return
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self._counters["dropped"] += 1
+                print(f"Notification queue full, dropped reminder for {name}")
+                return
+            self._pending[key] = [[name], time.perf_counter()]
+
+    def wait_idle(self, timeout=None):
+        """Block until every queued notification has been handled; returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending and not self._delivering, timeout)
+
+    def stats(self):
+        """Counters plus delivery throughput and submit-to-delivery latency"""
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = sorted(self._latencies)
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        for counter in ["submitted", "coalesced", "dropped", "notifications", "delivered", "failed", "timeouts"]:
+            stats.setdefault(counter, 0)
+        stats["queued"] = self._queue.qsize()
+        stats["delivered_per_second"] = stats["delivered"] / elapsed if elapsed else 0.0
+        if latencies:
+            stats["latency_avg_ms"] = sum(latencies) / len(latencies) * 1000
+            stats["latency_p95_ms"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            stats["latency_max_ms"] = latencies[-1] * 1000
+        return stats
+
+    def _run(self):
+        while True:
+            try:
+                key = self._queue.get(timeout=STOP_POLL)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+            if key is None:
+                return
+            with self._lock:
+                # Names submitted from now on start a new notification
+                names, submitted = self._pending.pop(key)
+                self._delivering += 1
+            message = format_message(names)
+            # Backends run side by side and share one deadline
+            calls = [(backend, self._start_call(backend, message)) for backend in self._backends]
+            deadline = time.perf_counter() + self._call_timeout
+            for backend, call in calls:
+                self._finish_call(backend, call, deadline)
+            with self._idle:
+                self._delivering -= 1
+                self._counters["notifications"] += 1
+                self._latencies.append(time.perf_counter() - submitted)
+                self._idle.notify_all()
+
+    def _start_call(self, backend, message):
+        """Run backend.send on a helper thread; returns (done event, outcome) or None if it is stuck"""
+        in_flight = self._in_flight[id(backend)]
+        if not in_flight.acquire(blocking=False):
+            return None
+        done = threading.Event()
+        outcome = {}
+
+        def call():
+            try:
+                backend.send(TITLE, message)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                in_flight.release()
+                done.set()
+
+        threading.Thread(target=call, name=f"notify-{backend.name}", daemon=True).start()
+        return done, outcome
+
+    def _finish_call(self, backend, call, deadline):
+        if call is None:
+            self._count("timeouts")
+            print(f"Notification backend {backend.name} is not responding")
+            return
+        done, outcome = call
+        if not done.wait(max(0.0, deadline - time.perf_counter())):
+            self._count("timeouts")
+            print(f"Notification backend {backend.name} timed out")
+        elif "error" in outcome:
+            self._count("failed")
+            print(f"Notification backend {backend.name} failed: {outcome['error']}")
+        else:
+            self._count("delivered")
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dispatch a burst of reminders to an in-memory backend")
+    parser.add_argument("--burst", type=int, default=500, help="reminders submitted at once")
+    parser.add_argument("--users", type=int, default=100, help="users they are spread over")
+    parser.add_argument("--delay", type=float, default=0.001, help="seconds each backend call takes")
+    args = parser.parse_args(argv)
+
+    backend = MemoryBackend(args.delay)
+    dispatcher = NotificationDispatcher([backend]).start()
+    due_at = time.time()
+    for i in range(args.burst):
+        dispatcher.submit(i % args.users, f"medicine {i}", due_at)
+    dispatcher.wait_idle()
+    dispatcher.stop()
+    for name, value in dispatcher.stats().items():
+        print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    return 0 if len(backend.sent) == min(args.burst, args.users) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,7 +2,6 @@ import os
 import csv
 import customtkinter as ctk
 from tkinter import messagebox, scrolledtext
-from database import connect
 import datetime
 import re
 import json
@@ -184,72 +183,9 @@ def find_similar_foods(search_term, limit=10):
     
     return matches[:limit]
 
-def setup_database():
-    """Setup or update the database table as needed"""
-    try:
-        conn, cur = connect()
-        
-        # Check if table exists
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='nutrition_log'")
-        table_exists = cur.fetchone() is not None
-        
-        if table_exists:
-            # Check if quantities column exists
-            cur.execute("PRAGMA table_info(nutrition_log)")
-            columns = [column[1] for column in cur.fetchall()]
-            
-            if "quantities" not in columns:
-                print("Adding missing 'quantities' column to nutrition_log table")
-                cur.execute("ALTER TABLE nutrition_log ADD COLUMN quantities TEXT")
-                conn.commit()
-            
-            # Check if other required columns exist
-            required_columns = ["fiber", "vitamins", "sugar", "sodium", "cholesterol"]
-            for column in required_columns:
-                if column not in columns:
-                    print(f"Adding missing '{column}' column to nutrition_log table")
-                    cur.execute(f"ALTER TABLE nutrition_log ADD COLUMN {column} REAL")
-                    conn.commit()
-        else:
-            # Create the table with all required columns
-            print("Creating nutrition_log table")
-            cur.execute("""
-                CREATE TABLE nutrition_log(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER,
-                    date TEXT,
-                    foods TEXT,
-                    quantities TEXT,
-                    calories REAL,
-                    protein REAL,
-                    carbohydrates REAL,
-                    fat REAL,
-                    fiber REAL,
-                    vitamins REAL,
-                    sugar REAL,
-                    sodium REAL,
-                    cholesterol REAL,
-                    FOREIGN KEY(user_id) REFERENCES users(id)
-                )
-            """)
-            conn.commit()
-        
-        conn.close()
-        print("Database table setup completed successfully")
-        return True
-    except Exception as e:
-        print(f"Error setting up database: {e}")
-        traceback.print_exc()
-        return False
-
 def nutrition_gui(user_id):
     print(f"Opening nutrition GUI for user {user_id}")
     print(f"Loaded {len(nutrition_data)} food items")
-    
-    # Setup or update database
-    if not setup_database():
-        messagebox.showerror("Database Error", "Failed to setup database table")
-        return
 
     # Create the main window
     win = ctk.CTkToplevel()
@@ -0,0 +1,136 @@
+# recurrence.py
+# Medicine schedules (the medicine table's schedule_type, days, repeat_every,
+# time, start_day and end_day columns) compiled into repeating timelines.
+#
+#   daily          every day at each of the times in `time` ("08:00,20:00")
+#   weekdays       on the weekdays listed in `days` ("mon,wed,fri")
+#   every_n_days   every repeat_every days, counted from start_day
+#   every_n_hours  every repeat_every hours, starting at the (single) time on start_day
+#
+# The interval rules need a start_day to count from; database.add_medicine
+# uses the day the medicine is added when none is given.
+#
+# Any rule can be limited to a course with start_day/end_day (inclusive day
+# numbers, see timeutil.py). Times are local wall-clock times, so a dose at
+# 08:00 stays at 08:00 across daylight-saving changes.
+import bisect
+import datetime
+import math
+import timeutil
+
+SCHEDULE_TYPES = ["daily", "weekdays", "every_n_days", "every_n_hours"]
+INTERVAL_TYPES = ["every_n_days", "every_n_hours"]  # counted from start_day
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+MINUTES_PER_DAY = 24 * 60
+MONDAY = 4  # day number of 1970-01-05, the first Monday; anchors weekday cycles
+
+
+def parse_times(text):
+    """'08:00, 20:00' -> sorted minutes after midnight; raises ValueError"""
+    minutes = set()
+    for part in str(text or "").split(","):
+        if part.strip():
+            moment = datetime.datetime.strptime(part.strip(), "%H:%M")
+            minutes.add(moment.hour * 60 + moment.minute)
+    if not minutes:
+        raise ValueError("at least one time (HH:MM) is required")
+    return sorted(minutes)
+
+
+def parse_weekdays(text):
+    """'Mon, wed,FRI' -> sorted weekday indexes (Monday=0); raises ValueError"""
+    days = set()
+    for part in str(text or "").split(","):
+        name = part.strip().lower()[:3]
+        if not name:
+            continue
+        if name not in WEEKDAYS:
+            raise ValueError(f"unknown weekday '{part.strip()}'")
+        days.add(WEEKDAYS.index(name))
+    if not days:
+        raise ValueError("at least one weekday is required")
+    return sorted(days)
+
+
+class Rule:
+    """
+    A schedule expanded into sorted minute offsets within one repeating cycle
+    of cycle minutes that starts at day number anchor. next_after() finds the
+    next dose with one bisect, whatever the number of doses per cycle.
+    """
+
+    def __init__(self, anchor, cycle, offsets, start_day=None, end_day=None, description="", first_minute=None):
+        self.anchor = anchor
+        self.cycle = cycle
+        self.offsets = offsets
+        self.end_day = end_day
+        self.description = description
+        # Earliest wall-clock minute a dose may fall on
+        if first_minute is None and start_day is not None:
+            first_minute = start_day * MINUTES_PER_DAY
+        self.first_minute = first_minute
+
+    def next_after(self, after):
+        """Epoch seconds of the first dose strictly later than epoch after, or None once the course is over"""
+        moment = datetime.datetime.fromtimestamp(after)
+        minute = timeutil.to_day(moment) * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+        if self.first_minute is not None:
+            minute = max(minute, self.first_minute - 1)
+
+        cycles, offset = divmod(minute - self.anchor * MINUTES_PER_DAY, self.cycle)
+        i = bisect.bisect_right(self.offsets, offset)
+        if i == len(self.offsets):
+            cycles, i = cycles + 1, 0
+        wall = self.anchor * MINUTES_PER_DAY + cycles * self.cycle + self.offsets[i]
+
+        day, minute_of_day = divmod(wall, MINUTES_PER_DAY)
+        if self.end_day is not None and day > self.end_day:
+            return None
+        at = datetime.time(minute_of_day // 60, minute_of_day % 60)
+        return datetime.datetime.combine(timeutil.from_day(day), at).timestamp()
+
+
+def compile_rule(schedule_type, time_text, days=None, repeat_every=None, start_day=None, end_day=None):
+    """Build a Rule from medicine columns; raises ValueError for an invalid schedule"""
+    schedule_type = schedule_type or "daily"
+    times = parse_times(time_text)
+    if start_day is not None and end_day is not None and end_day < start_day:
+        raise ValueError("the course ends before it starts")
+    course = ""
+    if start_day is not None or end_day is not None:
+        course = (f" from {timeutil.format_day(start_day) if start_day is not None else 'now'}"
+                  f" until {timeutil.format_day(end_day) if end_day is not None else 'further notice'}")
+    at_text = ", ".join(f"{m // 60:02d}:{m % 60:02d}" for m in times)
+
+    if schedule_type == "daily":
+        return Rule(0, MINUTES_PER_DAY, times, start_day, end_day, f"Daily at {at_text}{course}")
+
+    if schedule_type == "weekdays":
+        weekdays = parse_weekdays(days)
+        offsets = [d * MINUTES_PER_DAY + m for d in weekdays for m in times]
+        names = ", ".join(WEEKDAYS[d].title() for d in weekdays)
+        return Rule(MONDAY, 7 * MINUTES_PER_DAY, offsets, start_day, end_day, f"{names} at {at_text}{course}")
+
+    if not repeat_every or int(repeat_every) < 1:
+        raise ValueError(f"{schedule_type} needs a repeat interval of at least 1")
+    n = int(repeat_every)
+    anchor = start_day if start_day is not None else 0
+
+    if schedule_type == "every_n_days":
+        return Rule(anchor, n * MINUTES_PER_DAY, times, start_day, end_day,
+                    f"Every {n} days at {at_text}{course}")
+
+    if schedule_type == "every_n_hours":
+        if len(times) > 1:
+            raise ValueError("every_n_hours takes one starting time")
+        # Doses repeat exactly every n hours from the first time; the pattern
+        # of wall-clock times repeats every lcm(n hours, 1 day)
+        step = n * 60
+        cycle = step * MINUTES_PER_DAY // math.gcd(step, MINUTES_PER_DAY)
+        offsets = list(range(times[0], times[0] + cycle, step))
+        offsets = sorted(o % cycle for o in offsets)
+        return Rule(anchor, cycle, offsets, start_day, end_day,
+                    f"Every {n} hours from {at_text}{course}",
+                    first_minute=anchor * MINUTES_PER_DAY + times[0])
+
+    raise ValueError(f"unknown schedule type '{schedule_type}'")
@@ -0,0 +1,131 @@
+# reminder_daemon.py
+# Medicine reminders without the GUI, for running as a background service.
+#
+#   python -m reminder_daemon                      # desktop notifications via plyer
+#   python -m reminder_daemon --backend log --log-file reminders.log
+#   python -m reminder_daemon --check-budget       # verify the footprint budget and exit
+#
+# Run it from the directory holding health_tracker.db (or pass --data-dir).
+# It imports only the scheduler, the storage layer and the notification
+# backends; customtkinter, matplotlib, pandas, numpy and fpdf are never
+# loaded. Only one process schedules reminders for a database (see
+# reminders.start_reminders()): the daemon exits if the app or another
+# daemon already does, and the app leaves them to a running daemon.
+# Medicines edited in the app reach the daemon through the medicine change
+# log within reminders.CHANGE_POLL seconds.
+#
+# Budget (checked by --check-budget, measured after the schedule is loaded):
+#   startup  STARTUP_BUDGET seconds from the first line of this module
+#   memory   RSS_BUDGET_MB peak resident set size
+import time
+
+_started = time.perf_counter()
+
+import argparse
+import os
+import signal
+import sys
+import threading
+
+STARTUP_BUDGET = 1.0
+RSS_BUDGET_MB = 40
+HEAVY_MODULES = ["customtkinter", "tkinter", "matplotlib", "pandas", "numpy", "fpdf"]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read"""
+    # Linux keeps ru_maxrss across exec, so a daemon started from a large
+    # process would report its parent's peak; VmHWM starts afresh
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def check_budget(startup_seconds):
+    """Print the footprint against the budget; returns the list of violations"""
+    problems = []
+    rss = peak_rss_mb()
+    heavy = sorted(name for name in HEAVY_MODULES if name in sys.modules)
+    print(f"startup: {startup_seconds:.3f}s (budget {STARTUP_BUDGET}s)")
+    print(f"peak RSS: {'unknown' if rss is None else f'{rss:.1f} MB'} (budget {RSS_BUDGET_MB} MB)")
+    print(f"modules loaded: {len(sys.modules)}")
+    if startup_seconds > STARTUP_BUDGET:
+        problems.append(f"startup took {startup_seconds:.3f}s")
+    if rss is not None and rss > RSS_BUDGET_MB:
+        problems.append(f"peak RSS {rss:.1f} MB")
+    if heavy:
+        problems.append(f"heavy modules imported: {', '.join(heavy)}")
+    return problems
+
+
+def make_backend(args):
+    from notifications import LogFileBackend, PlyerBackend
+    if args.backend == "log":
+        return LogFileBackend(args.log_file)
+    return PlyerBackend()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run medicine reminders without the GUI")
+    parser.add_argument("--backend", choices=["plyer", "log"], default="plyer", help="where reminders go")
+    parser.add_argument("--log-file", default="reminders.log", help="file for --backend log")
+    parser.add_argument("--data-dir", help="directory holding health_tracker.db (default: current)")
+    parser.add_argument("--check-budget", action="store_true",
+                        help="start up, report startup time and memory against the budget, and exit")
+    args = parser.parse_args(argv)
+
+    if args.data_dir:
+        os.chdir(args.data_dir)
+
+    from notifications import NotificationDispatcher
+    from reminders import start_reminders
+
+    dispatcher = NotificationDispatcher([make_backend(args)]).start()
+    scheduler = start_reminders(dispatcher.submit, follow_log=True)
+    if scheduler is None:
+        dispatcher.stop()
+        print("Reminders are already running for this database (the app or another daemon)")
+        return 1
+    startup_seconds = time.perf_counter() - _started
+
+    if args.check_budget:
+        scheduler.stop()
+        dispatcher.stop()
+        problems = check_budget(startup_seconds)
+        for problem in problems:
+            print("Over budget:", problem)
+        return 1 if problems else 0
+
+    next_due = scheduler.next_due()
+    if next_due:
+        fire_at, user_id, name = next_due
+        print(f"Reminder daemon running; next: {name} at {time.strftime('%Y-%m-%d %H:%M', time.localtime(fire_at))}")
+    else:
+        print("Reminder daemon running; no active medicines yet")
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    while not stopping.wait(1.0):
+        pass
+
+    scheduler.stop()
+    dispatcher.stop(timeout=5)
+    import database
+    database.flush_writes(5)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1 +1,287 @@
+# reminders.py
+# Medicine reminder scheduler.
+#
+# Active medicines are read once into a min-heap keyed by their next fire
+# time. The scheduler thread sleeps until the earliest one is due (or until
+# the schedule changes) instead of polling the database every minute, and
+# each next occurrence is computed from the scheduled time, so it never drifts.
+# Later edits patch single entries through medicine_events. A scheduler in
+# a process that does not make the edits itself (reminder_daemon.py) follows
+# the catalog's medicine change log instead, checked every CHANGE_POLL
+# seconds.
+#
+# Only one process per database schedules reminders: start_reminders() takes
+# DAEMON_LOCK next to the database and does nothing if another process, the
+# app or the daemon, already holds it.
+import heapq
+import itertools
+import os
+import threading
+import time
+import medicine_events
+import recurrence
+import database
+from database import iter_data_connections, MEDICINE_ACTIVE_SQL
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAX_SLEEP = 300      # seconds; re-check the clock at least this often (suspend, clock changes)
+MISSED_GRACE = 1800  # seconds; a reminder missed by more than this is skipped, not fired late
+CHANGE_POLL = 5      # seconds between checks of the medicine change log
+DAEMON_LOCK = "reminder_daemon.lock"
+
+
+def compile_row(name, med_time, schedule_type=None, days=None, repeat_every=None, start_day=None, end_day=None):
+    """recurrence.Rule for a medicine row, or None (with a message) if its schedule is invalid"""
+    try:
+        return recurrence.compile_rule(schedule_type, med_time, days, repeat_every, start_day, end_day)
+    except (TypeError, ValueError) as e:
+        print(f"Reminder skipped for {name}: {e}")
+        return None
+
+
+def load_active_medicines():
+    """(key, user_id, name, rule) for every unpaused medicine in every data file"""
+    rows = []
+    for conn in iter_data_connections():
+        for med_id, user_id, name, *schedule in conn.execute(MEDICINE_ACTIVE_SQL):
+            rows.append(((user_id, med_id), user_id, name, compile_row(name, *schedule)))
+    return rows
+
+
+def load_medicine_changes(after_seq):
+    """
+    (last seq, changes) for the change log entries after after_seq, each a
+    medicine_events.MedicineChange with the medicine's current row (row None
+    if it was deleted). changes is None if the log was pruned past after_seq.
+    """
+    logged = database.get_medicine_changes(after_seq)
+    if not logged:
+        return after_seq, []
+    if logged[0][0] != after_seq + 1:
+        return logged[-1][0], None
+    changes = []
+    for seq, user_id, med_id in logged:
+        row = database.get_medicine_row(user_id, med_id)
+        if row is None:
+            changes.append(medicine_events.MedicineChange("deleted", user_id, med_id, None))
+        else:
+            changes.append(medicine_events.MedicineChange("updated", user_id, med_id, tuple(row[1:])))
+    return logged[-1][0], changes
+
+
+class ReminderScheduler:
+    """
+    Fires notify(user_id, name, due_at) when a medicine is due; due_at is the
+    scheduled epoch time, shared by every medicine due at that instant.
+    Entries are keyed by (user_id, medicine id). Heap items are never removed
+    in place; an item is skipped when it no longer matches its entry.
+    """
+
+    def __init__(self, notify, load=load_active_medicines, clock=time.time, record=None,
+                 follow_log=False, changes=load_medicine_changes, change_seq=database.get_medicine_change_seq):
+        self._notify = notify
+        self._record = record  # record(user_id, med_id, due_at) for adherence tracking
+        self._load = load
+        self._changes = changes
+        self._change_seq = change_seq
+        self._follow_log = follow_log
+        self._seq = 0          # last change log entry applied
+        self._next_poll = 0 if follow_log else float("inf")
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._heap = []
+        self._entries = {}  # key -> (user_id, name, recurrence.Rule, fire_at)
+        self._counter = itertools.count()
+        self._thread = None
+        self._stopped = False
+        self._unsubscribe = None
+        self.lock = None       # DAEMON_LOCK file, released by stop()
+
+    def start(self):
+        """Load the schedule, follow medicine changes and start the scheduler thread"""
+        # Subscribe first so nothing committed during the load is missed;
+        # applying a change twice is harmless
+        self._unsubscribe = medicine_events.subscribe(self.apply_change)
+        self.reload()
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self.lock is not None:
+            self.lock.close()
+            self.lock = None
+
+    def apply_change(self, change):
+        """Patch one medicine's entry from a medicine_events.MedicineChange"""
+        key = (change.user_id, change.med_id)
+        rule = None
+        if change.kind != "deleted":
+            name, med_time, *schedule, paused = change.row
+            if not paused:
+                rule = compile_row(name, med_time, *schedule)
+        now = self._clock()
+        with self._cond:
+            # Any heap item left behind no longer matches its entry and is skipped
+            self._entries.pop(key, None)
+            if rule is not None:
+                self._schedule(key, change.user_id, name, rule, now)
+            self._cond.notify_all()
+
+    def reload(self):
+        """Re-read every active medicine and wake the scheduler"""
+        # Read the log position first; entries logged during the load are applied again
+        seq = self._change_seq() if self._follow_log else 0
+        rows = self._load()
+        self._seq = seq
+        now = self._clock()
+        with self._cond:
+            self._heap = []
+            self._entries = {}
+            for key, user_id, name, rule in rows:
+                self._schedule(key, user_id, name, rule, now)
+            self._cond.notify_all()
+
+    def follow_changes(self):
+        """Apply the medicine change log entries written since the last check"""
+        try:
+            seq, changes = self._changes(self._seq)
+        except Exception as e:
+            print("Medicine change log error:", e)
+            return
+        if changes is None:
+            self.reload()
+            return
+        for change in changes:
+            self.apply_change(change)
+        self._seq = seq
+
+    def next_due(self):
+        """(fire_at, user_id, name) of the earliest pending reminder, or None"""
+        with self._cond:
+            self._drop_stale()
+            if not self._heap:
+                return None
+            fire_at, seq, key = self._heap[0]
+            user_id, name, rule, _ = self._entries[key]
+            return fire_at, user_id, name
+
+    def _schedule(self, key, user_id, name, rule, now):
+        fire_at = rule.next_after(now) if rule is not None else None
+        if fire_at is None:
+            # Invalid schedule or a finished course
+            self._entries.pop(key, None)
+            return
+        self._entries[key] = (user_id, name, rule, fire_at)
+        heapq.heappush(self._heap, (fire_at, next(self._counter), key))
+
+    def _drop_stale(self):
+        while self._heap:
+            fire_at, seq, key = self._heap[0]
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] == fire_at:
+                return
+            heapq.heappop(self._heap)
+
+    def _pop_due(self, now):
+        """Remove due items, rescheduling each from its own fire time; returns those to notify"""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            fire_at, seq, key = heapq.heappop(self._heap)
+            user_id, name, rule, _ = self._entries[key]
+            if now - fire_at <= MISSED_GRACE:
+                due.append((key, user_id, name, fire_at))
+            self._schedule(key, user_id, name, rule, max(fire_at, now))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    now = self._clock()
+                    due = self._pop_due(now)
+                    polling = now >= self._next_poll
+                    if due or polling:
+                        break
+                    delay = self._heap[0][0] - now if self._heap else MAX_SLEEP
+                    self._cond.wait(min(delay, self._next_poll - now, MAX_SLEEP))
+
+            if polling:
+                self._next_poll = now + CHANGE_POLL
+                self.follow_changes()
+
+            # Notify outside the lock so a slow notification never blocks reschedules
+            for key, user_id, name, fire_at in due:
+                try:
+                    if self._record is not None:
+                        self._record(user_id, key[1], fire_at)
+                    self._notify(user_id, name, fire_at)
+                except Exception as e:
+                    print("Reminder error:", e)
+
+
+def daemon_lock_path():
+    """DAEMON_LOCK in the directory holding database.DB_PATH"""
+    return os.path.join(os.path.dirname(os.path.abspath(database.DB_PATH)), DAEMON_LOCK)
+
+
+def _try_lock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def hold_daemon_lock():
+    """
+    Lock DAEMON_LOCK for as long as the returned file stays open, or return
+    None if another process holds it. The lock dies with the process, so a
+    crashed scheduler never blocks the next one.
+    """
+    f = open(daemon_lock_path(), "a+")
+    if not _try_lock(f):
+        f.close()
+        return None
+    f.truncate(0)
+    f.write(str(os.getpid()))
+    f.flush()
+    return f
+
+
+_scheduler = None
+
+
+def start_reminders(notify, follow_log=False):
+    """
+    Start the process-wide scheduler, logging each due dose for adherence;
+    returns it, or None if another process already schedules reminders for
+    this database. follow_log: also apply medicine edits made by other
+    processes, for a process that does not make them itself.
+    """
+    global _scheduler
+    lock = hold_daemon_lock()
+    if lock is None:
+        return None
+    _scheduler = ReminderScheduler(notify, record=database.record_dose_due, follow_log=follow_log)
+    _scheduler.lock = lock
+    _scheduler.start()
+    return _scheduler
 
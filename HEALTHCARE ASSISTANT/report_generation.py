@@ -1,107 +1,13 @@
-import sqlite3
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import datetime
-from datetime import timedelta
 from fpdf import FPDF
 import os
-
-
-STANDARD_VITALS = {
-    "bp_systolic": {"min": 90, "max": 120, "unit": "mmHg", "name": "Blood Pressure (Systolic)", "color": "#E74C3C"},
-    "bp_diastolic": {"min": 60, "max": 80, "unit": "mmHg", "name": "Blood Pressure (Diastolic)", "color": "#9B59B6"},
-    "sugar": {"min": 70, "max": 140, "unit": "mg/dL", "name": "Blood Sugar", "color": "#3498DB"},
-    "pulse": {"min": 60, "max": 100, "unit": "bpm", "name": "Pulse Rate", "color": "#E67E22"}
-}
-
-
-def get_vitals_data(user_id, period="weekly"):
-    """
-    Fetch vitals data from database for specified period
-    period: 'weekly' or 'monthly'
-    """
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    
-    # Calculate date range
-    today = datetime.date.today()
-    if period == "weekly":
-        start_date = today - timedelta(days=7)
-    else:  # monthly
-        start_date = today - timedelta(days=30)
-    
-    cur.execute("""
-        SELECT date, bp_systolic, bp_diastolic, sugar, weight, pulse, sleep_hours
-        FROM vitals
-        WHERE user_id=? AND date >= ?
-        ORDER BY date ASC
-    """, (user_id, start_date.isoformat()))
-    
-    data = cur.fetchall()
-    conn.close()
-    
-    return data
-
-
-def analyze_vitals(data):
-    """
-    Analyze vitals data and compare with standards
-    Returns analysis dictionary with averages and status
-    """
-    if not data:
-        return None
-    
-    analysis = {
-        "count": len(data),
-        "vitals": {}
-    }
-    
-    # Calculate averages and status for each vital
-    vitals_columns = {
-        "bp_systolic": 1,
-        "bp_diastolic": 2,
-        "sugar": 3,
-        "weight": 4,
-        "pulse": 5,
-        "sleep_hours": 6
-    }
-    
-    for vital_name, col_idx in vitals_columns.items():
-        values = [row[col_idx] for row in data if row[col_idx] is not None]
-        
-        if values:
-            avg_value = sum(values) / len(values)
-            
-            # Determine status
-            if vital_name in STANDARD_VITALS:
-                std = STANDARD_VITALS[vital_name]
-                if avg_value < std["min"]:
-                    status = "Low"
-                    color = "orange"
-                elif avg_value > std["max"]:
-                    status = "High"
-                    color = "red"
-                else:
-                    status = "Normal"
-                    color = "green"
-            else:
-                status = "Recorded"
-                color = "blue"
-            
-            analysis["vitals"][vital_name] = {
-                "average": avg_value,
-                "min": min(values),
-                "max": max(values),
-                "status": status,
-                "color": color,
-                "values": values,
-                "dates": [row[0] for row in data if row[col_idx] is not None]
-            }
-    
-    return analysis
+from vital_standards import STANDARD_VITALS
+from vitals_analysis import get_vitals_data, analyze_vitals
 
 
 def generate_report_pdf(user_id, user_name, period, analysis, save_path):
@@ -207,17 +113,8 @@ def create_vitals_graphs(analysis, period):
         if not dates or not values:
             continue
         
-        # Convert dates to readable format
-        date_labels = []
-        for d in dates:
-            if "-" in d:
-                parts = d.split("-")
-                if len(parts) == 3:
-                    date_labels.append(f"{parts[1]}/{parts[2]}")
-                else:
-                    date_labels.append(d)
-            else:
-                date_labels.append(d)
+        # Dates arrive as datetime.date objects
+        date_labels = [d.strftime("%m/%d") for d in dates]
         
         x_positions = range(len(values))
         
@@ -1,111 +1,13 @@
-import os
-import csv
 import customtkinter as ctk
 from tkinter import messagebox
 from database import save_symptom_check, get_symptom_history
-import sqlite3
-from datetime import datetime
-import pandas as pd
-import numpy as np
 import re
+import symptom_service
+import symptom_vocab
+from symptom_service import (match_symptoms_to_diseases, normalize_symptom, parse_symptom_input,
+                             start_refinement, suggest_symptoms, warm_up)
 
-# Global variables to store cleaned data
-symptom_disease_data = {}
-disease_descriptions = {}
-disease_precautions = {}
-
-def normalize_symptom(symptom):
-    """Normalize symptom names for matching"""
-    if not symptom or pd.isna(symptom):
-        return ""
-    return symptom.strip().lower().replace(" ", "_").replace("-", "_")
-
-def normalize_disease_name(disease):
-    """Normalize disease names for consistency"""
-    if not disease or pd.isna(disease):
-        return ""
-    return disease.strip().title()
-
-def clean_and_load_data():
-    """Clean and load the dataset in memory"""
-    global symptom_disease_data, disease_descriptions, disease_precautions
-    
-    # Load main symptom-disease dataset
-    symptom_file = "symptom_data/dataset.csv"
-    if not os.path.exists(symptom_file):
-        print(f"Error: Dataset file not found at {symptom_file}")
-        return
-    
-    try:
-        # Read the dataset using pandas for easier cleaning
-        df = pd.read_csv(symptom_file)
-        
-        # Remove rows with missing disease names
-        df = df.dropna(subset=['Disease'])
-        
-        # Normalize disease names
-        df['Disease'] = df['Disease'].apply(normalize_disease_name)
-        
-        # Process symptom columns
-        for i in range(1, 18):  # symptom_1 to symptom_17
-            symptom_col = f"Symptom_{i}"
-            if symptom_col in df.columns:
-                # Normalize symptom names
-                df[symptom_col] = df[symptom_col].apply(normalize_symptom)
-        
-        # Create symptom-disease mapping
-        for _, row in df.iterrows():
-            disease = row['Disease']
-            symptoms = []
-            
-            for i in range(1, 18):
-                symptom_col = f"Symptom_{i}"
-                symptom = row[symptom_col]
-                if symptom and not pd.isna(symptom):
-                    symptoms.append(symptom)
-            
-            if symptoms:
-                symptom_disease_data[disease] = symptoms
-        
-        # Add basic descriptions for diseases that don't have them
-        for disease in symptom_disease_data.keys():
-            if disease not in disease_descriptions:
-                disease_descriptions[disease] = f"A medical condition characterized by symptoms such as {', '.join(symptom_disease_data[disease][:3])}."
-        
-        # Add basic precautions for diseases that don't have them
-        for disease in symptom_disease_data.keys():
-            if disease not in disease_precautions:
-                disease_precautions[disease] = [
-                    "Consult a healthcare professional for proper diagnosis",
-                    "Follow prescribed treatment plan",
-                    "Get adequate rest",
-                    "Maintain a healthy lifestyle"
-                ]
-        
-        print(f"Successfully loaded {len(symptom_disease_data)} diseases with symptoms")
-        print(f"Added descriptions for {len(disease_descriptions)} diseases")
-        print(f"Added precautions for {len(disease_precautions)} diseases")
-        
-    except Exception as e:
-        print(f"Error loading and cleaning dataset: {e}")
-
-def match_symptoms_to_diseases(user_symptoms):
-    """
-    Match user symptoms to potential diseases
-    Returns list of (disease, match_percentage, matched_symptoms_count)
-    """
-    user_symptoms_normalized = [normalize_symptom(s) for s in user_symptoms]
-    matches = []
-    
-    for disease, disease_symptoms in symptom_disease_data.items():
-        matched = sum(1 for s in user_symptoms_normalized if s in disease_symptoms)
-        if matched > 0:
-            match_percentage = (matched / len(user_symptoms_normalized)) * 100
-            matches.append((disease, match_percentage, matched))
-    
-    # Sort by match percentage (descending) and number of matched symptoms
-    matches.sort(key=lambda x: (x[1], x[2]), reverse=True)
-    return matches
+RESULTS_SHOWN = 5
 
 def symptom_checker_gui(user_id):
     """Main GUI for symptom checker"""
@@ -117,15 +19,16 @@ def symptom_checker_gui(user_id):
             messagebox.showerror("Error", "Please enter at least one symptom.")
             return
         
-        # Parse symptoms (comma or newline separated)
-        user_symptoms = [s.strip() for s in symptoms_input.replace("\n", ",").split(",") if s.strip()]
+        # Parse symptoms (comma or newline separated, or free text)
+        parsed = parse_symptom_input(symptoms_input)
+        user_symptoms = [symptom for _, symptom in parsed]
         
         if not user_symptoms:
             messagebox.showerror("Error", "Please enter valid symptoms.")
             return
         
         # Match symptoms
-        matches = match_symptoms_to_diseases(user_symptoms)
+        matches = match_symptoms_to_diseases(user_symptoms, RESULTS_SHOWN)
         
         if not matches:
             messagebox.showinfo("No Match", "No diseases found matching your symptoms.\n\nPlease consult a healthcare professional.")
@@ -134,10 +37,13 @@ def symptom_checker_gui(user_id):
         # Save to database
         save_symptom_check(user_id, user_symptoms, matches)
         
+        # Typed text that was read as a different known symptom
+        corrections = [(typed, symptom) for typed, symptom in parsed if normalize_symptom(typed) != normalize_symptom(symptom)]
+        
         # Show results
-        show_results(user_symptoms, matches)
+        show_results(user_symptoms, matches, corrections)
     
-    def show_results(symptoms, matches):
+    def show_results(symptoms, matches, corrections=()):
         result_win = ctk.CTkToplevel()
         result_win.title("Symptom Check Results")
         screen_width =  result_win .winfo_screenwidth()
@@ -158,12 +64,21 @@ def symptom_checker_gui(user_id):
             wraplength=550
         ).pack(pady=5, padx=10)
         
+        if corrections:
+            ctk.CTkLabel(
+                result_win, 
+                text="Read as: " + ", ".join(f"{typed} → {meant}" for typed, meant in corrections), 
+                font=("Arial", 11),
+                text_color="gray",
+                wraplength=550
+            ).pack(pady=2, padx=10)
+        
         # Scrollable frame for results
         scroll_frame = ctk.CTkScrollableFrame(result_win, width=550, height=500)
         scroll_frame.pack(pady=10, padx=10, fill="both", expand=True)
         
         # Show top 5 matches
-        top_matches = matches[:5]
+        top_matches = matches[:RESULTS_SHOWN]
         
         for idx, (disease, match_percent, matched_count) in enumerate(top_matches, 1):
             # Disease frame
@@ -185,19 +100,19 @@ def symptom_checker_gui(user_id):
             ).pack(anchor="w", padx=10)
             
             # Description
-            if disease in disease_descriptions:
+            if disease in symptom_service.disease_descriptions:
                 ctk.CTkLabel(
                     disease_frame,
-                    text=f"Description: {disease_descriptions[disease]}",
+                    text=f"Description: {symptom_service.disease_descriptions[disease]}",
                     font=("Arial", 11),
                     wraplength=500,
                     justify="left"
                 ).pack(anchor="w", padx=10, pady=5)
             
             # Precautions
-            if disease in disease_precautions:
+            if disease in symptom_service.disease_precautions:
                 precautions_text = "Precautions:\n" + "\n".join(
-                    [f"• {p}" for p in disease_precautions[disease]]
+                    [f"• {p}" for p in symptom_service.disease_precautions[disease]]
                 )
                 ctk.CTkLabel(
                     disease_frame,
@@ -227,6 +142,13 @@ def symptom_checker_gui(user_id):
             justify="center"
         ).pack(pady=5, padx=10)
         
+        ctk.CTkButton(
+            result_win, 
+            text="Refine with Questions", 
+            command=lambda: refine_results(symptoms),
+            width=200
+        ).pack(pady=5)
+        
         ctk.CTkButton(
             result_win, 
             text="Close", 
@@ -234,6 +156,79 @@ def symptom_checker_gui(user_id):
             width=200
         ).pack(pady=10)
     
+    def refine_results(symptoms):
+        """Ask the most informative yes/no symptom questions, re-ranking after each answer"""
+        session = start_refinement(symptoms)
+        if session is None:
+            messagebox.showerror("Error", "The symptom knowledge base could not be loaded.")
+            return
+        current = {"symptom": None}
+        
+        refine_win = ctk.CTkToplevel()
+        refine_win.title("Refine Results")
+        refine_win.geometry("650x550")
+        
+        ctk.CTkLabel(
+            refine_win, 
+            text="Answer a few questions to narrow down the results", 
+            font=("Arial", 16, "bold")
+        ).pack(pady=15)
+        
+        question_label = ctk.CTkLabel(refine_win, text="", font=("Arial", 15), wraplength=600)
+        question_label.pack(pady=10)
+        
+        answer_frame = ctk.CTkFrame(refine_win, fg_color="transparent")
+        answer_frame.pack(pady=10)
+        
+        ranking_label = ctk.CTkLabel(refine_win, text="", font=("Arial", 12), justify="left")
+        ranking_label.pack(pady=10, padx=20, anchor="w")
+        
+        def show_next():
+            ranking_label.configure(text="Most likely now:\n" + "\n".join(
+                f"{i}. {symptom_service.knowledge_base.diseases[d]} ({p:.0%})"
+                for i, (d, p) in enumerate(session.ranking(RESULTS_SHOWN), 1)
+            ))
+            question = session.next_question()
+            if question is None:
+                current["symptom"] = None
+                question_label.configure(text="No further questions would change the results much.")
+                for button in answer_frame.winfo_children():
+                    button.configure(state="disabled")
+                return
+            current["symptom"] = question[0]
+            question_label.configure(
+                text=f"Do you have {symptom_vocab.display_name(symptom_service.knowledge_base.symptoms[question[0]])}?"
+            )
+        
+        def answer(present):
+            if current["symptom"] is not None:
+                session.answer(current["symptom"], present)
+                show_next()
+        
+        for text, present in [("Yes", True), ("No", False), ("Not sure", None)]:
+            ctk.CTkButton(
+                answer_frame, 
+                text=text, 
+                command=lambda present=present: answer(present),
+                width=120
+            ).pack(side="left", padx=8)
+        
+        ctk.CTkLabel(
+            refine_win,
+            text="This is NOT a medical diagnosis. Please consult a qualified healthcare professional.",
+            font=("Arial", 10),
+            text_color="gray"
+        ).pack(pady=5)
+        
+        ctk.CTkButton(
+            refine_win, 
+            text="Close", 
+            command=refine_win.destroy,
+            width=200
+        ).pack(pady=10)
+        
+        show_next()
+    
     # Main window
     win = ctk.CTkToplevel()
     win.title("Symptom Checker")
@@ -250,13 +245,13 @@ def symptom_checker_gui(user_id):
     
     ctk.CTkLabel(
         win, 
-        text="Enter your symptoms (separated by commas or new lines)", 
+        text="Describe your symptoms, or list them separated by commas or new lines", 
         font=("Arial", 14)
     ).pack(pady=10)
     
     ctk.CTkLabel(
         win, 
-        text="Examples: fever, headache, cough, fatigue", 
+        text="Examples: fever, headache, cough, fatigue  or  I've had a high fever and joint pain since Monday", 
         font=("Arial", 11),
         text_color="gray"
     ).pack(pady=5)
@@ -265,6 +260,40 @@ def symptom_checker_gui(user_id):
     symptom_entry = ctk.CTkTextbox(win, width=480, height=150, font=("Arial", 13))
     symptom_entry.pack(pady=10, padx=20)
     
+    # Autocomplete for the symptom being typed
+    suggestion_frame = ctk.CTkFrame(win, fg_color="transparent")
+    suggestion_frame.pack(pady=2)
+    
+    def current_fragment():
+        return re.split(r"[,\n]", symptom_entry.get("1.0", "end-1c"))[-1]
+    
+    def apply_suggestion(symptom):
+        text = symptom_entry.get("1.0", "end-1c")
+        kept = text[:len(text) - len(current_fragment())]
+        if kept.endswith(","):
+            kept += " "
+        symptom_entry.delete("1.0", "end")
+        symptom_entry.insert("1.0", f"{kept}{symptom_vocab.display_name(symptom)}, ")
+        symptom_entry.focus_set()
+        show_suggestions()
+    
+    def show_suggestions(event=None):
+        for widget in suggestion_frame.winfo_children():
+            widget.destroy()
+        for symptom in suggest_symptoms(current_fragment().strip(), 6):
+            ctk.CTkButton(
+                suggestion_frame,
+                text=symptom_vocab.display_name(symptom),
+                command=lambda s=symptom: apply_suggestion(s),
+                width=120,
+                height=28,
+                font=("Arial", 11)
+            ).pack(side="left", padx=3)
+    
+    symptom_entry.bind("<KeyRelease>", show_suggestions)
+    # Suggestions need the knowledge base; start loading it if login has not already
+    warm_up()
+    
     # Buttons
     button_frame = ctk.CTkFrame(win, fg_color="transparent")
     button_frame.pack(pady=15)
@@ -350,8 +379,3 @@ def view_history(user_id):
         text="Close", 
         command=history_win.destroy
     ).pack(pady=10)
-
-if not os.path.exists("symptom_data"):
-    os.makedirs("symptom_data")
-
-clean_and_load_data()
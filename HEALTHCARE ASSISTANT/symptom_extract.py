@@ -0,0 +1,113 @@
+# symptom_extract.py
+# Finds known symptoms in free text ("I've had a high fever and joint pain
+# since Monday") with an Aho-Corasick automaton.
+#
+# Text is lowercased and every run of other characters becomes one space, so
+# the automaton only needs ALPHABET. Phrases are matched as whole words by
+# padding them with a space on both sides. The automaton is compiled into a
+# dense transition table (states x ALPHABET, failure links folded in), so a
+# message is scanned in one pass with one table lookup per character,
+# whatever the number of phrases. symptom_kb.py builds it alongside the
+# knowledge base and caches the arrays with it.
+import re
+
+ALPHABET = " abcdefghijklmnopqrstuvwxyz0123456789"
+CODES = {ch: i for i, ch in enumerate(ALPHABET)}
+
+
+def normalize_text(text):
+    """'I've had a High-Fever!' -> 'i ve had a high fever'"""
+    return re.sub(r"[^a-z0-9]+", " ", str(text or "").lower()).strip()
+
+
+def build_automaton(phrases):
+    """
+    phrases: (text, symptom id) pairs. Returns the arrays extract() runs on:
+      delta           states x len(ALPHABET) next state
+      out_ptr         state s reports patterns out_pattern[out_ptr[s]:out_ptr[s + 1]]
+      out_pattern     pattern ids
+      pattern_symptom symptom id of each pattern
+      pattern_length  characters in each pattern, padding included
+    """
+    import numpy as np
+
+    goto = [{}]
+    outputs = [[]]
+    pattern_symptom, pattern_length = [], []
+    for text, symptom in phrases:
+        text = normalize_text(text)
+        if not text:
+            continue
+        state = 0
+        for ch in f" {text} ":
+            code = CODES[ch]
+            if code not in goto[state]:
+                goto[state][code] = len(goto)
+                goto.append({})
+                outputs.append([])
+            state = goto[state][code]
+        if not outputs[state]:  # the same phrase twice keeps its first symptom
+            outputs[state].append(len(pattern_symptom))
+            pattern_symptom.append(symptom)
+            pattern_length.append(len(text) + 2)
+
+    # Breadth-first, so every state's failure target is complete before it is used
+    delta = np.zeros((len(goto), len(ALPHABET)), dtype=np.int32)
+    fail = [0] * len(goto)
+    queue = []
+    for code in range(len(ALPHABET)):
+        child = goto[0].get(code)
+        if child is not None:
+            delta[0, code] = child
+            queue.append(child)
+    for state in queue:
+        outputs[state] = outputs[state] + outputs[fail[state]]
+        for code in range(len(ALPHABET)):
+            child = goto[state].get(code)
+            if child is None:
+                delta[state, code] = delta[fail[state], code]
+            else:
+                delta[state, code] = child
+                fail[child] = int(delta[fail[state], code])
+                queue.append(child)
+
+    out_ptr = np.zeros(len(goto) + 1, dtype=np.int32)
+    out_ptr[1:] = np.cumsum([len(out) for out in outputs])
+    out_pattern = np.array([p for out in outputs for p in out], dtype=np.int32)
+    return {
+        "delta": delta,
+        "out_ptr": out_ptr,
+        "out_pattern": out_pattern,
+        "pattern_symptom": np.array(pattern_symptom, dtype=np.int32),
+        "pattern_length": np.array(pattern_length, dtype=np.int32),
+    }
+
+
+def extract(automaton, text):
+    """
+    Symptom ids mentioned in text, in order of appearance, each once. Where
+    phrases overlap ("mild fever" and "fever") the leftmost, then longest wins.
+    """
+    # item() reads the (possibly memory-mapped) arrays without creating numpy scalars
+    delta = automaton["delta"].item
+    out_ptr = automaton["out_ptr"].item
+    hits = []
+    state = 0
+    for end, ch in enumerate(f" {normalize_text(text)} "):
+        state = delta(state, CODES[ch])
+        first, last = out_ptr(state), out_ptr(state + 1)
+        if first != last:
+            for p in automaton["out_pattern"][first:last].tolist():
+                # Span without the padding spaces, which neighbouring matches share
+                hits.append((end + 2 - automaton["pattern_length"].item(p), -end, p))
+
+    found = []
+    covered = 0
+    for start, negative_end, p in sorted(hits):
+        if start < covered:
+            continue
+        covered = -negative_end
+        symptom = automaton["pattern_symptom"].item(p)
+        if symptom not in found:
+            found.append(symptom)
+    return found
@@ -0,0 +1,328 @@
+# symptom_kb.py
+# The symptom knowledge base compiled from the CSVs in symptom_data/.
+#
+#   python symptom_kb.py            # compile if stale and print what was loaded
+#   python symptom_kb.py --rebuild  # compile even if the cache looks current
+#
+# Parsing the CSVs needs pandas, so the result is cached in
+# symptom_data/compiled/: one .npy file per array (loaded memory-mapped) and
+# strings.json for the names and texts. manifest.json records the size, mtime
+# and sha256 of every source file; the cache is rebuilt only when one of them
+# changes. A cache hit imports neither pandas nor csv.
+#
+# The free-text symptom extractor (symptom_extract.py) is compiled from the
+# symptom names plus the aliases in symptom_synonyms.csv and cached here too.
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import numpy as np
+import symptom_extract
+
+DATA_DIR = "symptom_data"
+SYMPTOM_FILE = "dataset symp.csv"
+DESCRIPTION_FILE = "symptom_Description.csv"
+PRECAUTION_FILE = "symptom_precaution.csv"
+SYNONYM_FILE = "symptom_synonyms.csv"
+SOURCE_FILES = [SYMPTOM_FILE, DESCRIPTION_FILE, PRECAUTION_FILE, SYNONYM_FILE]
+CACHE_DIR = "compiled"
+FORMAT_VERSION = 2
+
+# name: dtype of each cached array
+ARRAYS = {
+    "disease_ptr": np.int32,   # disease d owns entries disease_ptr[d]:disease_ptr[d + 1]
+    "symptom_ids": np.int32,   # per entry, index into symptoms
+    "frequency": np.float64,   # per entry, share of the disease's rows listing the symptom
+    "idf": np.float64,         # per symptom, log(diseases / diseases listing it) + 1
+    # Free-text extractor, see symptom_extract.build_automaton()
+    "delta": np.int32,
+    "out_ptr": np.int32,
+    "out_pattern": np.int32,
+    "pattern_symptom": np.int32,
+    "pattern_length": np.int32,
+}
+AUTOMATON_ARRAYS = ["delta", "out_ptr", "out_pattern", "pattern_symptom", "pattern_length"]
+
+
+class KnowledgeBase:
+    """
+    diseases and symptoms are name lists; each disease's symptoms are a slice
+    of symptom_ids/frequency, most frequent first. descriptions[d] is a text
+    or None, precautions[d] a (possibly empty) list.
+    """
+
+    def __init__(self, diseases, symptoms, descriptions, precautions, arrays):
+        self.diseases = diseases
+        self.symptoms = symptoms
+        self.descriptions = descriptions
+        self.precautions = precautions
+        self.disease_ptr = arrays["disease_ptr"]
+        self.symptom_ids = arrays["symptom_ids"]
+        self.frequency = arrays["frequency"]
+        self.idf = arrays["idf"]
+        self.automaton = {name: arrays[name] for name in AUTOMATON_ARRAYS}
+
+    def extract_symptoms(self, text):
+        """Symptom names mentioned in free text, in order of appearance"""
+        return [self.symptoms[i] for i in symptom_extract.extract(self.automaton, text)]
+
+    def symptom_tables(self):
+        """-> ({disease: [symptoms]}, {disease: {symptom: frequency}}, {symptom: idf})"""
+        symptom_disease_data, symptom_frequency = {}, {}
+        ptr = self.disease_ptr.tolist()
+        ids = self.symptom_ids.tolist()
+        frequency = self.frequency.tolist()
+        for d, disease in enumerate(self.diseases):
+            symptoms = [self.symptoms[i] for i in ids[ptr[d]:ptr[d + 1]]]
+            symptom_disease_data[disease] = symptoms
+            symptom_frequency[disease] = dict(zip(symptoms, frequency[ptr[d]:ptr[d + 1]]))
+        return symptom_disease_data, symptom_frequency, dict(zip(self.symptoms, self.idf.tolist()))
+
+
+def squash_disease_name(disease):
+    """Letters only, lowercased; the CSVs spell some diseases slightly differently"""
+    return re.sub(r"[^a-z]", "", disease.lower())
+
+
+def load_disease_table(path, diseases):
+    """
+    Read a Disease,... CSV into a list holding, per disease, its non-empty
+    values. Names are matched on squash_disease_name(), falling back to the
+    closest spelling (the dataset has typos like "Osteoarthristis").
+    """
+    import csv
+    import difflib
+
+    if not os.path.exists(path):
+        print(f"Warning: {path} not found")
+        return [[] for _ in diseases]
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))[1:]
+    table = {}
+    for row in rows:
+        if row and row[0].strip():
+            values = [v.strip() for v in row[1:] if v.strip() and v.strip().lower() != "null"]
+            table[squash_disease_name(row[0])] = values
+    found = []
+    for disease in diseases:
+        key = squash_disease_name(disease)
+        if key not in table:
+            close = difflib.get_close_matches(key, table, 1, 0.8)
+            key = close[0] if close else None
+        found.append(table.get(key, []))
+    return found
+
+
+def load_synonyms(path, symptom_ids):
+    """(alias, symptom id) pairs from an Alias,Symptom CSV; aliases of unknown symptoms are skipped"""
+    import csv
+
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))[1:]
+    synonyms = []
+    for row in rows:
+        if len(row) < 2 or not row[0].strip():
+            continue
+        symptom = row[1].strip().lower().replace(" ", "_").replace("-", "_")
+        if symptom not in symptom_ids:
+            print(f"Warning: synonym '{row[0].strip()}' names unknown symptom '{row[1].strip()}'")
+            continue
+        synonyms.append((row[0], symptom_ids[symptom]))
+    return synonyms
+
+
+def compile_sources(data_dir=DATA_DIR):
+    """Parse the CSVs (with pandas) into a KnowledgeBase"""
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(data_dir, SYMPTOM_FILE), dtype=str)
+
+    # Remove rows with missing disease names, normalize the rest
+    df = df.dropna(subset=['Disease'])
+    df['Disease'] = df['Disease'].str.strip().str.title()
+    df = df[df['Disease'] != ""]
+    rows_per_disease = df.groupby('Disease', sort=False).size()
+
+    # One (row, disease, symptom) line per filled Symptom_i cell, normalized
+    # like symptom_service.normalize_symptom()
+    symptom_cols = [c for c in df.columns if c.startswith("Symptom_")]
+    cells = df.melt(id_vars='Disease', value_vars=symptom_cols, value_name='Symptom', ignore_index=False)
+    cells['Symptom'] = (cells['Symptom'].str.strip().str.lower()
+                        .str.replace(" ", "_", regex=False).str.replace("-", "_", regex=False))
+    cells = cells[cells['Symptom'].notna() & (cells['Symptom'] != "")]
+    # A symptom repeated within one row counts once for that row
+    cells = cells.reset_index().drop_duplicates(subset=['index', 'Symptom'])
+
+    counts = cells.groupby(['Disease', 'Symptom'], sort=False).size().rename('rows').reset_index()
+    counts['frequency'] = counts['rows'] / counts['Disease'].map(rows_per_disease)
+    diseases_listing = counts.groupby('Symptom', sort=False).size()
+    idf = np.log(len(rows_per_disease) / diseases_listing) + 1
+
+    # Diseases keep dataset order; symptoms are most frequent first
+    listed = set(counts['Disease'])
+    diseases = [d for d in rows_per_disease.index if d in listed]
+    disease_ids = {d: i for i, d in enumerate(diseases)}
+    counts['order'] = counts['Disease'].map(disease_ids)
+    counts = counts.sort_values(['order', 'frequency'], ascending=[True, False], kind='stable')
+
+    symptoms = list(idf.index)
+    symptom_index = {s: i for i, s in enumerate(symptoms)}
+    arrays = {
+        "disease_ptr": np.r_[0, np.cumsum(np.bincount(counts['order'], minlength=len(diseases)))],
+        "symptom_ids": counts['Symptom'].map(symptom_index).to_numpy(),
+        "frequency": counts['frequency'].to_numpy(),
+        "idf": idf.to_numpy(),
+    }
+    # Symptom names first, so an alias spelled like a name never shadows it
+    phrases = [(symptom.replace("_", " "), i) for i, symptom in enumerate(symptoms)]
+    phrases += load_synonyms(os.path.join(data_dir, SYNONYM_FILE), symptom_index)
+    arrays.update(symptom_extract.build_automaton(phrases))
+    arrays = {name: np.ascontiguousarray(array, dtype=ARRAYS[name]) for name, array in arrays.items()}
+
+    descriptions = [values[0] if values else None
+                    for values in load_disease_table(os.path.join(data_dir, DESCRIPTION_FILE), diseases)]
+    precautions = load_disease_table(os.path.join(data_dir, PRECAUTION_FILE), diseases)
+    return KnowledgeBase(diseases, symptoms, descriptions, precautions, arrays)
+
+
+def file_fingerprint(path, sha256=True):
+    """{size, mtime_ns[, sha256]} of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if sha256:
+        with open(path, "rb") as f:
+            fingerprint["sha256"] = hashlib.sha256(f.read()).hexdigest()
+    return fingerprint
+
+
+def read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(cache_dir, sources):
+    path = os.path.join(cache_dir, "manifest.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "sources": sources}, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def cache_is_current(data_dir, cache_dir, manifest):
+    """
+    True if every source file matches the manifest. Size and mtime are enough
+    when they agree; otherwise the file is hashed, so a copy or checkout that
+    only touched mtimes refreshes the manifest instead of forcing a rebuild.
+    """
+    if not manifest or manifest.get("version") != FORMAT_VERSION:
+        return False
+    recorded = manifest.get("sources", {})
+    touched = {}
+    for name in SOURCE_FILES:
+        path = os.path.join(data_dir, name)
+        expected = recorded.get(name)
+        current = file_fingerprint(path, sha256=False)
+        if expected is None or current is None:
+            if expected is None and current is None and name in recorded:
+                continue  # still missing
+            return False
+        if current["size"] == expected["size"] and current["mtime_ns"] == expected["mtime_ns"]:
+            continue
+        current = file_fingerprint(path)
+        if current["sha256"] != expected["sha256"]:
+            return False
+        touched[name] = current
+    if touched:
+        try:
+            write_manifest(cache_dir, {**recorded, **touched})
+        except OSError:
+            pass
+    return True
+
+
+def save_cache(kb, data_dir=DATA_DIR):
+    """Write kb to data_dir/compiled/; the manifest goes last so a half-written cache is never trusted"""
+    cache_dir = os.path.join(data_dir, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Fingerprint before writing anything, so an edit during the build makes the cache stale
+    sources = {name: file_fingerprint(os.path.join(data_dir, name)) for name in SOURCE_FILES}
+    manifest = os.path.join(cache_dir, "manifest.json")
+    if os.path.exists(manifest):
+        os.remove(manifest)
+    for name in ARRAYS:
+        path = os.path.join(cache_dir, name + ".npy")
+        array = kb.automaton[name] if name in AUTOMATON_ARRAYS else getattr(kb, name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(path + ".tmp", path)
+    strings = {"diseases": kb.diseases, "symptoms": kb.symptoms,
+               "descriptions": kb.descriptions, "precautions": kb.precautions}
+    path = os.path.join(cache_dir, "strings.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(strings, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+    write_manifest(cache_dir, sources)
+
+
+def load_cache(cache_dir):
+    """KnowledgeBase from a compiled cache, arrays memory-mapped read-only"""
+    with open(os.path.join(cache_dir, "strings.json"), encoding="utf-8") as f:
+        strings = json.load(f)
+    arrays = {name: np.load(os.path.join(cache_dir, name + ".npy"), mmap_mode="r") for name in ARRAYS}
+    return KnowledgeBase(strings["diseases"], strings["symptoms"],
+                         strings["descriptions"], strings["precautions"], arrays)
+
+
+def load(data_dir=DATA_DIR, rebuild=False):
+    """
+    The knowledge base for data_dir, from the compiled cache when it matches
+    the source files, otherwise compiled from the CSVs and cached. Returns
+    None if the dataset is missing.
+    """
+    cache_dir = os.path.join(data_dir, CACHE_DIR)
+    if not rebuild and cache_is_current(data_dir, cache_dir, read_manifest(cache_dir)):
+        try:
+            return load_cache(cache_dir)
+        except (OSError, ValueError, KeyError) as e:
+            print("Symptom knowledge base cache unreadable, rebuilding:", e)
+
+    if not os.path.exists(os.path.join(data_dir, SYMPTOM_FILE)):
+        print(f"Error: Dataset file not found at {os.path.join(data_dir, SYMPTOM_FILE)}")
+        return None
+    kb = compile_sources(data_dir)
+    try:
+        save_cache(kb, data_dir)
+    except OSError as e:
+        print("Could not cache the symptom knowledge base:", e)
+    return kb
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the symptom knowledge base cache")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory holding the symptom CSVs")
+    parser.add_argument("--rebuild", action="store_true", help="compile even if the cache is current")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    kb = load(args.data_dir, args.rebuild)
+    if kb is None:
+        return 1
+    print(f"{len(kb.diseases)} diseases, {len(kb.symptoms)} symptoms, "
+          f"{len(kb.symptom_ids)} disease/symptom pairs, {len(kb.automaton['pattern_symptom'])} "
+          f"extractor phrases in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print("pandas imported:", "pandas" in sys.modules)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+# symptom_matrix.py
+# Disease x symptom incidence matrix for scoring many symptom sets at once.
+#
+# Ranking matches symptom_service.match_symptoms_to_diseases(): highest
+# weighted score first, then more matched symptoms, ties in knowledge-base
+# order. The matrix is stored sparse, as each symptom's list of diseases
+# (CSR), so a batch of queries only ever touches the (query, disease) pairs
+# sharing a symptom; nothing dense in diseases x symptoms or queries x
+# diseases is built.
+#
+# Top k is not picked with argpartition: that needs every query's scores as
+# one dense row. Each candidate pair instead gets one integer encoding its
+# query and its rank within it, and a single sort of those orders the whole
+# batch. On a synthetic 20k x 20k knowledge base a batch of 1024 four-symptom
+# queries has ~60k candidate pairs; gathering them takes ~4.5 ms and the sort
+# ~0.3 ms. Single queries from the GUI are still scored through
+# symptom_service's dict index, which is ~8x faster than a batch of one
+# (15 us vs 120 us on the bundled dataset) and ranks identically.
+#
+# Weights (frequency * idf) are quantized to integers so both matchers add up
+# exactly the same numbers and can never rank differently through rounding.
+#
+# Re-triage reads saved checks on its own connection but writes the new
+# results through the database writer, one job per chunk, so it never holds
+# the write lock against the GUI.
+import numpy as np
+
+BATCH_ROWS = 1024      # queries scored together
+RETRIAGE_CHUNK = 5000  # symptom_checks rows scored per call
+WEIGHT_SCALE = 10000   # quantization steps per unit of weight
+
+
+def quantize(weight):
+    """Float weight -> integer score units"""
+    return int(round(weight * WEIGHT_SCALE))
+
+
+class IncidenceMatrix:
+    """
+    diseases: names in knowledge-base order; symptoms: normalized names.
+    Symptom s is listed by diseases disease_ids[symptom_ptr[s]:symptom_ptr[s + 1]],
+    in knowledge-base order, and weights holds the quantized frequency * idf
+    of each of those pairs. idf[s] is the quantized idf, and unknown_weight
+    that of an unknown symptom.
+    """
+
+    def __init__(self, symptom_disease_data, symptom_frequency, symptom_idf):
+        self.diseases = list(symptom_disease_data)
+        self.symptoms = sorted({s for symptoms in symptom_disease_data.values() for s in symptoms})
+        self.symptom_ids = {s: i for i, s in enumerate(self.symptoms)}
+        postings = [[] for _ in self.symptoms]
+        for d, (disease, symptoms) in enumerate(symptom_disease_data.items()):
+            for s in dict.fromkeys(symptoms):
+                postings[self.symptom_ids[s]].append((d, quantize(symptom_frequency[disease][s] * symptom_idf[s])))
+        self.symptom_ptr = np.zeros(len(self.symptoms) + 1, dtype=np.int64)
+        np.cumsum([len(p) for p in postings], out=self.symptom_ptr[1:])
+        entries = [entry for p in postings for entry in p]
+        self.disease_ids = np.array([d for d, _ in entries], dtype=np.int64)
+        self.weights = np.array([w for _, w in entries], dtype=np.int64)
+        self.idf = np.array([quantize(symptom_idf[s]) for s in self.symptoms], dtype=np.int64)
+        self.unknown_weight = int(self.idf.max()) if len(self.idf) else quantize(1.0)
+
+    def encode(self, queries):
+        """
+        Normalized symptom lists -> (query index, symptom index) arrays of every
+        known symptom, in query order, plus each query's total idf. Repeated
+        symptoms count once and unknown ones only add to the total, exactly
+        like the single-query matcher.
+        """
+        rows, cols = [], []
+        totals = np.zeros(len(queries), dtype=np.int64)
+        symptom_ids = self.symptom_ids
+        for q, query in enumerate(queries):
+            for s in dict.fromkeys(query):
+                i = symptom_ids.get(s)
+                if i is not None:
+                    rows.append(q)
+                    cols.append(i)
+                    totals[q] += self.idf[i]
+                else:
+                    totals[q] += self.unknown_weight
+        return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), totals
+
+    def candidates(self, rows, cols):
+        """
+        Score encoded (query, symptom) entries against the diseases listing
+        those symptoms. Returns arrays of query index, disease index, weighted
+        score and matched symptom count, one element per pair sharing at least
+        one symptom, ordered by query then disease.
+        """
+        starts = self.symptom_ptr[cols]
+        lengths = self.symptom_ptr[cols + 1] - starts
+        entry = np.repeat(np.arange(len(cols)), lengths)
+        # Position of each posting within its symptom's list
+        offsets = np.arange(len(entry)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        postings = starts[entry] + offsets
+        n_diseases = len(self.diseases)
+        pairs, pair_of = np.unique(rows[entry] * n_diseases + self.disease_ids[postings], return_inverse=True)
+        # Integer weights; float64 sums them exactly
+        scores = np.bincount(pair_of, weights=self.weights[postings], minlength=len(pairs)).astype(np.int64)
+        matched = np.bincount(pair_of, minlength=len(pairs))
+        return pairs // n_diseases, pairs % n_diseases, scores, matched
+
+    def top_k(self, queries, k=5):
+        """For each query, up to k (disease, match_percentage, matched_count) best first"""
+        rows, cols, totals = self.encode(queries)
+        results = [[] for _ in queries]
+        if not self.diseases or k <= 0:
+            return results
+        diseases = self.diseases
+        for start in range(0, len(queries), BATCH_ROWS):
+            lo, hi = np.searchsorted(rows, [start, start + BATCH_ROWS])
+            if lo == hi:
+                continue
+            query, disease, scores, matched = self.candidates(rows[lo:hi], cols[lo:hi])
+            # Higher score wins, then higher matched, then lower disease index
+            n_diseases = len(diseases)
+            rank = (scores * (int(matched.max()) + 1) + matched) * n_diseases + (n_diseases - 1 - disease)
+            span = int(rank.max()) + 1
+            if BATCH_ROWS * span < 2 ** 63:
+                order = np.argsort((query - start) * span + (span - 1 - rank), kind="stable")
+            else:
+                order = np.lexsort((disease, -matched, -scores, query))
+            query, disease, scores, matched = query[order], disease[order], scores[order], matched[order]
+            firsts = np.flatnonzero(np.r_[True, query[1:] != query[:-1]])
+            place = np.arange(len(query)) - np.repeat(firsts, np.diff(np.r_[firsts, len(query)]))
+            keep = place < k
+            query, disease, scores, matched = query[keep], disease[keep], scores[keep], matched[keep]
+            percentages = scores / np.maximum(totals[query], 1) * 100
+            for q, d, pct, n in zip(query.tolist(), disease.tolist(), percentages.tolist(), matched.tolist()):
+                results[q].append((diseases[d], pct, n))
+        return results
+
+
+def retriage_symptom_checks(incidence, normalize, k=3, chunk_size=RETRIAGE_CHUNK):
+    """
+    Re-score every saved symptom check against the current knowledge base and
+    rewrite its top_diseases. normalize maps a stored symptom to its normalized
+    form. Returns the number of checks rewritten.
+    """
+    import database
+
+    database.flush_writes()
+    rewritten = 0
+    pending = None  # Future of the chunk the writer is updating, scored while the next is read
+    # Checks already moved to the cold store by archive.py keep their old results
+    for path, conn in database.iter_data_files():
+        last_id = 0
+        while True:
+            rows = conn.execute(database.SYMPTOM_CHECKS_AFTER_SQL, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            queries = [[normalize(s) for s in (symptoms or "").split(", ") if s.strip()] for _, symptoms in rows]
+            top = incidence.top_k(queries, k)
+            results = [(database.format_top_diseases(matches), row_id) for (row_id, _), matches in zip(rows, top)]
+            if pending is not None:
+                rewritten += pending.result()
+            pending = database.submit_write(_write_results, results, path=path)
+    if pending is not None:
+        rewritten += pending.result()
+    return rewritten
+
+
+def _write_results(conn, results):
+    import database
+
+    conn.executemany(database.SYMPTOM_CHECK_RESULTS_SQL, results)
+    return len(results)
@@ -0,0 +1,192 @@
+# symptom_refine.py
+# "Next best question" for the symptom checker: which symptom to ask about
+# so that the answer tells the most about which disease it is.
+#
+#   python symptom_refine.py --bench --diseases 3000 --symptoms 3000
+#
+# Each candidate disease d has a probability p(d). A disease answers "yes" to
+# symptom s with probability f(d, s), the share of its dataset rows listing
+# s, so an answer updates p by Bayes' rule. The next question is the symptom
+# with the highest expected information gain,
+#   H(p) - [P(yes) H(p | yes) + P(no) H(p | no)],
+# computed for every symptom at once with bincount over the knowledge base's
+# (disease, symptom, frequency) entries of the live candidates. The
+# candidates are kept as a bitset; the per-symptom bitsets of diseases
+# listing it (a "yes" keeps only those) and always showing it (a "no" drops
+# those) are precomputed, so an answer is one AND per byte of bitset.
+import argparse
+import time
+import numpy as np
+
+MAX_QUESTIONS = 10
+MIN_GAIN = 0.01       # bits; below this a question is not worth asking
+DONE_PROBABILITY = 0.9
+
+
+def _bitsets(rows, cols, n_rows, n_bits):
+    """n_rows bitsets of n_bits each (packed little-endian uint8), with bit cols[i] set in row rows[i]"""
+    bits = np.zeros((n_rows, (n_bits + 7) // 8), dtype=np.uint8)
+    np.bitwise_or.at(bits, (rows, cols >> 3), (1 << (cols & 7)).astype(np.uint8))
+    return bits
+
+
+class QuestionEngine:
+    """
+    Precomputed structures for one knowledge base, given as CSR arrays:
+    disease d owns entries disease_ptr[d]:disease_ptr[d + 1] of symptom_ids
+    and frequency. Sessions hold the per-check state.
+    """
+
+    def __init__(self, disease_ptr, symptom_ids, frequency, n_symptoms):
+        disease_ptr = np.asarray(disease_ptr, dtype=np.int64)
+        self.n_diseases = len(disease_ptr) - 1
+        self.n_symptoms = n_symptoms
+        self.entry_disease = np.repeat(np.arange(self.n_diseases), np.diff(disease_ptr))
+        self.entry_symptom = np.asarray(symptom_ids, dtype=np.int64)
+        self.entry_frequency = np.clip(np.asarray(frequency, dtype=np.float64), 0.0, 1.0)
+        self.listed_bits = _bitsets(self.entry_symptom, self.entry_disease, n_symptoms, self.n_diseases)
+        always = self.entry_frequency >= 1.0
+        self.always_bits = _bitsets(self.entry_symptom[always], self.entry_disease[always],
+                                    n_symptoms, self.n_diseases)
+
+    @classmethod
+    def from_knowledge_base(cls, kb):
+        """Engine for a symptom_kb.KnowledgeBase"""
+        return cls(kb.disease_ptr, kb.symptom_ids, kb.frequency, len(kb.symptoms))
+
+    def unpack(self, bits):
+        return np.unpackbits(bits, count=self.n_diseases, bitorder="little").view(bool)
+
+    def gains(self, candidates, probability):
+        """
+        Expected information gain in bits of asking each symptom, given the
+        candidate bitset and the probability of every disease (zero outside
+        the candidates, summing to 1).
+        """
+        live = self.unpack(candidates)[self.entry_disease]
+        symptom = self.entry_symptom[live]
+        p = probability[self.entry_disease[live]]
+        f = self.entry_frequency[live]
+
+        def plogp(x):
+            return np.where(x > 0, x * np.log2(np.where(x > 0, x, 1)), 0.0)
+
+        entropy = -plogp(probability).sum()
+        p_yes = np.bincount(symptom, weights=p * f, minlength=self.n_symptoms)
+        # sum of q log q over each branch's unnormalized posterior q
+        yes_terms = np.bincount(symptom, weights=plogp(p * f), minlength=self.n_symptoms)
+        # Diseases not listing a symptom keep their whole p on "no"
+        no_terms = -entropy + np.bincount(symptom, weights=plogp(p * (1 - f)) - plogp(p),
+                                          minlength=self.n_symptoms)
+        p_no = 1 - p_yes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            h_yes = np.where(p_yes > 1e-12, np.log2(p_yes) - yes_terms / p_yes, 0.0)
+            h_no = np.where(p_no > 1e-12, np.log2(p_no) - no_terms / p_no, 0.0)
+        return entropy - (p_yes * h_yes + p_no * h_no)
+
+
+class RefinementSession:
+    """
+    One interactive refinement. prior: {disease index: weight}, e.g. the
+    match percentages of a check; asked: symptom indexes not to ask about
+    (those already entered).
+    """
+
+    def __init__(self, engine, prior, asked=()):
+        self.engine = engine
+        self.probability = np.zeros(engine.n_diseases)
+        for d, weight in prior.items():
+            self.probability[d] = max(weight, 0.0)
+        if self.probability.sum() <= 0:
+            self.probability[:] = 1.0
+        self.probability /= self.probability.sum()
+        self.candidates = np.packbits(self.probability > 0, bitorder="little")
+        self.asked = set(asked)
+        self.answers = []
+
+    def next_question(self):
+        """(symptom index, gain in bits) of the most informative question, or None when done"""
+        if len(self.answers) >= MAX_QUESTIONS or self.probability.max() >= DONE_PROBABILITY:
+            return None
+        gains = self.engine.gains(self.candidates, self.probability)
+        if self.asked:
+            gains[list(self.asked)] = -np.inf
+        best = int(np.argmax(gains))
+        if gains[best] < MIN_GAIN:
+            return None
+        return best, float(gains[best])
+
+    def answer(self, symptom, present):
+        """Record yes (True), no (False) or don't know (None) for symptom"""
+        self.asked.add(symptom)
+        self.answers.append((symptom, present))
+        if present is None:
+            return
+        engine = self.engine
+        likelihood = np.zeros(engine.n_diseases) if present else np.ones(engine.n_diseases)
+        entries = engine.entry_symptom == symptom
+        frequency = engine.entry_frequency[entries]
+        likelihood[engine.entry_disease[entries]] = frequency if present else 1 - frequency
+        posterior = self.probability * likelihood
+        if posterior.sum() <= 0:
+            # Nothing fits the answer; keep the previous belief rather than divide by zero
+            return
+        self.probability = posterior / posterior.sum()
+        if present:
+            self.candidates &= engine.listed_bits[symptom]
+        else:
+            self.candidates &= ~engine.always_bits[symptom]
+
+    def ranking(self, k=5):
+        """Up to k (disease index, probability) best first"""
+        order = np.argsort(-self.probability, kind="stable")[:k]
+        return [(int(d), float(self.probability[d])) for d in order if self.probability[d] > 0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time next-question steps on a synthetic knowledge base")
+    parser.add_argument("--bench", action="store_true", help="run the benchmark")
+    parser.add_argument("--diseases", type=int, default=3000)
+    parser.add_argument("--symptoms", type=int, default=3000)
+    parser.add_argument("--per-disease", type=int, default=15, help="symptoms listed per disease")
+    args = parser.parse_args(argv)
+    if not args.bench:
+        parser.print_help()
+        return 0
+
+    rng = np.random.default_rng(1)
+    ids = np.concatenate([np.sort(rng.choice(args.symptoms, args.per_disease, replace=False))
+                          for _ in range(args.diseases)])
+    frequency = rng.uniform(0.3, 1.0, len(ids))
+    ptr = np.arange(args.diseases + 1) * args.per_disease
+
+    started = time.perf_counter()
+    engine = QuestionEngine(ptr, ids, frequency, args.symptoms)
+    print(f"{args.diseases} diseases x {args.symptoms} symptoms prepared in "
+          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # As after a check: the user entered two of the true disease's symptoms,
+    # and every disease listing either is a candidate, weighted by how many
+    truth = int(rng.integers(args.diseases))
+    truth_symptoms = set(ids[ptr[truth]:ptr[truth + 1]].tolist())
+    entered = rng.choice(sorted(truth_symptoms), 2, replace=False)
+    hits = np.bincount(engine.entry_disease[np.isin(engine.entry_symptom, entered)], minlength=args.diseases)
+    session = RefinementSession(engine, {d: float(n) for d, n in enumerate(hits) if n}, entered.tolist())
+    print(f"{np.count_nonzero(hits)} candidates after the check")
+    steps = []
+    while True:
+        started = time.perf_counter()
+        question = session.next_question()
+        steps.append(time.perf_counter() - started)
+        if question is None:
+            break
+        session.answer(question[0], question[0] in truth_symptoms)
+    print(f"{len(session.answers)} questions, {np.mean(steps) * 1000:.2f} ms average per step, "
+          f"{max(steps) * 1000:.2f} ms worst")
+    top = session.ranking(1)
+    print(f"top candidate {top[0][0]} at {top[0][1]:.0%} (true disease {truth})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,281 @@
+# symptom_service.py
+# The symptom checker's knowledge base and matching, without the GUI:
+# loading (ensure_loaded(), or warm_up() in the background), typo-tolerant
+# symptom input, scoring against diseases and refinement sessions.
+# symptom_checker.py draws the windows on top of it; nothing here imports
+# customtkinter, so it can be loaded and tested headless.
+import heapq
+from collections import OrderedDict
+import re
+import threading
+import symptom_kb
+import symptom_matrix
+import symptom_refine
+import symptom_vocab
+
+# Global variables to store cleaned data, filled on first use by
+# ensure_loaded() (or in the background by warm_up())
+# disease -> every symptom any of its rows lists, most frequent first
+symptom_disease_data = {}
+# disease -> {symptom: share of the disease's rows listing it}
+symptom_frequency = {}
+# symptom -> inverse document frequency over diseases, log(diseases / diseases listing it) + 1
+symptom_idf = {}
+disease_descriptions = {}
+disease_precautions = {}
+# Inverted index: normalized symptom -> (disease, weight) postings, in symptom_disease_data order
+symptom_index = {}
+disease_order = {}
+# Quantized idf of each symptom and of symptoms the knowledge base does not know
+symptom_idf_weight = {}
+unknown_symptom_weight = 0
+# symptom_matrix.IncidenceMatrix for batch scoring
+incidence = None
+# symptom_vocab.SymptomVocabulary for typo tolerance and autocomplete
+vocabulary = None
+# symptom_kb.KnowledgeBase the tables above were loaded from (holds the free-text extractor)
+knowledge_base = None
+# symptom_refine.QuestionEngine, built on the first refinement
+question_engine = None
+# Set once the knowledge base has been loaded
+kb_loaded = threading.Event()
+_load_lock = threading.Lock()
+
+# LRU cache of match_symptoms_to_diseases() results:
+# (frozenset of resolved symptoms, k) -> tuple of matches
+MATCH_CACHE_SIZE = 1024
+_match_cache = OrderedDict()
+_match_cache_lock = threading.Lock()
+_match_cache_stats = {"hits": 0, "misses": 0}
+# Bumped on every (re)load, so results computed against an older knowledge base are never cached
+_kb_generation = 0
+
+def normalize_symptom(symptom):
+    """Normalize symptom names for matching"""
+    if not isinstance(symptom, str) or not symptom:
+        return ""
+    return symptom.strip().lower().replace(" ", "_").replace("-", "_")
+
+def normalize_disease_name(disease):
+    """Normalize disease names for consistency"""
+    if not isinstance(disease, str) or not disease:
+        return ""
+    return disease.strip().title()
+
+def clean_and_load_data():
+    """Load the knowledge base (see symptom_kb.py) into memory; returns True on success"""
+    global symptom_disease_data, symptom_frequency, symptom_idf, disease_descriptions, disease_precautions, incidence, vocabulary, knowledge_base, question_engine, _kb_generation
+    
+    try:
+        kb = symptom_kb.load()
+        if kb is None:
+            return False
+        
+        symptom_disease_data, symptom_frequency, symptom_idf = kb.symptom_tables()
+        build_symptom_index()
+        incidence = symptom_matrix.IncidenceMatrix(symptom_disease_data, symptom_frequency, symptom_idf)
+        vocabulary = symptom_vocab.SymptomVocabulary(symptom_idf)
+        knowledge_base = kb
+        question_engine = None
+        
+        disease_descriptions = {d: text for d, text in zip(kb.diseases, kb.descriptions) if text}
+        disease_precautions = {d: values for d, values in zip(kb.diseases, kb.precautions) if values}
+        
+        # Add basic descriptions for diseases that don't have them
+        for disease in symptom_disease_data.keys():
+            if disease not in disease_descriptions:
+                disease_descriptions[disease] = f"A medical condition characterized by symptoms such as {', '.join(symptom_disease_data[disease][:3])}."
+        
+        # Add basic precautions for diseases that don't have them
+        for disease in symptom_disease_data.keys():
+            if disease not in disease_precautions:
+                disease_precautions[disease] = [
+                    "Consult a healthcare professional for proper diagnosis",
+                    "Follow prescribed treatment plan",
+                    "Get adequate rest",
+                    "Maintain a healthy lifestyle"
+                ]
+        
+        with _match_cache_lock:
+            _kb_generation += 1
+            _match_cache.clear()
+        
+        print(f"Successfully loaded {len(symptom_disease_data)} diseases with symptoms")
+        print(f"Added descriptions for {len(disease_descriptions)} diseases")
+        print(f"Added precautions for {len(disease_precautions)} diseases")
+        return True
+        
+    except Exception as e:
+        print(f"Error loading and cleaning dataset: {e}")
+        return False
+
+def resolve_symptom(symptom):
+    """Canonical symptom for typed text, forgiving spacing and small typos; unknown ones are just normalized"""
+    normalized = normalize_symptom(symptom)
+    if normalized in symptom_idf or vocabulary is None:
+        return normalized
+    return vocabulary.resolve(symptom) or normalized
+
+def extract_symptoms(text):
+    """Known symptoms mentioned anywhere in free text, including by a synonym, in order of appearance"""
+    ensure_loaded()
+    if knowledge_base is None:
+        return []
+    return knowledge_base.extract_symptoms(text)
+
+def parse_symptom_input(text):
+    """
+    Split the symptom box into (typed, symptom) pairs. Each comma- or
+    line-separated part is first read as one symptom name (typos allowed);
+    otherwise it is scanned as free text for every symptom it mentions. Parts
+    with no known symptom are kept as typed. Each symptom appears once.
+    """
+    ensure_loaded()
+    pairs = []
+    seen = set()
+    for part in re.split(r"[,\n]", text):
+        part = part.strip()
+        if not part:
+            continue
+        resolved = resolve_symptom(part)
+        if resolved in symptom_idf:
+            found = [resolved]
+        else:
+            found = extract_symptoms(part) or [part]
+        for symptom in found:
+            if normalize_symptom(symptom) not in seen:
+                seen.add(normalize_symptom(symptom))
+                pairs.append((part, symptom_vocab.display_name(symptom) if symptom in symptom_idf else symptom))
+    return pairs
+
+def suggest_symptoms(prefix, limit=symptom_vocab.SUGGESTIONS):
+    """Autocomplete for a partly typed symptom; empty until the knowledge base is loaded"""
+    if not kb_loaded.is_set() or vocabulary is None:
+        return []
+    return vocabulary.suggest(prefix, limit)
+
+def ensure_loaded():
+    """
+    Load the knowledge base unless already done; waits for a warm-up in progress.
+    Returns False if it could not be loaded (the next call tries again).
+    """
+    if kb_loaded.is_set():
+        return True
+    with _load_lock:
+        if not kb_loaded.is_set() and clean_and_load_data():
+            kb_loaded.set()
+    return kb_loaded.is_set()
+
+def warm_up():
+    """Start loading the knowledge base on a background thread"""
+    if not kb_loaded.is_set():
+        threading.Thread(target=ensure_loaded, name="symptom-kb", daemon=True).start()
+
+def build_symptom_index():
+    """Rebuild symptom_index and the quantized weights from the loaded knowledge base"""
+    global unknown_symptom_weight
+    symptom_index.clear()
+    disease_order.clear()
+    symptom_idf_weight.clear()
+    for symptom, idf in symptom_idf.items():
+        symptom_idf_weight[symptom] = symptom_matrix.quantize(idf)
+    # An unknown symptom counts as much as the rarest known one
+    unknown_symptom_weight = max(symptom_idf_weight.values(), default=symptom_matrix.quantize(1.0))
+    for disease, disease_symptoms in symptom_disease_data.items():
+        disease_order[disease] = len(disease_order)
+        frequencies = symptom_frequency[disease]
+        for symptom in dict.fromkeys(disease_symptoms):
+            weight = symptom_matrix.quantize(frequencies[symptom] * symptom_idf[symptom])
+            symptom_index.setdefault(symptom, []).append((disease, weight))
+
+def match_cache_info():
+    """Hits, misses and current size of the match cache"""
+    with _match_cache_lock:
+        return dict(_match_cache_stats, size=len(_match_cache))
+
+def match_symptoms_to_diseases(user_symptoms, k=None):
+    """
+    Match user symptoms to potential diseases
+    Returns list of (disease, match_percentage, matched_symptoms_count),
+    best first; only the first k when k is given.
+    
+    match_percentage weighs each symptom by its idf (rare symptoms say more)
+    and by how often the disease's dataset rows list it. A symptom entered
+    twice counts once, so results depend only on the set of symptoms and are
+    cached by it.
+    """
+    ensure_loaded()
+    user_symptoms_normalized = list(dict.fromkeys(resolve_symptom(s) for s in user_symptoms))
+    key = (frozenset(user_symptoms_normalized), k)
+    with _match_cache_lock:
+        cached = _match_cache.get(key)
+        if cached is not None:
+            _match_cache.move_to_end(key)
+            _match_cache_stats["hits"] += 1
+            return list(cached)
+        _match_cache_stats["misses"] += 1
+        generation = _kb_generation
+    
+    matches = _rank_matches(user_symptoms_normalized, k)
+    
+    with _match_cache_lock:
+        if generation == _kb_generation:
+            _match_cache[key] = tuple(matches)
+            if len(_match_cache) > MATCH_CACHE_SIZE:
+                _match_cache.popitem(last=False)
+    return matches
+
+def _rank_matches(user_symptoms_normalized, k):
+    """Score resolved, distinct symptoms against every disease sharing one; top k by heap, or all sorted"""
+    total = sum(symptom_idf_weight.get(s, unknown_symptom_weight) for s in user_symptoms_normalized)
+    
+    # Only diseases sharing at least one symptom are ever touched
+    scores = {}
+    for symptom in user_symptoms_normalized:
+        for disease, weight in symptom_index.get(symptom, ()):
+            score = scores.setdefault(disease, [0, 0])
+            score[0] += weight
+            score[1] += 1
+    
+    # Best match percentage, then most matched symptoms; ties keep symptom_disease_data order
+    def rank(item):
+        disease, (score, matched) = item
+        return (-score, -matched, disease_order[disease])
+    
+    if k is None:
+        ranked = sorted(scores.items(), key=rank)
+    else:
+        ranked = heapq.nsmallest(k, scores.items(), key=rank)
+    return [(disease, (score / total) * 100, matched) for disease, (score, matched) in ranked]
+
+def match_symptom_batch(symptom_sets, k=5):
+    """
+    Score many symptom lists at once against the sparse incidence matrix.
+    Returns, per list, the first k entries match_symptoms_to_diseases() would give.
+    """
+    if not ensure_loaded():
+        return [[] for _ in symptom_sets]
+    queries = [[resolve_symptom(s) for s in symptoms] for symptoms in symptom_sets]
+    return incidence.top_k(queries, k)
+
+def start_refinement(user_symptoms):
+    """
+    symptom_refine.RefinementSession for a check: the matched diseases,
+    weighted by match percentage, are the candidates, and the entered
+    symptoms are not asked about again. None if the knowledge base could not be loaded.
+    """
+    global question_engine
+    if not ensure_loaded():
+        return None
+    if question_engine is None:
+        question_engine = symptom_refine.QuestionEngine.from_knowledge_base(knowledge_base)
+    prior = {disease_order[disease]: percent for disease, percent, _ in match_symptoms_to_diseases(user_symptoms)}
+    symptom_ids = {symptom: i for i, symptom in enumerate(knowledge_base.symptoms)}
+    asked = [symptom_ids[s] for s in (resolve_symptom(s) for s in user_symptoms) if s in symptom_ids]
+    return symptom_refine.RefinementSession(question_engine, prior, asked)
+
+def retriage_history(k=3):
+    """Re-score every saved symptom check against the loaded knowledge base; returns the number rewritten"""
+    if not ensure_loaded():
+        return 0
+    return symptom_matrix.retriage_symptom_checks(incidence, resolve_symptom, k)
@@ -0,0 +1,198 @@
+# symptom_vocab.py
+# Resolves free-typed symptom names to the knowledge base's canonical ones.
+#
+#   python symptom_vocab.py --bench 10000   # time lookups on a synthetic vocabulary
+#
+# Spelling is compared on squashed keys (lowercase letters and digits only),
+# so "Head ache", "head-ache" and "headache" are the same key, and the
+# dataset's "dischromic _patches" is reachable as "dischromic patches". Keys
+# that still do not match are looked up through a trigram index and checked
+# by edit distance, within a budget that grows with the length of the input.
+# Autocomplete is a bisect over sorted names, matched from the start of any
+# word.
+import argparse
+import bisect
+import collections
+import random
+import re
+import string
+import time
+
+SUGGESTIONS = 8        # autocomplete results returned by default
+RESOLVE_CACHE = 4096   # remembered resolve() results before the memo is reset
+
+
+def squash(text):
+    """'Dischromic _Patches' -> 'dischromicpatches'"""
+    return re.sub(r"[^a-z0-9]", "", str(text or "").lower())
+
+
+def display_name(symptom):
+    """'dischromic__patches' -> 'dischromic patches'"""
+    return " ".join(re.split(r"[\s_\-]+", symptom.strip()))
+
+
+def edit_budget(length):
+    """Edits allowed when resolving a squashed key of this length"""
+    if length < 4:
+        return 0
+    if length < 8:
+        return 1
+    return 2
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of a and b, or limit + 1 as soon as it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def trigrams(key):
+    """Distinct 3-letter windows of key, padded so its first and last letters get their own"""
+    padded = f"$${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Candidate search by shared trigrams. One edit changes at most three of a
+    key's trigrams, so a term within limit edits shares all but 3 * limit of
+    them; only terms passing that count are compared by edit distance.
+    """
+
+    def __init__(self, terms):
+        self.terms = list(terms)
+        self._postings = {}
+        for t, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                self._postings.setdefault(gram, []).append(t)
+
+    def closest(self, key, limit):
+        """(distance, term) of the nearest term within limit edits (ties alphabetical), or None"""
+        grams = trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        needed = len(grams) - 3 * limit
+        best = None
+        for t, count in shared.items():
+            if count < needed:
+                continue
+            term = self.terms[t]
+            distance = edit_distance(key, term, limit)
+            if distance <= limit and (best is None or (distance, term) < best):
+                best = (distance, term)
+        return best
+
+
+class SymptomVocabulary:
+    """
+    symptoms: canonical (normalized) symptom names. resolve() maps typed text
+    to one of them; suggest() lists those a partly typed name could become.
+    """
+
+    def __init__(self, symptoms):
+        self.symptoms = list(dict.fromkeys(symptoms))
+        self._by_key = {}
+        for symptom in self.symptoms:
+            self._by_key.setdefault(squash(symptom), symptom)
+        self._trigrams = None
+        self._resolved = {}
+        # (text from the start of a word, position of that word, symptom), sorted for prefix search
+        entries = []
+        for symptom in self.symptoms:
+            words = display_name(symptom).lower().split(" ")
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), i, symptom))
+        entries.sort()
+        self._prefix_keys = [entry[0] for entry in entries]
+        self._prefix_entries = entries
+
+    def resolve(self, text):
+        """Canonical symptom for free-typed text, or None if nothing is within the edit budget"""
+        key = squash(text)
+        if not key:
+            return None
+        symptom = self._by_key.get(key)
+        if symptom is not None:
+            return symptom
+        if key in self._resolved:
+            return self._resolved[key]
+        symptom = None
+        budget = edit_budget(len(key))
+        if budget:
+            if self._trigrams is None:
+                self._trigrams = TrigramIndex(self._by_key)
+            found = self._trigrams.closest(key, budget)
+            if found is not None:
+                symptom = self._by_key[found[1]]
+        if len(self._resolved) >= RESOLVE_CACHE:
+            self._resolved.clear()
+        self._resolved[key] = symptom
+        return symptom
+
+    def suggest(self, prefix, limit=SUGGESTIONS):
+        """
+        Up to limit canonical symptoms with a word starting with prefix,
+        those whose name starts with it first.
+        """
+        prefix = display_name(prefix.lower())
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._prefix_keys, prefix)
+        whole, inner = [], []
+        entries = self._prefix_entries
+        for i in range(start, len(entries)):
+            key, position, symptom = entries[i]
+            if not key.startswith(prefix):
+                break
+            (whole if position == 0 else inner).append(symptom)
+            if len(whole) >= limit:
+                break
+        return list(dict.fromkeys(whole + inner))[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time symptom lookups on a synthetic vocabulary")
+    parser.add_argument("--bench", type=int, default=10000, help="vocabulary size")
+    parser.add_argument("--lookups", type=int, default=2000, help="keystrokes and typos timed")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(1)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+    symptoms = list({"_".join(rng.sample(words, rng.randint(1, 3))) for _ in range(args.bench)})
+
+    started = time.perf_counter()
+    vocabulary = SymptomVocabulary(symptoms)
+    print(f"{len(vocabulary.symptoms)} symptoms indexed in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    typed = [display_name(rng.choice(symptoms))[:rng.randint(1, 8)] for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for prefix in typed:
+        vocabulary.suggest(prefix)
+    per_keystroke = (time.perf_counter() - started) / len(typed) * 1000
+    print(f"autocomplete: {per_keystroke:.3f} ms per keystroke")
+
+    typos = []
+    for symptom in rng.sample(symptoms, min(args.lookups, len(symptoms))):
+        i = rng.randrange(len(symptom))
+        typos.append((symptom[:i] + rng.choice(string.ascii_lowercase) + symptom[i + 1:], symptom))
+    vocabulary.resolve("build the trigram index")
+    started = time.perf_counter()
+    resolved = sum(vocabulary.resolve(typo) == symptom for typo, symptom in typos)
+    per_typo = (time.perf_counter() - started) / len(typos) * 1000
+    print(f"typo resolution: {per_typo:.3f} ms per lookup, {resolved}/{len(typos)} back to the original")
+    return 0 if per_keystroke < 1.0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+# test_adherence.py
+# adherence_daily counters kept by the dose_events triggers: reminders that
+# are answered taken or skipped, changed answers, and pending doses swept
+# into missed once MISSED_AFTER has passed.
+#
+#   python -m pytest test_adherence.py
+import pytest
+import database
+import timeutil
+
+HOUR = 3600
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    database.close_all()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "health_tracker.db"))
+    yield
+    database.close_all()
+
+
+def counters(user_id):
+    """Summed adherence_daily (taken, skipped, missed) per medicine"""
+    conn = database.get_connection(user_id)
+    rows = conn.execute("""
+        SELECT medicine_id, sum(taken), sum(skipped), sum(missed)
+        FROM adherence_daily WHERE user_id=? GROUP BY medicine_id
+    """, (user_id,))
+    return {med_id: counts for med_id, *counts in rows}
+
+
+def test_taken_skipped_and_missed_doses_are_counted(db):
+    now = timeutil.to_epoch()
+    for due_at in (now - 6 * HOUR, now - 3 * HOUR, now - 2 * HOUR, now - HOUR):
+        database.record_dose_due(1, 10, due_at)
+    database.record_dose(1, 10, "taken", now - 3 * HOUR)
+    database.record_dose(1, 10, "skipped", now - 2 * HOUR)
+    # Without due_at the latest pending reminder is answered
+    assert database.record_dose(1, 10, "taken").result() == now - HOUR
+    database.flush_writes()
+    # The 6-hour-old dose was swept into missed by the writes after it
+    assert counters(1) == {10: [2, 1, 1]}
+
+    assert database.get_adherence(1, windows=(7,)) == {
+        10: {7: {"taken": 2, "skipped": 1, "missed": 1, "rate": 0.5}}}
+
+
+def test_changed_answer_moves_the_count(db):
+    now = timeutil.to_epoch()
+    database.record_dose_due(1, 10, now - HOUR)
+    database.record_dose(1, 10, "taken", now - HOUR)
+    database.flush_writes()
+    assert counters(1) == {10: [1, 0, 0]}
+    database.record_dose(1, 10, "skipped", now - HOUR).result()
+    assert counters(1) == {10: [0, 1, 0]}
+
+
+def test_pending_doses_do_not_count_until_missed(db, monkeypatch):
+    now = timeutil.to_epoch()
+    database.record_dose_due(1, 10, now - HOUR).result()
+    assert counters(1) == {}
+    assert database.get_adherence(1) == {}
+
+    # Reading adherence sweeps overdue doses itself
+    monkeypatch.setattr(database, "MISSED_AFTER", HOUR // 2)
+    assert database.get_adherence(1, windows=(7,)) == {
+        10: {7: {"taken": 0, "skipped": 0, "missed": 1, "rate": 0.0}}}
+    assert counters(1) == {10: [0, 0, 1]}
+
+
+def test_unscheduled_dose_is_recorded_now(db):
+    database.record_dose(1, 10, "taken").result()
+    assert counters(1) == {10: [1, 0, 0]}
+
+
+def test_unknown_status_is_refused(db):
+    with pytest.raises(ValueError, match="unknown dose status"):
+        database.record_dose(1, 10, "missed")
@@ -0,0 +1,75 @@
+# test_notifications.py
+# NotificationDispatcher: reminders due together are merged, a full queue
+# drops rather than blocks, a hung backend times out without holding up the
+# next reminder, and stop() returns even with the queue full.
+#
+#   python -m pytest test_notifications.py
+import threading
+import time
+import notifications
+from notifications import MemoryBackend, NotificationDispatcher
+
+
+class HungBackend:
+    """Never returns until released"""
+    name = "hung"
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def send(self, title, message):
+        self.release.wait(10)
+
+
+def test_same_user_and_instant_are_merged():
+    backend = MemoryBackend()
+    dispatcher = NotificationDispatcher([backend])
+    dispatcher.submit(1, "Aspirin", 100)
+    dispatcher.submit(1, "Metformin", 100)
+    dispatcher.submit(1, "Vitamin D", 200)
+    dispatcher.submit(2, "Aspirin", 100)
+    dispatcher.start()
+    assert dispatcher.wait_idle(5)
+    dispatcher.stop(5)
+    assert [message for _, message in backend.sent] == [
+        "Time to take Aspirin and Metformin", "Time to take Vitamin D", "Time to take Aspirin"]
+    stats = dispatcher.stats()
+    assert (stats["submitted"], stats["coalesced"], stats["delivered"]) == (4, 1, 3)
+
+
+def test_full_queue_drops_without_blocking():
+    dispatcher = NotificationDispatcher([MemoryBackend()], max_queue=2)
+    started = time.perf_counter()
+    for user_id in range(5):
+        dispatcher.submit(user_id, "Aspirin", 100)
+    assert time.perf_counter() - started < 1
+    assert dispatcher.stats()["dropped"] == 3
+
+
+def test_hung_backend_times_out_and_later_reminders_still_go_out():
+    hung, memory = HungBackend(), MemoryBackend()
+    dispatcher = NotificationDispatcher([hung, memory], call_timeout=0.05).start()
+    try:
+        for user_id in range(3):
+            dispatcher.submit(user_id, "Aspirin", 100)
+        assert dispatcher.wait_idle(5)
+        stats = dispatcher.stats()
+        assert stats["timeouts"] == 3
+        assert len(memory.sent) == 3
+    finally:
+        hung.release.set()
+        dispatcher.stop(5)
+
+
+def test_stop_returns_with_a_full_queue(monkeypatch):
+    monkeypatch.setattr(notifications, "STOP_POLL", 0.05)
+    backend = MemoryBackend(delay=0.05)
+    dispatcher = NotificationDispatcher([backend], max_queue=3).start()
+    for user_id in range(10):
+        dispatcher.submit(user_id, "Aspirin", 100)
+    started = time.perf_counter()
+    dispatcher.stop(5)
+    assert time.perf_counter() - started < 2
+    assert not dispatcher._thread.is_alive()
+    # What was queued is still delivered
+    assert len(backend.sent) == 10 - dispatcher.stats()["dropped"]
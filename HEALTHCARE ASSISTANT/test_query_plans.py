@@ -0,0 +1,47 @@
+# test_query_plans.py
+# Query-plan regression check: every query the storage layer runs must be
+# served by an index, never by a full-table scan or a temporary sort.
+#
+#   python -m pytest test_query_plans.py
+import sqlite3
+import pytest
+import archive
+import database
+import migrations
+
+
+@pytest.fixture
+def hot(tmp_path):
+    conn = sqlite3.connect(tmp_path / "health_tracker.db")
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def cold(tmp_path):
+    conn = archive.open_cold(str(tmp_path / "health_tracker.db"))
+    yield conn
+    conn.close()
+
+
+def _label(query):
+    return " ".join(query.split())[:60]
+
+
+@pytest.mark.parametrize("query, params", database.PLANNED_QUERIES,
+                         ids=[_label(query) for query, _ in database.PLANNED_QUERIES])
+def test_hot_query_uses_an_index(hot, query, params):
+    assert database.find_unindexed_queries(hot, [(query, params)]) == []
+
+
+@pytest.mark.parametrize("query, params", archive.COLD_PLANNED_QUERIES,
+                         ids=[_label(query) for query, _ in archive.COLD_PLANNED_QUERIES])
+def test_cold_query_uses_an_index(cold, query, params):
+    assert database.find_unindexed_queries(cold, [(query, params)]) == []
+
+
+def test_every_shared_query_is_planned():
+    planned = {query for query, _ in database.PLANNED_QUERIES}
+    missing = [name for name in dir(database) if name.endswith("_SQL") and getattr(database, name) not in planned]
+    assert missing == []
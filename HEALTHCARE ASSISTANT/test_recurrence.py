@@ -0,0 +1,78 @@
+# test_recurrence.py
+# recurrence.Rule.next_after for the interval schedules, the end of a course,
+# and the schedules compile_rule refuses.
+#
+#   python -m pytest test_recurrence.py
+import datetime
+import pytest
+import recurrence
+import timeutil
+
+
+def at(text):
+    """Epoch seconds of a local 'YYYY-MM-DD HH:MM'"""
+    return datetime.datetime.strptime(text, "%Y-%m-%d %H:%M").timestamp()
+
+
+def doses(rule, after, count):
+    """The next count doses after epoch after, as local 'YYYY-MM-DD HH:MM'"""
+    found = []
+    for _ in range(count):
+        after = rule.next_after(after)
+        if after is None:
+            break
+        found.append(timeutil.format_epoch(after, "%Y-%m-%d %H:%M"))
+    return found
+
+
+def test_every_n_days_counts_from_the_start_day():
+    start = timeutil.to_day("2026-03-02")
+    rule = recurrence.compile_rule("every_n_days", "08:00, 20:00", repeat_every=3, start_day=start)
+    assert doses(rule, at("2026-03-01 12:00"), 5) == [
+        "2026-03-02 08:00", "2026-03-02 20:00", "2026-03-05 08:00", "2026-03-05 20:00", "2026-03-08 08:00"]
+    # Strictly later: a dose exactly at `after` is skipped
+    assert doses(rule, at("2026-03-05 08:00"), 1) == ["2026-03-05 20:00"]
+    assert doses(rule, at("2026-03-06 09:00"), 1) == ["2026-03-08 08:00"]
+
+
+def test_every_n_hours_starts_at_the_first_time():
+    start = timeutil.to_day("2026-03-02")
+    rule = recurrence.compile_rule("every_n_hours", "09:00", repeat_every=8, start_day=start)
+    assert doses(rule, at("2026-03-01 23:00"), 4) == [
+        "2026-03-02 09:00", "2026-03-02 17:00", "2026-03-03 01:00", "2026-03-03 09:00"]
+    # Starting mid-way through the start day does not bring the first dose forward
+    assert doses(rule, at("2026-03-02 06:00"), 1) == ["2026-03-02 09:00"]
+
+
+def test_every_n_hours_that_does_not_divide_a_day():
+    start = timeutil.to_day("2026-03-02")
+    rule = recurrence.compile_rule("every_n_hours", "06:00", repeat_every=10, start_day=start)
+    assert doses(rule, at("2026-03-02 00:00"), 6) == [
+        "2026-03-02 06:00", "2026-03-02 16:00", "2026-03-03 02:00",
+        "2026-03-03 12:00", "2026-03-03 22:00", "2026-03-04 08:00"]
+
+
+def test_course_ends_on_its_end_day():
+    start, end = timeutil.to_day("2026-03-02"), timeutil.to_day("2026-03-04")
+    rule = recurrence.compile_rule("every_n_hours", "09:00", repeat_every=12, start_day=start, end_day=end)
+    assert doses(rule, at("2026-03-04 00:00"), 5) == ["2026-03-04 09:00", "2026-03-04 21:00"]
+    assert rule.next_after(at("2026-03-04 21:00")) is None
+
+    rule = recurrence.compile_rule("every_n_days", "08:00", repeat_every=2, start_day=start, end_day=end)
+    assert doses(rule, at("2026-03-01 00:00"), 5) == ["2026-03-02 08:00", "2026-03-04 08:00"]
+
+
+@pytest.mark.parametrize("schedule_type, time_text, repeat_every, message", [
+    ("every_n_hours", "08:00, 20:00", 6, "one starting time"),
+    ("every_n_days", "08:00", 0, "at least 1"),
+    ("every_n_hours", "08:00", None, "at least 1"),
+    ("fortnightly", "08:00", 14, "unknown schedule type"),
+])
+def test_invalid_schedules_are_refused(schedule_type, time_text, repeat_every, message):
+    with pytest.raises(ValueError, match=message):
+        recurrence.compile_rule(schedule_type, time_text, repeat_every=repeat_every, start_day=0)
+
+
+def test_course_that_ends_before_it_starts_is_refused():
+    with pytest.raises(ValueError, match="ends before it starts"):
+        recurrence.compile_rule("daily", "08:00", start_day=10, end_day=9)
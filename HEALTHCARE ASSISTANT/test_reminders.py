@@ -0,0 +1,100 @@
+# test_reminders.py
+# Reminders across processes: medicine edits reach a scheduler that did not
+# make them through the change log, only one process schedules reminders for
+# a database, and the daemon starts within its budget.
+#
+#   python -m pytest test_reminders.py
+import os
+import subprocess
+import sys
+import pytest
+import database
+import reminders
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+NOW = 1704067200  # 2024-01-01 00:00 UTC
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    database.close_all()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "health_tracker.db"))
+    yield
+    database.close_all()
+
+
+def scheduler():
+    """A scheduler that only hears of changes through the log, as in another process"""
+    s = reminders.ReminderScheduler(lambda *_: None, clock=lambda: NOW, follow_log=True)
+    s.reload()
+    return s
+
+
+def test_change_log_reaches_another_scheduler(db):
+    s = scheduler()
+    assert s.next_due() is None
+    med_id = database.add_medicine(1, "Aspirin", "08:00").result()
+    database.flush_writes()
+    s.follow_changes()
+    assert s.next_due()[1:] == (1, "Aspirin")
+
+    database.set_medicine_paused(med_id, True, user_id=1).result()
+    database.flush_writes()
+    s.follow_changes()
+    assert s.next_due() is None
+
+
+def test_deleted_medicine_is_dropped(db):
+    med_id = database.add_medicine(1, "Aspirin", "08:00").result()
+    database.flush_writes()
+    s = scheduler()
+    assert s.next_due() is not None
+    database.delete_medicine(med_id, user_id=1).result()
+    database.flush_writes()
+    s.follow_changes()
+    assert s.next_due() is None
+
+
+def test_pruned_log_falls_back_to_a_reload(db, monkeypatch):
+    monkeypatch.setattr(database, "MEDICINE_CHANGES_KEPT", 2)
+    s = scheduler()
+    for name in ["A", "B", "C", "D"]:
+        database.add_medicine(1, name, "08:00").result()
+    database.flush_writes()
+    s.follow_changes()
+    assert len(s._entries) == 4
+
+
+def test_app_scheduler_does_not_poll_the_log(db):
+    s = reminders.ReminderScheduler(lambda *_: None, clock=lambda: NOW,
+                                    changes=lambda seq: pytest.fail("read the change log"),
+                                    change_seq=lambda: pytest.fail("read the change log"))
+    s.start()
+    s.stop()
+
+
+def run_daemon(cwd, *args):
+    env = dict(os.environ, PYTHONPATH=HERE)
+    return subprocess.run([sys.executable, "-m", "reminder_daemon", "--backend", "log", *args],
+                          cwd=cwd, env=env, capture_output=True, text=True, timeout=60)
+
+
+def test_only_one_process_schedules_reminders(db, tmp_path):
+    scheduler = reminders.start_reminders(lambda *_: None)
+    assert scheduler is not None
+    try:
+        assert reminders.start_reminders(lambda *_: None) is None
+        result = run_daemon(tmp_path, "--check-budget")
+        assert result.returncode == 1
+        assert "already running" in result.stdout
+    finally:
+        scheduler.stop()
+    scheduler = reminders.start_reminders(lambda *_: None)
+    assert scheduler is not None
+    scheduler.stop()
+
+
+def test_daemon_starts_within_budget(tmp_path):
+    result = run_daemon(tmp_path, "--check-budget")
+    assert result.returncode == 0, result.stdout + result.stderr
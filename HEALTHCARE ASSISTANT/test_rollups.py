@@ -0,0 +1,125 @@
+# test_rollups.py
+# vitals_rollup is kept in step with vitals by triggers: inserts, updates and
+# deletes leave it equal to aggregating vitals from scratch, and buckets that
+# reach back past the archive watermark keep their min and max once
+# archive.py has removed their rows.
+#
+#   python -m pytest test_rollups.py
+import random
+import sqlite3
+import pytest
+import archive
+import database
+import migrations
+import timeutil
+
+MONDAY = timeutil.to_day("2024-01-01")
+METRICS = ["sleep_hours", "bp_systolic", "bp_diastolic", "sugar", "weight", "pulse"]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    migrations.migrate(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    database.close_all()
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "health_tracker.db"))
+    yield database.DB_PATH
+    database.close_all()
+
+
+def add(conn, user_id, day, **values):
+    columns = ", ".join(["user_id", "date", "day", *values])
+    marks = ", ".join("?" * (3 + len(values)))
+    row = (user_id, timeutil.format_day(day), day, *values.values())
+    return conn.execute(f"INSERT INTO vitals({columns}) VALUES ({marks})", row).lastrowid
+
+
+def rollup(conn):
+    rows = conn.execute("""
+        SELECT user_id, grain, bucket, metric, n, round(total, 6), min_value, max_value
+        FROM vitals_rollup ORDER BY user_id, grain, bucket, metric
+    """)
+    return [tuple(row) for row in rows]
+
+
+def from_scratch(conn):
+    """vitals_rollup as aggregating vitals would build it"""
+    rows = []
+    for grain, bucket in [("day", "day"), ("week", migrations._week_of_day("day"))]:
+        for m in migrations.ROLLUP_METRICS:
+            value = migrations._metric_value("vitals", m)
+            rows += conn.execute(f"""
+                SELECT user_id, '{grain}', {bucket}, '{m}', count(*), round(total({value}), 6), min({value}), max({value})
+                FROM vitals WHERE {value} IS NOT NULL GROUP BY user_id, {bucket}
+            """).fetchall()
+    return sorted(rows)
+
+
+def test_single_reading_fills_its_day_and_week(conn):
+    add(conn, 1, MONDAY + 2, pulse=70, weight=80.5)
+    assert rollup(conn) == [
+        (1, "day", MONDAY + 2, "pulse", 1, 70.0, 70, 70),
+        (1, "day", MONDAY + 2, "readings", 1, 1.0, 1, 1),
+        (1, "day", MONDAY + 2, "weight", 1, 80.5, 80.5, 80.5),
+        (1, "week", MONDAY, "pulse", 1, 70.0, 70, 70),
+        (1, "week", MONDAY, "readings", 1, 1.0, 1, 1),
+        (1, "week", MONDAY, "weight", 1, 80.5, 80.5, 80.5),
+    ]
+
+
+def test_inserts_updates_and_deletes_match_a_rebuild(conn):
+    rng = random.Random(7)
+    ids = []
+    for _ in range(300):
+        values = {m: rng.randint(50, 150) for m in METRICS if rng.random() < 0.7}
+        ids.append(add(conn, rng.randint(1, 3), MONDAY + rng.randrange(21), **values))
+    assert rollup(conn) == from_scratch(conn)
+
+    for row_id in rng.sample(ids, 100):
+        metric = rng.choice(METRICS)
+        conn.execute(f"UPDATE vitals SET {metric} = ?, day = ? WHERE id = ?",
+                     (rng.choice([None, rng.randint(50, 150)]), MONDAY + rng.randrange(21), row_id))
+    assert rollup(conn) == from_scratch(conn)
+
+    # Deleting each bucket's extremes forces the rescans
+    for row_id in rng.sample(ids, 150):
+        conn.execute("DELETE FROM vitals WHERE id = ?", (row_id,))
+    assert rollup(conn) == from_scratch(conn)
+
+    conn.execute("DELETE FROM vitals")
+    assert rollup(conn) == []
+
+
+def test_archived_buckets_keep_their_bounds(db):
+    conn = database.get_connection()
+    with conn:
+        # Week of MONDAY straddles the archive cut-off on Thursday
+        for offset, pulse in [(0, 50), (1, 95), (3, 70), (4, 45), (5, 100), (8, 65)]:
+            add(conn, 1, MONDAY + offset, pulse=pulse)
+    week = "SELECT n, min_value, max_value FROM vitals_rollup WHERE grain='week' AND bucket=? AND metric='pulse'"
+    assert conn.execute(week, (MONDAY,)).fetchone() == (5, 45, 100)
+
+    assert archive.archive_table(conn, db, "vitals", MONDAY + 3) == 2
+    assert archive.get_watermark(conn, "vitals") == MONDAY + 3
+    assert conn.execute("SELECT count(*) FROM vitals").fetchone()[0] == 4
+    # The archived readings still count
+    assert conn.execute(week, (MONDAY,)).fetchone() == (5, 45, 100)
+
+    # Removing the bounds would rescan vitals, which no longer holds the
+    # archived 50 and 95, so the week keeps its bounds instead
+    with conn:
+        conn.execute("DELETE FROM vitals WHERE day = ?", (MONDAY + 5,))
+        conn.execute("UPDATE vitals SET pulse = 75 WHERE day = ?", (MONDAY + 4,))
+    assert conn.execute(week, (MONDAY,)).fetchone() == (4, 45, 100)
+
+    # Buckets after the watermark are still rescanned
+    with conn:
+        add(conn, 1, MONDAY + 9, pulse=90)
+        conn.execute("DELETE FROM vitals WHERE day = ?", (MONDAY + 9,))
+    assert conn.execute(week, (MONDAY + 7,)).fetchone() == (1, 65, 65)
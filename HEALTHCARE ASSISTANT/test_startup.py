@@ -0,0 +1,90 @@
+# test_startup.py
+# Startup regressions: the login window comes up quickly without the symptom
+# checker, the knowledge base loads lazily (or once, in the background, via
+# warm_up()), and one that fails to load is retried rather than left
+# half-initialized. Only the login window test needs a display.
+#
+#   python -m pytest test_startup.py
+import os
+import re
+import subprocess
+import sys
+import threading
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOGIN_BUDGET = 2.0  # seconds from process start to the login window
+
+
+def needs_gui():
+    pytest.importorskip("customtkinter")
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        pytest.skip("no display to open the login window on")
+
+
+def test_login_window_is_shown_within_budget(tmp_path):
+    needs_gui()
+    result = subprocess.run([sys.executable, os.path.join(HERE, "main.py"), "--check-startup"],
+                            cwd=tmp_path, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stdout + result.stderr
+    shown = float(re.search(r"login window shown after ([\d.]+)s", result.stdout).group(1))
+    assert shown < LOGIN_BUDGET
+
+
+@pytest.fixture
+def checker(monkeypatch):
+    """symptom_service with its knowledge base not loaded yet"""
+    import symptom_service
+    monkeypatch.setattr(symptom_service, "kb_loaded", threading.Event())
+    for name in ["incidence", "vocabulary", "knowledge_base", "question_engine"]:
+        monkeypatch.setattr(symptom_service, name, None)
+    return symptom_service
+
+
+def test_failed_load_is_not_marked_loaded(checker, monkeypatch):
+    monkeypatch.setattr(checker.symptom_kb, "load", lambda: None)
+    assert checker.ensure_loaded() is False
+    assert not checker.kb_loaded.is_set()
+    assert checker.suggest_symptoms("fev") == []
+    assert checker.match_symptom_batch([["fever"]]) == [[]]
+    assert checker.start_refinement(["fever"]) is None
+
+
+def test_load_is_retried_after_a_failure(checker, monkeypatch):
+    load = checker.symptom_kb.load
+    monkeypatch.setattr(checker.symptom_kb, "load", lambda: None)
+    assert checker.ensure_loaded() is False
+    monkeypatch.setattr(checker.symptom_kb, "load", lambda: load(os.path.join(HERE, "symptom_data")))
+    assert checker.ensure_loaded() is True
+    assert checker.kb_loaded.is_set()
+    assert checker.suggest_symptoms("fev")
+
+
+def test_knowledge_base_is_loaded_lazily_without_the_gui():
+    code = ("import sys, symptom_service; "
+            "assert 'customtkinter' not in sys.modules and 'symptom_kb' in sys.modules; "
+            "assert not symptom_service.kb_loaded.is_set()")
+    result = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+
+def test_warm_up_loads_once_in_the_background(checker, monkeypatch):
+    load = checker.symptom_kb.load
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        calls.append(threading.current_thread().name)
+        started.set()
+        release.wait(10)
+        return load(os.path.join(HERE, "symptom_data"))
+
+    monkeypatch.setattr(checker.symptom_kb, "load", slow_load)
+    checker.warm_up()
+    assert started.wait(10)
+    assert not checker.kb_loaded.is_set()
+    release.set()
+    # Waits for the warm-up instead of loading a second time
+    assert checker.ensure_loaded() is True
+    assert calls == ["symptom-kb"]
+    assert checker.match_symptoms_to_diseases(["itching"], 1)
@@ -0,0 +1,38 @@
+# test_symptom_extract.py
+# Free-text extraction: whole words only, leftmost then longest phrase wins
+# where phrases overlap, each symptom once in order of appearance.
+#
+#   python -m pytest test_symptom_extract.py
+import pytest
+import symptom_extract
+
+MILD_FEVER, FEVER, HIGH_FEVER, JOINT_PAIN, PAIN = range(5)
+
+
+@pytest.fixture
+def automaton():
+    return symptom_extract.build_automaton([
+        ("mild fever", MILD_FEVER), ("fever", FEVER), ("high fever", HIGH_FEVER),
+        ("joint pain", JOINT_PAIN), ("pain", PAIN),
+    ])
+
+
+def test_longest_overlapping_phrase_wins(automaton):
+    assert symptom_extract.extract(automaton, "I have a mild fever") == [MILD_FEVER]
+    assert symptom_extract.extract(automaton, "a fever, nothing mild") == [FEVER]
+    assert symptom_extract.extract(automaton, "Joint-Pain!") == [JOINT_PAIN]
+
+
+def test_leftmost_phrase_wins_over_a_later_longer_one():
+    automaton = symptom_extract.build_automaton([("high fever", 0), ("fever and chills", 1), ("chills", 2)])
+    assert symptom_extract.extract(automaton, "high fever and chills") == [0, 2]
+
+
+def test_order_of_appearance_and_each_once(automaton):
+    text = "pain in the back, then high fever, more pain and a fever"
+    assert symptom_extract.extract(automaton, text) == [PAIN, HIGH_FEVER, FEVER]
+
+
+def test_whole_words_only(automaton):
+    assert symptom_extract.extract(automaton, "feverish and painful") == []
+    assert symptom_extract.extract(automaton, "") == []
@@ -0,0 +1,95 @@
+# test_symptom_kb.py
+# The compiled knowledge base cache: reused while the source CSVs are
+# unchanged (even if only their mtimes moved), rebuilt as soon as one of
+# them has different content.
+#
+#   python -m pytest test_symptom_kb.py
+import os
+import shutil
+import pytest
+import symptom_kb
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A copy of the bundled CSVs without a compiled cache"""
+    pytest.importorskip("pandas")
+    for name in symptom_kb.SOURCE_FILES:
+        shutil.copy2(os.path.join(HERE, symptom_kb.DATA_DIR, name), tmp_path / name)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def compiles(monkeypatch):
+    """Counts the times load() falls back to parsing the CSVs"""
+    calls = []
+    compile_sources = symptom_kb.compile_sources
+    monkeypatch.setattr(symptom_kb, "compile_sources", lambda d: calls.append(d) or compile_sources(d))
+    return calls
+
+
+def edit(path, old, new):
+    """Replace old with new in path, moving its mtime on by a second"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    assert old in text
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(text.replace(old, new, 1))
+    os.utime(path, ns=(mtime_ns, mtime_ns + 10**9))
+
+
+def test_cache_is_reused_while_sources_are_unchanged(data_dir, compiles):
+    first = symptom_kb.load(data_dir)
+    assert len(compiles) == 1
+    assert os.path.exists(os.path.join(data_dir, symptom_kb.CACHE_DIR, "manifest.json"))
+
+    cached = symptom_kb.load(data_dir)
+    assert len(compiles) == 1
+    assert cached.diseases == first.diseases and cached.symptoms == first.symptoms
+    assert (cached.frequency == first.frequency).all()
+
+
+def test_touched_source_refreshes_the_manifest_without_a_rebuild(data_dir, compiles):
+    symptom_kb.load(data_dir)
+    path = os.path.join(data_dir, symptom_kb.SYMPTOM_FILE)
+    edit(path, "", "")
+    symptom_kb.load(data_dir)
+    assert len(compiles) == 1
+    manifest = symptom_kb.read_manifest(os.path.join(data_dir, symptom_kb.CACHE_DIR))
+    assert manifest["sources"][symptom_kb.SYMPTOM_FILE]["mtime_ns"] == os.stat(path).st_mtime_ns
+
+
+def test_changed_source_content_rebuilds(data_dir, compiles):
+    kb = symptom_kb.load(data_dir)
+    assert kb.extract_symptoms("a hot head since monday") == []
+
+    path = os.path.join(data_dir, symptom_kb.SYNONYM_FILE)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("hot head,high_fever\n")
+    kb = symptom_kb.load(data_dir)
+    assert len(compiles) == 2
+    assert kb.extract_symptoms("a hot head since monday") == ["high_fever"]
+    # ... and the rebuilt cache is what the next load reads
+    assert symptom_kb.load(data_dir).extract_symptoms("a hot head since monday") == ["high_fever"]
+    assert len(compiles) == 2
+
+
+def test_same_size_edit_is_caught_by_the_hash(data_dir, compiles):
+    kb = symptom_kb.load(data_dir)
+    acne = kb.diseases.index("Acne")
+    assert kb.descriptions[acne].startswith("Acne vulgaris")
+
+    # Same size; only the mtime gives it away, and the hash confirms it
+    path = os.path.join(data_dir, symptom_kb.DESCRIPTION_FILE)
+    edit(path, "Acne vulgaris", "ACNE VULGARIS")
+    kb = symptom_kb.load(data_dir)
+    assert len(compiles) == 2
+    assert kb.descriptions[acne].startswith("ACNE VULGARIS")
+
+
+def test_missing_dataset_returns_none(tmp_path, compiles):
+    assert symptom_kb.load(str(tmp_path)) is None
+    assert compiles == []
@@ -0,0 +1,73 @@
+# test_symptom_matching.py
+# Single-query matching: the heap top k is the head of the full ranking,
+# and the LRU result cache never serves results of an older knowledge base.
+#
+#   python -m pytest test_symptom_matching.py
+import os
+import random
+import threading
+from collections import OrderedDict
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """symptom_service with the bundled knowledge base freshly loaded and an empty cache"""
+    import symptom_service
+    load = symptom_service.symptom_kb.load
+    monkeypatch.setattr(symptom_service.symptom_kb, "load", lambda: load(os.path.join(HERE, "symptom_data")))
+    monkeypatch.setattr(symptom_service, "kb_loaded", threading.Event())
+    monkeypatch.setattr(symptom_service, "_match_cache", OrderedDict())
+    monkeypatch.setattr(symptom_service, "_match_cache_stats", {"hits": 0, "misses": 0})
+    assert symptom_service.ensure_loaded()
+    return symptom_service
+
+
+def test_top_k_is_the_head_of_the_full_ranking(service):
+    rng = random.Random(5)
+    symptoms = sorted(service.symptom_idf)
+    for _ in range(200):
+        query = rng.sample(symptoms, rng.randint(1, 5))
+        full = service.match_symptoms_to_diseases(query)
+        for k in (1, 3, 10):
+            assert service.match_symptoms_to_diseases(query, k) == full[:k]
+
+
+def test_repeated_checks_hit_the_cache(service):
+    first = service.match_symptoms_to_diseases(["itching", "skin_rash"], 5)
+    # Same set of symptoms, typed differently
+    assert service.match_symptoms_to_diseases(["Skin Rash", "itching", "itching"], 5) == first
+    assert service.match_cache_info() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_least_recently_used_result_is_evicted(service, monkeypatch):
+    monkeypatch.setattr(service, "MATCH_CACHE_SIZE", 2)
+    for query in [["itching"], ["cough"], ["itching"], ["vomiting"]]:
+        service.match_symptoms_to_diseases(query, 3)
+    assert service.match_cache_info()["size"] == 2
+    service.match_symptoms_to_diseases(["itching"], 3)
+    service.match_symptoms_to_diseases(["cough"], 3)
+    assert service.match_cache_info()["hits"] == 2  # itching twice; cough was evicted
+
+
+def test_reload_invalidates_the_cache(service):
+    service.match_symptoms_to_diseases(["itching"], 3)
+    assert service.clean_and_load_data()
+    assert service.match_cache_info()["size"] == 0
+    service.match_symptoms_to_diseases(["itching"], 3)
+    assert service.match_cache_info()["hits"] == 0
+
+
+def test_result_of_an_older_knowledge_base_is_not_cached(service, monkeypatch):
+    rank = service._rank_matches
+
+    def rank_during_reload(symptoms, k):
+        matches = rank(symptoms, k)
+        monkeypatch.setattr(service, "_kb_generation", service._kb_generation + 1)
+        return matches
+
+    monkeypatch.setattr(service, "_rank_matches", rank_during_reload)
+    assert service.match_symptoms_to_diseases(["itching"], 3)
+    assert service.match_cache_info()["size"] == 0
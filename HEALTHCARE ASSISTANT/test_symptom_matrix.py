@@ -0,0 +1,68 @@
+# test_symptom_matrix.py
+# Batch scoring must rank exactly like scoring each symptom set on its own.
+#
+#   python -m pytest test_symptom_matrix.py
+import math
+import random
+import pytest
+import symptom_matrix
+
+
+@pytest.fixture
+def kb():
+    rng = random.Random(7)
+    symptoms = [f"symptom_{i}" for i in range(60)]
+    data = {f"disease_{d}": rng.sample(symptoms, rng.randint(1, 8)) for d in range(40)}
+    # A few identical diseases so ties fall back to knowledge-base order
+    data["disease_twin"] = list(data["disease_0"])
+    frequency = {disease: {s: rng.choice([0.25, 0.5, 1.0]) for s in listed} for disease, listed in data.items()}
+    listing = {s: sum(s in listed for listed in data.values()) for s in symptoms}
+    idf = {s: math.log(len(data) / n) + 1 for s, n in listing.items() if n}
+    return data, frequency, idf
+
+
+def brute_force(incidence, query, k):
+    """Score every disease one by one, as symptom_service._rank_matches() does"""
+    query = list(dict.fromkeys(query))
+    idf = dict(zip(incidence.symptoms, incidence.idf.tolist()))
+    total = sum(idf.get(s, incidence.unknown_weight) for s in query)
+    ranked = []
+    for d, disease in enumerate(incidence.diseases):
+        score = matched = 0
+        for s in query:
+            i = incidence.symptom_ids.get(s)
+            if i is None:
+                continue
+            listed = incidence.disease_ids[incidence.symptom_ptr[i]:incidence.symptom_ptr[i + 1]].tolist()
+            if d in listed:
+                score += int(incidence.weights[incidence.symptom_ptr[i] + listed.index(d)])
+                matched += 1
+        if matched:
+            ranked.append((-score, -matched, d, disease, score / max(total, 1) * 100))
+    ranked.sort()
+    return [(disease, pct, -matched) for _, matched, _, disease, pct in ranked[:k]]
+
+
+@pytest.mark.parametrize("k", [1, 3, 5, 100])
+def test_batch_matches_single_scoring(kb, k):
+    incidence = symptom_matrix.IncidenceMatrix(*kb)
+    rng = random.Random(k)
+    vocabulary = incidence.symptoms + ["unknown"]
+    queries = [rng.choices(vocabulary, k=rng.randint(0, 6)) for _ in range(300)]
+    assert incidence.top_k(queries, k) == [brute_force(incidence, query, k) for query in queries]
+
+
+def test_batches_are_split_without_changing_results(kb, monkeypatch):
+    incidence = symptom_matrix.IncidenceMatrix(*kb)
+    queries = [[s] for s in incidence.symptoms] * 3
+    expected = incidence.top_k(queries, 5)
+    monkeypatch.setattr(symptom_matrix, "BATCH_ROWS", 7)
+    assert incidence.top_k(queries, 5) == expected
+
+
+def test_overflowing_sort_key_falls_back_to_lexsort(kb, monkeypatch):
+    incidence = symptom_matrix.IncidenceMatrix(*kb)
+    queries = [[s, t] for s, t in zip(incidence.symptoms, reversed(incidence.symptoms))]
+    expected = incidence.top_k(queries, 5)
+    monkeypatch.setattr(symptom_matrix, "BATCH_ROWS", 2 ** 62)
+    assert incidence.top_k(queries, 5) == expected
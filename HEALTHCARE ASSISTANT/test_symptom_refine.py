@@ -0,0 +1,71 @@
+# test_symptom_refine.py
+# Next-best-question engine on a toy knowledge base: the vectorized gains
+# equal a brute-force entropy computation, and answers update the belief.
+#
+#   python -m pytest test_symptom_refine.py
+import math
+import numpy as np
+import pytest
+import symptom_refine
+
+# disease -> {symptom: frequency}; symptom 3 is listed by no disease
+TOY = [
+    {0: 1.0, 1: 0.5},
+    {1: 0.8, 2: 0.3},
+    {0: 0.2, 2: 1.0},
+]
+N_SYMPTOMS = 4
+
+
+@pytest.fixture
+def engine():
+    ptr = np.cumsum([0] + [len(d) for d in TOY])
+    ids = [s for d in TOY for s in sorted(d)]
+    frequency = [d[s] for d in TOY for s in sorted(d)]
+    return symptom_refine.QuestionEngine(ptr, ids, frequency, N_SYMPTOMS)
+
+
+def entropy(p):
+    return -sum(x * math.log2(x) for x in p if x > 0)
+
+
+def brute_force_gain(p, symptom):
+    """H(p) minus the expected entropy after asking about symptom"""
+    f = [d.get(symptom, 0.0) for d in TOY]
+    yes = [pd * fd for pd, fd in zip(p, f)]
+    no = [pd * (1 - fd) for pd, fd in zip(p, f)]
+    expected = 0.0
+    for branch in (yes, no):
+        total = sum(branch)
+        if total > 0:
+            expected += total * entropy([x / total for x in branch])
+    return entropy(p) - expected
+
+
+@pytest.mark.parametrize("p", [[1 / 3] * 3, [0.6, 0.3, 0.1], [0.5, 0.0, 0.5]])
+def test_gains_match_brute_force(engine, p):
+    probability = np.array(p)
+    candidates = np.packbits(probability > 0, bitorder="little")
+    gains = engine.gains(candidates, probability)
+    expected = [brute_force_gain(p, s) for s in range(N_SYMPTOMS)]
+    assert gains == pytest.approx(expected, abs=1e-9)
+    assert gains[3] == pytest.approx(0.0)
+
+
+def test_answers_update_the_belief(engine):
+    session = symptom_refine.RefinementSession(engine, {0: 1.0, 1: 1.0, 2: 1.0})
+    session.answer(2, True)
+    # Only diseases listing symptom 2 remain, weighted by its frequency
+    assert [d for d, _ in session.ranking()] == [2, 1]
+    assert session.probability == pytest.approx([0.0, 0.3 / 1.3, 1.0 / 1.3])
+    session.answer(0, False)
+    # Disease 2 shows symptom 0 a fifth of the time, disease 1 never
+    assert session.probability == pytest.approx([0.0, 0.3 / 1.1, 0.8 / 1.1])
+
+
+def test_no_question_once_one_disease_is_certain(engine):
+    session = symptom_refine.RefinementSession(engine, {0: 1.0, 1: 1.0})
+    session.answer(0, True)
+    session.answer(1, True)
+    assert session.ranking(1)[0][0] == 0
+    assert session.next_question() is None
@@ -0,0 +1,41 @@
+# test_symptom_vocab.py
+# Typo-tolerant resolution stays within the edit budget, and autocomplete
+# lists names starting with the prefix before those with a later word matching.
+#
+#   python -m pytest test_symptom_vocab.py
+import pytest
+import symptom_vocab
+
+
+@pytest.fixture
+def vocabulary():
+    return symptom_vocab.SymptomVocabulary(
+        ["headache", "high_fever", "mild_fever", "fever", "fatigue", "back_pain", "dischromic _patches"])
+
+
+def test_spelling_variants_resolve_exactly(vocabulary):
+    assert vocabulary.resolve("Head ache") == "headache"
+    assert vocabulary.resolve("dischromic patches") == "dischromic _patches"
+
+
+def test_typos_within_the_budget_resolve(vocabulary):
+    assert vocabulary.resolve("hedache") == "headache"       # one edit, 7 letters
+    assert vocabulary.resolve("hihg fever") == "high_fever"  # two edits, 9 letters
+
+
+def test_nothing_within_the_budget_is_none(vocabulary):
+    assert vocabulary.resolve("fevr") == "fever"
+    assert vocabulary.resolve("fvr") is None                 # under 4 letters: exact only
+    assert vocabulary.resolve("hdache") is None              # two edits, 6 letters allow one
+    assert vocabulary.resolve("hihg fevr") is None           # three edits, budget two
+    assert vocabulary.resolve("toothache") is None
+    assert vocabulary.resolve("") is None
+
+
+def test_suggest_lists_whole_name_matches_first(vocabulary):
+    assert vocabulary.suggest("fe") == ["fever", "high_fever", "mild_fever"]
+    assert vocabulary.suggest("fe", limit=2) == ["fever", "high_fever"]
+    assert vocabulary.suggest("F") == ["fatigue", "fever", "high_fever", "mild_fever"]
+    assert vocabulary.suggest("pain") == ["back_pain"]
+    assert vocabulary.suggest("x") == []
+    assert vocabulary.suggest("   ") == []
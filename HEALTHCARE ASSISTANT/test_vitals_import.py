@@ -0,0 +1,38 @@
+# test_vitals_import.py
+# Streaming JSON import: elements split across reads still parse, and
+# malformed input is rejected without buffering the rest of the file.
+#
+#   python -m pytest test_vitals_import.py
+import io
+import json
+import pytest
+import vitals_import
+
+
+@pytest.fixture
+def small_reads(monkeypatch):
+    monkeypatch.setattr(vitals_import, "READ_SIZE", 16)
+    monkeypatch.setattr(vitals_import, "MAX_ELEMENT_SIZE", 256)
+
+
+def test_elements_split_across_reads(small_reads):
+    records = [{"date": "2024-01-01", "systolic": 120, "note": "x" * 40} for _ in range(20)]
+    assert list(vitals_import.iter_json_array(io.StringIO(json.dumps(records)))) == records
+
+
+def test_unparseable_element_is_rejected_within_the_limit(small_reads):
+    class Endless(io.StringIO):
+        """An unterminated string element followed by far more than the limit"""
+        def read(self, size=-1):
+            self.served = getattr(self, "served", 0) + size
+            return '[{"date": "' if self.served == size else "a" * size
+
+    f = Endless()
+    with pytest.raises(ValueError, match="no complete JSON element"):
+        list(vitals_import.iter_json_array(f))
+    assert f.served < 2 * vitals_import.MAX_ELEMENT_SIZE
+
+
+def test_missing_closing_bracket(small_reads):
+    with pytest.raises(ValueError):
+        list(vitals_import.iter_json_array(io.StringIO('[{"date": "2024-01-01"}, {"date": "2024-01-02"}')))
@@ -0,0 +1,61 @@
+# timeutil.py
+# Integer date/time encodings used in the database.
+#
+# - "day" columns hold the user's local calendar date as days since 1970-01-01.
+#   A reading belongs to the day it was taken on wherever the user was.
+# - "*_at" columns hold an instant as UTC epoch seconds and are converted to
+#   the machine's local time zone only for display.
+#
+# Queries compare these plain integers against an index; date ranges from
+# the GUI are converted with day_range().
+import datetime
+import time
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def to_day(value):
+    """Day number for a date, datetime or YYYY-MM-DD string"""
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    elif isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def from_day(day):
+    """datetime.date for a day number"""
+    return datetime.date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def today():
+    """Today's local day number"""
+    return to_day(datetime.date.today())
+
+
+def day_range(start, end=None):
+    """Inclusive (first, last) day numbers; open-ended ranges run to the far future"""
+    first = start if isinstance(start, int) else to_day(start)
+    if end is None:
+        return first, to_day(datetime.date.max)
+    return first, end if isinstance(end, int) else to_day(end)
+
+
+def to_epoch(moment=None):
+    """UTC epoch seconds for an aware or local naive datetime (default: now)"""
+    if moment is None:
+        return int(time.time())
+    return int(moment.timestamp())
+
+
+def from_epoch(seconds):
+    """Local naive datetime for epoch seconds"""
+    return datetime.datetime.fromtimestamp(seconds)
+
+
+def format_day(day, fmt="%Y-%m-%d"):
+    return from_day(day).strftime(fmt)
+
+
+def format_epoch(seconds, fmt="%Y-%m-%d %H:%M:%S"):
+    return from_epoch(seconds).strftime(fmt)
@@ -1,15 +1,8 @@
 import customtkinter as ctk
 from tkinter import messagebox
-import sqlite3
 from datetime import datetime
-
-
-# Database helper
-
-def connect():
-    conn = sqlite3.connect("health_tracker.db")
-    cur = conn.cursor()
-    return conn, cur
+import database
+from db_writer import when_done
 
 
 
@@ -47,13 +40,8 @@ def vitals_gui(user_id, user_name):
             pulse_val = int(pulse.get())
             date = datetime.now().strftime("%Y-%m-%d")
 
-            conn, cur = connect()
-            cur.execute("""
-                INSERT INTO vitals (user_id, date, bp_systolic, bp_diastolic, sugar, weight, pulse)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, date, systolic, diastolic, sugar_val, weight_val, pulse_val))
-            conn.commit()
-            conn.close()
+            # Saved on the writer thread; feedback is shown once it commits
+            future = database.save_vitals(user_id, date, systolic, diastolic, sugar_val, weight_val, pulse_val)
 
             feedback = []
 
@@ -93,11 +81,17 @@ def vitals_gui(user_id, user_name):
             else:
                 feedback.append("\n Multiple vitals are out of range. Please monitor regularly.")
 
-            show_feedback("Vitals Summary", feedback)
+            when_done(window, future, lambda f: confirm_saved(f, "Vitals Summary", feedback))
 
         except ValueError:
             messagebox.showerror("Input Error", "Please enter valid numeric values in all fields.")
 
+    def confirm_saved(future, title, feedback):
+        if future.exception() is not None:
+            messagebox.showerror("Database Error", f"Could not save your vitals: {future.exception()}")
+        else:
+            show_feedback(title, feedback)
+
     
     # Show feedback window
     
@@ -132,16 +126,7 @@ def sleep_gui(user_id, user_name):
             sleep_hours = float(sleep_entry.get())
             today = datetime.now().strftime("%Y-%m-%d")
 
-            conn, cur = connect()
-            cur.execute("SELECT id FROM vitals WHERE user_id=? AND date=?", (user_id, today))
-            row = cur.fetchone()
-            if row:
-                cur.execute("UPDATE vitals SET sleep_hours=? WHERE id=?", (sleep_hours, row[0]))
-            else:
-                cur.execute("INSERT INTO vitals (user_id, date, sleep_hours) VALUES (?, ?, ?)",
-                            (user_id, today, sleep_hours))
-            conn.commit()
-            conn.close()
+            future = database.save_sleep(user_id, today, sleep_hours)
 
             feedback = []
             if sleep_hours < 7:
@@ -151,11 +136,17 @@ def sleep_gui(user_id, user_name):
             else:
                 feedback.append("✅ You’re getting good quality sleep.")
 
-            show_feedback("Sleep Summary", feedback)
+            when_done(sleep_win, future, lambda f: confirm_saved(f, "Sleep Summary", feedback))
 
         except ValueError:
             messagebox.showerror("Error", "Please enter a valid number.")
 
+    def confirm_saved(future, title, feedback):
+        if future.exception() is not None:
+            messagebox.showerror("Database Error", f"Could not save your sleep hours: {future.exception()}")
+        else:
+            show_feedback(title, feedback)
+
     def show_feedback(title, messages):
         fb = ctk.CTkToplevel(sleep_win)
         fb.title(title)
@@ -0,0 +1,19 @@
+# vital_standards.py
+# Reference ranges shared by the reports and the bulk vitals importer
+
+STANDARD_VITALS = {
+    "bp_systolic": {"min": 90, "max": 120, "unit": "mmHg", "name": "Blood Pressure (Systolic)", "color": "#E74C3C"},
+    "bp_diastolic": {"min": 60, "max": 80, "unit": "mmHg", "name": "Blood Pressure (Diastolic)", "color": "#9B59B6"},
+    "sugar": {"min": 70, "max": 140, "unit": "mg/dL", "name": "Blood Sugar", "color": "#3498DB"},
+    "pulse": {"min": 60, "max": 100, "unit": "bpm", "name": "Pulse Rate", "color": "#E67E22"}
+}
+
+# Readings outside these bounds are data-entry or device errors, not health findings
+PLAUSIBLE_VITALS = {
+    "bp_systolic": (50, 260),
+    "bp_diastolic": (30, 160),
+    "sugar": (20, 800),
+    "weight": (1, 400),
+    "pulse": (25, 250),
+    "sleep_hours": (0, 24)
+}
@@ -0,0 +1,113 @@
+# vitals_analysis.py
+# Report statistics read from the vitals_rollup table instead of raw vitals rows.
+# Days archive.py has moved to the cold store are read back as raw readings.
+import datetime
+import math
+from datetime import timedelta
+import timeutil
+from database import get_archived_before, get_vitals, get_vitals_rollups
+from vital_standards import STANDARD_VITALS
+
+VITAL_NAMES = ["bp_systolic", "bp_diastolic", "sugar", "weight", "pulse", "sleep_hours"]
+
+
+def _combine(aggregates):
+    """Merge (n, total, total_sq, min, max) tuples into one"""
+    n = sum(a[0] for a in aggregates)
+    total = sum(a[1] for a in aggregates)
+    total_sq = sum(a[2] for a in aggregates)
+    return (n, total, total_sq, min(a[3] for a in aggregates), max(a[4] for a in aggregates))
+
+
+def _daily_aggregates(rows):
+    """Per-day {metric: (n, total, total_sq, min, max)} of database.get_vitals() rows, as in vitals_rollup"""
+    days = {}
+    for day, *values in rows:
+        metrics = days.setdefault(day, {})
+        for metric, value in [("readings", 1)] + list(zip(VITAL_NAMES, values)):
+            if value is None:
+                continue
+            n, total, total_sq, min_value, max_value = metrics.get(metric, (0, 0.0, 0.0, value, value))
+            metrics[metric] = (n + 1, total + value, total_sq + value * value,
+                               min(min_value, value), max(max_value, value))
+    return days
+
+
+def get_vitals_data(user_id, period="weekly"):
+    """
+    Fetch per-day vitals aggregates for the specified period
+    period: 'weekly' or 'monthly'
+    Returns [(day number, {metric: (n, total, total_sq, min, max)})] in date order
+    """
+    today = datetime.date.today()
+    if period == "weekly":
+        start_date = today - timedelta(days=7)
+    else:  # monthly
+        start_date = today - timedelta(days=30)
+
+    first = timeutil.to_day(start_date)
+    days = {}
+    archived_before = get_archived_before(user_id)
+    if archived_before is not None and first < archived_before:
+        # Rollups of archived days may keep a stale min or max; the readings themselves are exact
+        days.update(_daily_aggregates(get_vitals(user_id, first, archived_before - 1)))
+        first = archived_before
+    for bucket, metric, n, total, total_sq, min_value, max_value in get_vitals_rollups(user_id, first):
+        days.setdefault(bucket, {})[metric] = (n, total, total_sq, min_value, max_value)
+    return sorted(days.items())
+
+
+def analyze_vitals(data):
+    """
+    Analyze vitals data and compare with standards
+    Returns analysis dictionary with averages and status
+    """
+    if not data:
+        return None
+
+    totals = {}
+    for day, metrics in data:
+        for metric, aggregate in metrics.items():
+            totals.setdefault(metric, []).append(aggregate)
+
+    analysis = {
+        "count": _combine(totals["readings"])[0] if "readings" in totals else 0,
+        "vitals": {}
+    }
+
+    for vital_name in VITAL_NAMES:
+        if vital_name not in totals:
+            continue
+        n, total, total_sq, min_value, max_value = _combine(totals[vital_name])
+        avg_value = total / n
+
+        # Determine status
+        if vital_name in STANDARD_VITALS:
+            std = STANDARD_VITALS[vital_name]
+            if avg_value < std["min"]:
+                status = "Low"
+                color = "orange"
+            elif avg_value > std["max"]:
+                status = "High"
+                color = "red"
+            else:
+                status = "Normal"
+                color = "green"
+        else:
+            status = "Recorded"
+            color = "blue"
+
+        # One point per day (the daily average) for the graphs
+        daily = [(day, metrics[vital_name]) for day, metrics in data if vital_name in metrics]
+        analysis["vitals"][vital_name] = {
+            "average": avg_value,
+            "min": min_value,
+            "max": max_value,
+            "stddev": math.sqrt(max(total_sq / n - avg_value * avg_value, 0.0)),
+            "status": status,
+            "color": color,
+            "values": [aggregate[1] / aggregate[0] for day, aggregate in daily],
+            "dates": [timeutil.from_day(day) for day, aggregate in daily]
+        }
+
+    return analysis
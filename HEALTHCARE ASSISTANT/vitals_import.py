@@ -0,0 +1,265 @@
+# vitals_import.py
+# Bulk import of vitals readings exported by home BP cuffs and glucometers.
+#
+#   python vitals_import.py --user-id 3 readings.csv
+#   python vitals_import.py --user-id 3 --rejects bad_rows.csv export.json
+#
+# Files are streamed row by row and inserted in chunks through the database
+# writer (database.submit_write), like every other write, so an import never
+# competes with the GUI for the write lock. At most one chunk is queued while
+# the next is read, so memory use does not grow with the size of the file.
+import argparse
+import csv
+import datetime
+import json
+import os
+import time
+import timeutil
+from database import submit_write
+from vital_standards import STANDARD_VITALS, PLAUSIBLE_VITALS
+
+CHUNK_SIZE = 5000
+READ_SIZE = 1 << 16      # characters read at a time from JSON array files
+MAX_ELEMENT_SIZE = 1 << 20  # characters buffered for one JSON element before the file is rejected
+MAX_REJECT_SAMPLES = 20  # rejected rows kept in the returned summary
+
+# Same parsing as the vitals form: whole numbers for BP and pulse
+VITAL_TYPES = {
+    "bp_systolic": int,
+    "bp_diastolic": int,
+    "sugar": float,
+    "weight": float,
+    "pulse": int,
+    "sleep_hours": float
+}
+
+# Header names used by common device exports
+COLUMN_ALIASES = {
+    "day": "date",
+    "timestamp": "date",
+    "datetime": "date",
+    "measured_at": "date",
+    "systolic": "bp_systolic",
+    "sys": "bp_systolic",
+    "diastolic": "bp_diastolic",
+    "dia": "bp_diastolic",
+    "glucose": "sugar",
+    "blood_sugar": "sugar",
+    "blood_glucose": "sugar",
+    "heart_rate": "pulse",
+    "bpm": "pulse",
+    "weight_kg": "weight",
+    "sleep": "sleep_hours"
+}
+
+INSERT_SQL = """
+    INSERT INTO vitals (user_id, date, day, sleep_hours, bp_systolic, bp_diastolic, sugar, weight, pulse)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def normalize_column(name):
+    """Map an export's header to a vitals column name"""
+    key = str(name).strip().lower().replace(" ", "_").replace("-", "_")
+    return COLUMN_ALIASES.get(key, key)
+
+
+def parse_date(value):
+    """Accept YYYY-MM-DD or an ISO timestamp and return YYYY-MM-DD"""
+    text = str(value).strip()
+    return datetime.date.fromisoformat(text[:10]).isoformat()
+
+
+def parse_vital(name, value):
+    """Convert one reading, rejecting values outside PLAUSIBLE_VITALS"""
+    if value is None or str(value).strip() == "":
+        return None
+    number = float(value)
+    if VITAL_TYPES[name] is int:
+        if not number.is_integer():
+            raise ValueError(f"{name} must be a whole number")
+        number = int(number)
+    low, high = PLAUSIBLE_VITALS[name]
+    if not (low <= number <= high):
+        raise ValueError(f"{name} {number} outside {low}-{high}")
+    return number
+
+
+def validate_row(row):
+    """
+    Validate one input record.
+    Returns (values, None) ready for INSERT_SQL minus user_id, or (None, reason).
+    """
+    record = {normalize_column(k): v for k, v in row.items() if k is not None}
+    if not record.get("date"):
+        return None, "missing date"
+    try:
+        date = parse_date(record["date"])
+        vitals = {name: parse_vital(name, record.get(name)) for name in VITAL_TYPES}
+    except (ValueError, TypeError) as e:
+        return None, str(e)
+
+    if all(v is None for v in vitals.values()):
+        return None, "no vitals in row"
+
+    values = (date, timeutil.to_day(date), vitals["sleep_hours"], vitals["bp_systolic"], vitals["bp_diastolic"],
+              vitals["sugar"], vitals["weight"], vitals["pulse"])
+    return values, None
+
+
+def iter_json_array(f):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buf = f.read(READ_SIZE).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("expected a JSON array")
+    pos = 1
+    eof = False
+
+    while True:
+        # Skip separators, refilling the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(READ_SIZE), 0
+            eof = not buf
+
+        if pos >= len(buf):
+            raise ValueError("unterminated JSON array")
+        if buf[pos] == "]":
+            return
+
+        try:
+            item, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if len(buf) - pos > MAX_ELEMENT_SIZE:
+                # Malformed input would otherwise be buffered up to the end of the file
+                raise ValueError(f"no complete JSON element within {MAX_ELEMENT_SIZE} characters") from None
+            more = "" if eof else f.read(READ_SIZE)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+
+        yield item
+        pos = end
+        if pos > READ_SIZE:
+            buf, pos = buf[pos:], 0
+
+
+def iter_records(path):
+    """Stream dict records from a .csv, .json (array) or .jsonl/.ndjson file"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        elif ext == ".json":
+            yield from iter_json_array(f)
+        else:
+            raise ValueError(f"Unsupported file type: {ext}")
+
+
+def out_of_standard(values):
+    """Names of the STANDARD_VITALS readings in a validated row that fall outside the normal range"""
+    readings = dict(zip(["date", "day", "sleep_hours", "bp_systolic", "bp_diastolic", "sugar", "weight", "pulse"], values))
+    flagged = []
+    for name, std in STANDARD_VITALS.items():
+        value = readings.get(name)
+        if value is not None and not (std["min"] <= value <= std["max"]):
+            flagged.append(name)
+    return flagged
+
+
+def _insert_chunk(conn, chunk):
+    conn.executemany(INSERT_SQL, chunk)
+    return len(chunk)
+
+
+def import_vitals(path, user_id, chunk_size=CHUNK_SIZE, rejects_path=None):
+    """
+    Import every valid row of path into vitals for user_id.
+    Rows are inserted with executemany, one writer job per chunk.
+    Returns a summary dict with counts, throughput and sample rejections.
+    """
+    summary = {
+        "read": 0,
+        "inserted": 0,
+        "rejected": 0,
+        "rejected_samples": [],
+        "out_of_standard": {name: 0 for name in STANDARD_VITALS},
+        "seconds": 0.0,
+        "rows_per_second": 0.0
+    }
+    started = time.perf_counter()
+    rejects_file = open(rejects_path, "w", newline="", encoding="utf-8") if rejects_path else None
+    rejects_writer = csv.writer(rejects_file) if rejects_file else None
+    if rejects_writer:
+        rejects_writer.writerow(["row", "reason", "record"])
+
+    pending = None  # Future of the chunk the writer is inserting
+
+    def flush(chunk):
+        nonlocal pending
+        if pending is not None:
+            summary["inserted"] += pending.result()
+        pending = submit_write(_insert_chunk, chunk, user_id=user_id) if chunk else None
+
+    try:
+        chunk = []
+        for row_number, record in enumerate(iter_records(path), 1):
+            summary["read"] += 1
+            values, reason = (None, "not an object") if not isinstance(record, dict) else validate_row(record)
+            if reason:
+                summary["rejected"] += 1
+                if len(summary["rejected_samples"]) < MAX_REJECT_SAMPLES:
+                    summary["rejected_samples"].append((row_number, reason))
+                if rejects_writer:
+                    rejects_writer.writerow([row_number, reason, json.dumps(record, default=str)])
+                continue
+
+            for name in out_of_standard(values):
+                summary["out_of_standard"][name] += 1
+            chunk.append((user_id,) + values)
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+        flush([])
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    summary["seconds"] = time.perf_counter() - started
+    if summary["seconds"] > 0:
+        summary["rows_per_second"] = summary["inserted"] / summary["seconds"]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import vitals readings from CSV or JSON exports")
+    parser.add_argument("path", help="CSV, JSON array or JSON Lines file")
+    parser.add_argument("--user-id", type=int, required=True, help="user the readings belong to")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per transaction")
+    parser.add_argument("--rejects", help="write rejected rows and reasons to this CSV file")
+    args = parser.parse_args(argv)
+
+    summary = import_vitals(args.path, args.user_id, args.chunk_size, args.rejects)
+
+    print(f"Read {summary['read']} rows, inserted {summary['inserted']}, rejected {summary['rejected']}")
+    print(f"Took {summary['seconds']:.2f}s ({summary['rows_per_second']:.0f} rows/s)")
+    for name, count in summary["out_of_standard"].items():
+        if count:
+            print(f"{STANDARD_VITALS[name]['name']}: {count} readings outside the normal range")
+    for row_number, reason in summary["rejected_samples"]:
+        print(f"  row {row_number}: {reason}")
+    return 0 if summary["rejected"] == 0 else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())